@@ -7,6 +7,7 @@ from app.auth import verify_token
 from app.crud import get_user_by_email
 from app.models.models import UserRole
 from app.logging_config import logger
+from app.services.gars_service import GARSService, gars_service
 """ЗАВИСИМОСТИ"""
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -29,4 +30,8 @@ def get_admin_user(current_user: UserInDB = Depends(get_current_user)):
     if current_user.role != UserRole.ADMIN:
         logger.warning(f"У пользователя {current_user.email_user} нет доступа")
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    return current_user
\ No newline at end of file
+    return current_user
+
+def get_gars_service() -> GARSService:
+    """Общий GARSService с долгоживущим пулом соединений к 1С."""
+    return gars_service
@@ -1,11 +1,15 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from app.routers import auth_main, users, routes, s7, gars_routes, multimodal, support_chat, bookings #, payments
+from app.routers import auth_main, users, routes, s7, gars_routes, multimodal, support_chat, bookings, metrics #, payments
 from app.database import engine
+from app.migrations import apply_migrations
 from app.models import models
+from app.services.gars_service import gars_service
+from app.utils.cache import cache_service
 from dotenv import load_dotenv
 import os
 
@@ -16,11 +20,25 @@ limiter = Limiter(key_func=get_remote_address, default_limits=["100 per minute"]
 
 # Создание всех таблиц
 models.Base.metadata.create_all(bind=engine)
+# Новые колонки и ограничения в уже существующих таблицах
+apply_migrations(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Открываем пулы соединений к Redis и 1С ГАРС один раз на всё время работы
+    await cache_service.startup()
+    await gars_service.startup()
+    try:
+        yield
+    finally:
+        await gars_service.close()
+        await cache_service.close()
 
 app = FastAPI(
     title="Мультимедийные маршруты API",
     description="API для поиска и бронирования мультимодальных маршрутов",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.state.limiter = limiter
@@ -44,6 +62,7 @@ app.include_router(gars_routes.router)
 app.include_router(multimodal.router)
 app.include_router(support_chat.router)
 app.include_router(bookings.router)
+app.include_router(metrics.router)
 # app.include_router(payments.router)   # Будет создано позже
 
 @app.get("/")
@@ -0,0 +1,26 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.logging_config import logger
+"""ДОРАБОТКА СХЕМЫ СУЩЕСТВУЮЩЕЙ БАЗЫ"""
+
+# Base.metadata.create_all создаёт только отсутствующие таблицы и не меняет
+# уже существующие. Новые колонки/ограничения для старых таблиц добавляются
+# здесь идемпотентным SQL: каждая миграция безопасна при повторном запуске
+# и выполняется при каждом старте приложения после create_all.
+MIGRATIONS = [
+    (
+        "routes.gars_data_version",
+        ["ALTER TABLE routes ADD COLUMN IF NOT EXISTS gars_data_version VARCHAR"],
+    ),
+]
+
+
+def apply_migrations(engine: Engine) -> None:
+    """Применяет MIGRATIONS (только PostgreSQL), каждую в своей транзакции."""
+    if engine.dialect.name != "postgresql":
+        return
+    for name, statements in MIGRATIONS:
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+        logger.info(f"Миграция схемы применена: {name}")
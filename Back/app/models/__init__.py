@@ -1,7 +1,7 @@
-from .route_models import Route, RouteSegment, Booking, Passenger, Ticket, TransportType, RouteStatus
+from .route_models import Route, RouteSegment, Booking, Passenger, Ticket, TransportType, RouteStatus, SyncState
 from .models import User, ChatBotSession, ChatBotMessage
 
 __all__ = [
     "Route", "RouteSegment", "Booking", "Passenger", "Ticket",
-    "TransportType", "RouteStatus", "User", "ChatBotSession", "ChatBotMessage"
+    "TransportType", "RouteStatus", "SyncState", "User", "ChatBotSession", "ChatBotMessage"
 ]
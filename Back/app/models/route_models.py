@@ -26,6 +26,7 @@ class Route(Base):
     description = Column(Text)
     status = Column(Enum(RouteStatus), default=RouteStatus.ACTIVE)
     duration_minutes = Column(Integer)  # Общее время в пути
+    gars_data_version = Column(String)  # DataVersion записи в 1С (для инкрементальной синхронизации)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -33,6 +34,19 @@ class Route(Base):
     segments = relationship("RouteSegment", back_populates="route", cascade="all, delete-orphan")
     bookings = relationship("Booking", back_populates="route")
 
+class SyncState(Base):
+    """Водяной знак синхронизации с 1С (одна строка на синхронизируемый каталог)"""
+    __tablename__ = "sync_state"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)  # например "gars_routes"
+    watermark = Column(String)  # отпечаток версий каталога на момент последней синхронизации
+    last_synced_at = Column(DateTime(timezone=True))
+    
+    records_total = Column(Integer, default=0)
+    records_changed = Column(Integer, default=0)
+    records_deactivated = Column(Integer, default=0)
+
 class RouteSegment(Base):
     __tablename__ = "route_segments"
     
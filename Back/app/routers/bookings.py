@@ -1,6 +1,6 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -8,6 +8,7 @@ from app.dependencies import get_current_user
 from app.models.models import User
 from app.models.route_models import Booking, Route, RouteStatus
 from app.schemas.schemas import BookingCreate, BookingResponse
+from app.utils.cache import cache_service, city_pair_tag
 
 router = APIRouter(prefix="/bookings", tags=["bookings"])
 
@@ -15,6 +16,7 @@ router = APIRouter(prefix="/bookings", tags=["bookings"])
 @router.post("", response_model=BookingResponse)
 def create_booking(
     payload: BookingCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -59,6 +61,13 @@ def create_booking(
     db.add(booking)
     db.commit()
     db.refresh(booking)
+
+    # кэшированные поиски по направлению (и обратному, если есть дата возврата) устарели
+    if payload.origin and payload.destination:
+        tags = [city_pair_tag(payload.origin, payload.destination)]
+        if payload.return_date:
+            tags.append(city_pair_tag(payload.destination, payload.origin))
+        background_tasks.add_task(cache_service.invalidate_tags, *tags)
     return booking
 
 
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from typing import List, Dict, Any
 
-from app.services.gars_service import GARSService
+from app.services.gars_service import GARSService, get_stale_age
+from app.dependencies import get_gars_service
+from app.utils.fast_json import FastJSONResponse
 
 router = APIRouter(
     prefix="/api/v1/gars",
@@ -9,14 +11,22 @@ router = APIRouter(
 )
 
 
-@router.get("/routes")
-async def get_gars_routes() -> List[Dict[str, Any]]:
+@router.get("/routes", response_class=FastJSONResponse)
+async def get_gars_routes(
+    response: Response,
+    service: GARSService = Depends(get_gars_service),
+) -> List[Dict[str, Any]]:
     """
     Берёт маршруты из 1С, фильтрует (без ' С', '2024', 'Тест') и
     кладёт в Redis-кэш, чтобы не дёргать 1С каждый раз.
+
+    Если 1С недоступен, отдаётся последняя удачная копия, а её возраст
+    в секундах — в заголовке X-GARS-Stale-Age.
     """
-    service = GARSService()
     routes = await service.get_filtered_routes_cached()
+    stale_age = get_stale_age()
+    if stale_age is not None:
+        response.headers["X-GARS-Stale-Age"] = str(int(stale_age))
     if routes is None:
         raise HTTPException(status_code=500, detail="Не удалось получить маршруты из 1С")
     return routes
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+from typing import Dict, Any
+
+from app.dependencies import get_admin_user, get_gars_service
+from app.models.models import User
+from app.services.gars_service import GARSService
+from app.utils.cache import cache_service
+
+router = APIRouter(
+    prefix="/api/v1/metrics",
+    tags=["metrics"],
+)
+
+
+@router.get("/gars")
+async def get_gars_metrics(
+    gars_service: GARSService = Depends(get_gars_service),
+    current_user: User = Depends(get_admin_user),
+) -> Dict[str, Any]:
+    """
+    Метрики обращений к 1С ГАРС (только для админа).
+
+    collapsed — сколько вызовов присоединилось к уже идущему запросу
+    и не создало лишней нагрузки на 1С; circuit_breaker — состояние
+    защиты от недоступного 1С.
+    """
+    return {
+        "single_flight": gars_service.flight_stats(),
+        "circuit_breaker": gars_service.breaker_stats(),
+    }
+
+
+@router.get("/cache")
+async def get_cache_metrics(
+    reset: bool = False,
+    current_user: User = Depends(get_admin_user),
+) -> Dict[str, Any]:
+    """
+    Метрики кэша Redis по пространствам имён (только для админа).
+
+    hit_rate, l1_hits, stale_served, errors, размеры значений и задержки
+    get/set (p50/p95/p99) — для подбора TTL и памяти. Счётчики свои
+    у каждого воркера и копятся с его запуска; reset=true обнуляет их.
+    """
+    stats = cache_service.stats()
+    if reset:
+        cache_service.metrics.reset()
+    return stats
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import List, Dict, Any, Optional
 from datetime import date, datetime
 
-from app.utils.cache import cache_service
-from app.tasks import parse_s7_flights_task
-from app.services.gars_service import GARSService
+from app.utils.fast_json import FastJSONResponse
+from app.logging_config import logger
+from app.services.s7_service import get_s7_flights
+from app.services.gars_service import GARSService, get_stale_age
+from app.dependencies import get_gars_service
 
 router = APIRouter(
     prefix="/api/v1/multimodal",
@@ -20,10 +22,6 @@ def _parse_ru_date(date_str: str) -> date:
         raise HTTPException(status_code=400, detail="Неверный формат даты, нужен ДД.MM.ГГГГ")
 
 
-def _date_to_ddmmyyyy(d: date) -> str:
-    return d.strftime("%d.%m.%Y")
-
-
 def _runs_on_date(timetable: Dict[str, Any], target: date) -> bool:
     """
     Очень упрощённая проверка регулярности:
@@ -55,36 +53,13 @@ def _combine_date_and_time(d: date, timestr: str) -> Optional[str]:
         return None
 
 
-async def _get_s7_flights(origin_city: str, transfer_city: str, departure_date: date) -> List[Dict[str, Any]]:
-    """
-    Достаём рейсы S7 (через Celery + кэш),
-    формат даты для S7: ДД.MM.ГГГГ.
-    """
-    date_out_str = _date_to_ddmmyyyy(departure_date)
-    cache_key = f"s7:{origin_city}:{transfer_city}:{date_out_str}:one-way"
-
-    cached = await cache_service.get_json(cache_key)
-    if cached is not None:
-        return cached
-
-    # Запускаем задачу Celery
-    async_result = parse_s7_flights_task.delay(
-        origin_city,
-        transfer_city,
-        date_out_str,
-        None,
-    )
-    flights = async_result.get(timeout=120)
-
-    await cache_service.set_json(cache_key, flights, expire=3600)
-    return flights
-
-
-@router.get("/search-moscow-churapcha")
+@router.get("/search-moscow-churapcha", response_class=FastJSONResponse)
 async def search_moscow_churapcha(
+    response: Response,
     origin: str = Query("Москва", description="город вылета (пока ожидается 'Москва')"),
     destination: str = Query("Чурапча", description="конечный пункт (пока ожидается 'Чурапча')"),
     departure_date: str = Query(..., description="Дата отправления, формат ДД.MM.ГГГГ (например '25.11.2025')"),
+    gars_service: GARSService = Depends(get_gars_service),
 ):
     """
     Комбинированный маршрут:
@@ -105,10 +80,16 @@ async def search_moscow_churapcha(
     dep_date = _parse_ru_date(departure_date)
 
     # 1. Рейсы S7 Москва → Якутск
-    flights = await _get_s7_flights(origin_city=origin, transfer_city="Якутск", departure_date=dep_date)
+    # (сбой парсинга S7 не роняет маршрут — автобусная часть всё равно нужна)
+    try:
+        flights = await get_s7_flights(origin=origin, dest="Якутск", date_out=dep_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.warning(f"S7 flights unavailable for {origin} -> Якутск {dep_date}: {e!r}")
+        flights = []
 
     # 2. Находим маршрут автобуса Якутск Автовокзал — Чурапча с. в 1С
-    gars_service = GARSService()
     routes = await gars_service.get_filtered_routes_cached()
 
     bus_route: Optional[Dict[str, Any]] = None
@@ -146,6 +127,10 @@ async def search_moscow_churapcha(
             }
         )
 
+    stale_age = get_stale_age()
+    if stale_age is not None:
+        response.headers["X-GARS-Stale-Age"] = str(int(stale_age))
+
     return {
         "date": dep_date.isoformat(),
         "origin": origin,
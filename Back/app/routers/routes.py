@@ -1,20 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime, date
 
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.services.route_service import RouteService
-from app.services.gars_service import GARSService
+from app.services.gars_service import GARSService, get_stale_age
 from app.schemas.route_schemas import (
     RouteResponse, RouteSearchRequest, RouteSearchResponse,
     RouteCreate
 )
 # from app.core.security import get_current_user
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, get_gars_service
 from app.models.models import User
-from app.utils.cache import cache_service
-from app.tasks import parse_s7_flights_task
+from app.utils.fast_json import FastJSONResponse
+from app.logging_config import logger
+from app.services.prewarm_service import record_search
+from app.services.s7_service import get_s7_flights
 
 router = APIRouter(prefix="/api/v1/routes", tags=["routes"])
 
@@ -27,11 +30,6 @@ def _parse_ru_date(date_str: str) -> date:
         raise HTTPException(status_code=400, detail="Неверный формат даты, нужен ДД.MM.ГГГГ")
 
 
-def _date_to_ddmmyyyy(d: date) -> str:
-    """Перегоняем дату в формат S7 'ДД.MM.ГГГГ'."""
-    return d.strftime("%d.%m.%Y")
-
-
 def _runs_on_date(timetable: Dict[str, Any], target: date) -> bool:
     """
     Проверка: идёт ли рейс по расписанию в указанную дату.
@@ -69,47 +67,10 @@ def _combine_date_and_time(d: date, timestr: str) -> Optional[str]:
         return None
 
 
-async def _get_s7_flights(origin_city: str, dest_city: str, departure_date: date) -> List[Dict[str, Any]]:
-    """
-    Достаём рейсы S7 (через Celery + кэш).
-    origin_city / dest_city — то, что ожидает твой парсер (например 'Москва', 'Якутск').
-    """
-    date_out_str = _date_to_ddmmyyyy(departure_date)
-    cache_key = f"s7:{origin_city}:{dest_city}:{date_out_str}:one-way"
-
-    cached = await cache_service.get_json(cache_key)
-    if cached is not None:
-        return cached
-
-    async_result = parse_s7_flights_task.delay(
-        origin_city,
-        dest_city,
-        date_out_str,
-        None,  # даты обратно нет
-    )
-    flights = async_result.get(timeout=120)
-
-    await cache_service.set_json(cache_key, flights, expire=3600)
-    return flights
-
-
-def _find_bus_route(routes: List[Dict[str, Any]], point_a: str, point_b: str) -> Optional[Dict[str, Any]]:
-    """
-    Ищем маршрут 1С, в описании которого есть обоих пункта (независимо от порядка).
-    Пример: 'Якутск Автовокзал — Чурапча с.' или 'Чурапча с. — Якутск Автовокзал'.
-    """
-    a = point_a.lower()
-    b = point_b.lower()
-
-    for r in routes:
-        desc = (r.get("Description") or "").lower()
-        if a in desc and b in desc:
-            return r
-    return None
-
-
-@router.get("/search")
+@router.get("/search", response_class=FastJSONResponse)
 async def search_routes(
+    response: Response,
+    background_tasks: BackgroundTasks,
     origin: str = Query(..., description="Город отправления (например 'Москва')"),
     destination: str = Query(..., description="Конечный пункт (например 'Чурапча')"),
     departure_date: str = Query(..., description="Дата отправления, формат ДД.MM.ГГГГ (например '25.11.2025')"),
@@ -117,6 +78,7 @@ async def search_routes(
         None,
         description="Дата обратного выезда, формат ДД.MM.ГГГГ (необязательный параметр)",
     ),
+    gars_service: GARSService = Depends(get_gars_service),
 ):
     """
     Универсальный поиск маршрутов:
@@ -128,47 +90,83 @@ async def search_routes(
       добавляет обратный автобус (destination → Якутск) и самолёт (Якутск → origin).
     - Если в 1С нет маршрута для destination:
       отдаёт просто рейсы S7 origin → destination (и обратно при return_date).
+
+    Если 1С недоступен и использованы запасные данные из кэша,
+    их возраст в секундах передаётся в заголовке X-GARS-Stale-Age.
     """
     dep_date = _parse_ru_date(departure_date)
     ret_date: Optional[date] = _parse_ru_date(return_date) if return_date else None
 
+    # популярность направлений для прогрева кэша (prewarm_service)
+    background_tasks.add_task(record_search, origin, destination, dep_date, ret_date)
+
     origin_norm = origin.strip().lower()
     dest_norm = destination.strip().lower()
 
-    gars_service = GARSService()
     routes_1c = await gars_service.get_filtered_routes_cached()
 
     # --- Пытаемся найти автобусный маршрут туда (Якутск -> destination) ---
     bus_route_out = (
-        _find_bus_route(routes_1c, "якутск автовокзал", dest_norm)
-        or _find_bus_route(routes_1c, "якутск", dest_norm)
+        gars_service.find_bus_route(routes_1c, "якутск автовокзал", dest_norm)
+        or gars_service.find_bus_route(routes_1c, "якутск", dest_norm)
     )
 
     # --- Пытаемся найти автобусный маршрут обратно (destination -> Якутск) ---
     bus_route_back: Optional[Dict[str, Any]] = None
     if ret_date is not None:
         bus_route_back = (
-            _find_bus_route(routes_1c, dest_norm, "якутск автовокзал")
-            or _find_bus_route(routes_1c, dest_norm, "якутск")
+            gars_service.find_bus_route(routes_1c, dest_norm, "якутск автовокзал")
+            or gars_service.find_bus_route(routes_1c, dest_norm, "якутск")
         )
 
     is_yakutsk_origin = origin_norm.startswith("якутск")
 
+    # Какие рейсы S7 нужны: до Якутска и обратно (мультимодально)
+    # или сразу origin <-> destination (если автобуса в 1С нет)
+    if bus_route_out is not None:
+        flight_out_args = None if is_yakutsk_origin else (origin, "Якутск", dep_date)
+        flight_back_args = None if is_yakutsk_origin or ret_date is None else ("Якутск", origin, ret_date)
+    else:
+        flight_out_args = (origin, destination, dep_date)
+        flight_back_args = (destination, origin, ret_date) if ret_date is not None else None
+    flight_calls = [args for args in (flight_out_args, flight_back_args) if args is not None]
+
+    # Расписания автобусов туда и обратно (из кэша одним MGET, промахи — одним $batch к 1С)
+    # и рейсы S7 (из кэша одним MGET) запрашиваются параллельно
+    bus_route_ids = [
+        r.get("Ref_Key") for r in (bus_route_out, bus_route_back)
+        if r is not None and r.get("Ref_Key")
+    ]
+    timetables_by_route, flights = await asyncio.gather(
+        gars_service.get_routes_timetables_with_cache(bus_route_ids),
+        get_s7_flights.many(flight_calls, return_exceptions=True),
+    )
+    # сбой S7 по одному направлению (в том числе запомненный в кэше) не роняет
+    # весь поиск: это плечо остаётся без рейсов
+    for args, result in zip(flight_calls, flights):
+        if isinstance(result, Exception):
+            logger.warning(f"S7 flights unavailable for {args}: {result!r}")
+    flights = [[] if isinstance(result, Exception) else result for result in flights]
+    flights_iter = iter(flights)
+    flights_out: List[Dict[str, Any]] = next(flights_iter) if flight_out_args else []
+    flights_back: List[Dict[str, Any]] = next(flights_iter) if flight_back_args else []
+
+    stale_age = get_stale_age()
+    if stale_age is not None:
+        response.headers["X-GARS-Stale-Age"] = str(int(stale_age))
+
     # Если маршрут в 1С есть — строим мультимодальную цепочку
     if bus_route_out is not None:
         # === ТУДА ===
 
-        # Самолёт origin -> Якутск (если origin не Якутск)
-        flights_out: List[Dict[str, Any]] = []
-        if not is_yakutsk_origin:
-            flights_out = await _get_s7_flights(origin_city=origin, dest_city="Якутск", departure_date=dep_date)
+        # Самолёт origin -> Якутск (если origin не Якутск) — flights_out
 
         # Автобус Якутск -> destination
         out_route_id = bus_route_out.get("Ref_Key")
         if not out_route_id:
             raise HTTPException(status_code=500, detail="У автобусного маршрута (туда) нет Ref_Key в 1С")
 
-        timetables_out = await gars_service.get_route_timetables_with_cache(out_route_id)
+        timetables_out = timetables_by_route.get(out_route_id, [])
         bus_out_for_date = [t for t in timetables_out if _runs_on_date(t, dep_date)]
 
         bus_out_options: List[Dict[str, Any]] = []
@@ -209,21 +207,14 @@ async def search_routes(
         # === ОБРАТНО (если есть return_date) ===
         ret_part: Optional[Dict[str, Any]] = None
         if ret_date is not None:
-            flights_back: List[Dict[str, Any]] = []
-            if not is_yakutsk_origin:
-                flights_back = await _get_s7_flights(
-                    origin_city="Якутск",
-                    dest_city=origin,
-                    departure_date=ret_date,
-                )
-
+            # Самолёт Якутск -> origin — flights_back
             bus_back_options: List[Dict[str, Any]] = []
             if bus_route_back is not None:
                 back_route_id = bus_route_back.get("Ref_Key")
                 if not back_route_id:
                     raise HTTPException(status_code=500, detail="У автобусного маршрута (обратно) нет Ref_Key в 1С")
 
-                timetables_back = await gars_service.get_route_timetables_with_cache(back_route_id)
+                timetables_back = timetables_by_route.get(back_route_id, [])
                 bus_back_for_date = [t for t in timetables_back if _runs_on_date(t, ret_date)]
 
                 for t in bus_back_for_date:
@@ -269,7 +260,6 @@ async def search_routes(
         }
 
     # --- Fallback: маршрута в 1С нет, только самолёты S7 туда/обратно ---
-    flights_out = await _get_s7_flights(origin_city=origin, dest_city=destination, departure_date=dep_date)
     outbound = {
         "date": dep_date.isoformat(),
         "segments": [
@@ -285,7 +275,6 @@ async def search_routes(
 
     ret_part_flight_only: Optional[Dict[str, Any]] = None
     if ret_date is not None:
-        flights_back = await _get_s7_flights(origin_city=destination, dest_city=origin, departure_date=ret_date)
         ret_part_flight_only = {
             "date": ret_date.isoformat(),
             "segments": [
@@ -330,7 +319,8 @@ async def get_route_schedule(
     start_date: date,
     end_date: date,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    gars_service: GARSService = Depends(get_gars_service),
 ):
     """Получение расписания маршрута"""
     try:
@@ -340,7 +330,6 @@ async def get_route_schedule(
         if not route:
             raise HTTPException(status_code=404, detail="Маршрут не найден")
         
-        gars_service = GARSService()
         schedule = await gars_service.get_route_schedule_with_cache(
             route.gars_id, start_date, end_date
         )
@@ -353,15 +342,15 @@ async def get_route_schedule(
 @router.post("/sync-from-gars")
 async def sync_routes_from_gars(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    gars_service: GARSService = Depends(get_gars_service),
 ):
     """Синхронизация маршрутов с 1С ГАРС"""
     try:
-        gars_service = GARSService()
-        success = await gars_service.sync_routes(db)
+        stats = await gars_service.sync_routes(db)
         
-        if success:
-            return {"message": "Синхронизация выполнена успешно"}
+        if stats is not None:
+            return {"message": "Синхронизация выполнена успешно", "stats": stats}
         else:
             raise HTTPException(status_code=500, detail="Ошибка при синхронизации")
             
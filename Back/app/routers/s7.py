@@ -4,11 +4,12 @@ from fastapi import APIRouter, HTTPException
 from typing import List
 
 
-from app.utils.cache import cache_service
-from app.tasks import parse_s7_flights_task
+from app.utils.fast_json import FastJSONResponse
 
 from app.schemas.s7_schemas import S7SearchRequest, S7Flight
-from app.services.s7_parser import run_s7_search
+from app.services.s7_service import get_s7_flights
+from app.utils.cache import CachedError
+from app.logging_config import logger
 
 router = APIRouter(
     prefix="/s7",
@@ -16,25 +17,18 @@ router = APIRouter(
 )
 
 
-@router.post("/search", response_model=List[S7Flight])
+@router.post("/search", response_model=List[S7Flight], response_class=FastJSONResponse)
 async def search_s7_flights(body: S7SearchRequest):
-    cache_key = f"s7:{body.origin}|{body.destination}|{body.date_out}|{body.date_back or '-'}"
-
-    # 1. проверяем кэш
-    cached = await cache_service.get_json(cache_key)
-    if cached is not None:
-        return cached
-
-    # 2. Celery
-    async_result = parse_s7_flights_task.delay(
-        body.origin,
-        body.destination,
-        body.date_out,
-        body.date_back,
-    )
-    flights = async_result.get(timeout=120)
-
-    # 3. кладём в кэш
-    await cache_service.set_json(cache_key, flights, expire=3600)
-
-    return flights
+    # общий с поиском маршрутов кэш: устаревший ответ отдаётся сразу и
+    # обновляется в фоне, блокирующий парсинг — только если в кэше ничего нет
+    try:
+        return await get_s7_flights(body.origin, body.destination, body.date_out, body.date_back)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CachedError as e:
+        # парсинг недавно не удался — ошибка запомнена на CACHE_TTL_ERROR секунд
+        raise HTTPException(status_code=503, detail=f"Поиск S7 временно недоступен: {e}")
+    except Exception as e:
+        # таймаут Celery, S7ScrapeError и прочие ошибки задачи парсинга
+        logger.error(f"S7 search failed: {e!r}")
+        raise HTTPException(status_code=502, detail="Не удалось получить рейсы S7")
@@ -11,8 +11,26 @@ class S7SearchRequest(BaseModel):
     date_back: Optional[str] = Field(None, description="Дата возврата в формате ДД.ММ.ГГГГ или null")
 
 
+class S7Segment(BaseModel):
+    flight_no: str
+    origin: str = ""
+    destination: str = ""
+    dep_date: str = ""  # ГГГГ-ММ-ДД
+    dep_time: str
+    arr_date: str = ""
+    arr_time: str
+
+
+class S7Fare(BaseModel):
+    name: str = ""
+    price_rub: int
+
+
 class S7Flight(BaseModel):
     flight_no: str
     dep_time: str
     arr_time: str
     price_rub: int
+    # есть, только если выдача разобрана из JSON-ответов IBE (не из DOM)
+    segments: List[S7Segment] = []
+    fares: List[S7Fare] = []
@@ -1,79 +1,208 @@
-from typing import List, Optional, Dict, Any
+from contextvars import ContextVar
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, date, timedelta
-from app.utils.gars_client import GARSClient
-from app.utils.cache import cache_service
-from app.models.route_models import Route, RouteSegment, TransportType
+from app.logging_config import logger
+from app.utils.gars_client import (
+    GARSClient, GARSError, GARSUnavailableError,
+    ROUTE_FIELDS, ROUTE_SYNC_FIELDS, ROUTE_VERSION_FIELDS, TIMETABLE_FIELDS,
+)
+from app.utils.cache import (
+    CACHE_TTL_EMPTY,
+    CACHE_TTL_ERROR,
+    NEGATIVE_EMPTY,
+    NEGATIVE_ERROR,
+    CachedError,
+    cache_service,
+    route_tag,
+    versioned_key,
+)
+from app.utils.cache_decorators import cached
+from app.utils.singleflight import SingleFlight
+from app.models.route_models import Route, RouteSegment, RouteStatus, SyncState, TransportType
+from app.services.route_service import RouteService
 from app.schemas.route_schemas import RouteSearchRequest
-import json
+from sqlalchemy import func
+import hashlib
 import os
+import time
+
+# Теги кэшей 1С: весь провайдер и каталог маршрутов
+GARS_TAG = "gars"
+GARS_ROUTES_TAG = "gars:routes"
+
+# Время свежести каталога маршрутов в кэше
+ROUTES_CACHE_TTL = int(os.getenv("CACHE_TTL_ROUTES", "3600"))
+
+# Сколько держится блокировка фонового обновления расписаний
+TIMETABLE_REFRESH_LOCK_TTL = 60
+
+# Возраст (в секундах) самых старых «запасных» данных, отданных в текущем
+# запросе вместо ответа 1С. None — все данные свежие.
+_stale_age: ContextVar[Optional[float]] = ContextVar("gars_stale_age", default=None)
+
+
+def get_stale_age() -> Optional[float]:
+    """Возраст устаревших данных 1С, отданных в рамках текущего запроса."""
+    return _stale_age.get()
+
+
+def _mark_stale(age: float) -> None:
+    current = _stale_age.get()
+    _stale_age.set(age if current is None else max(current, age))
+
 
 class GARSService:
-    def __init__(self):
-        self.client = GARSClient()
+    def __init__(self, client: Optional[GARSClient] = None):
+        # Клиент с общим пулом соединений; по умолчанию — свой собственный
+        self.client = client or GARSClient()
+        # Одновременные промахи по одному ключу кэша заполняют его один раз
+        self.flight = SingleFlight("gars_service")
+
+    async def startup(self) -> None:
+        await self.client.startup()
+
+    async def close(self) -> None:
+        await self.client.close()
     
-    async def sync_routes(self, db) -> bool:
-        """Синхронизация маршрутов с 1С"""
+    async def sync_routes(self, db) -> Optional[Dict[str, Any]]:
+        """
+        Инкрементальная синхронизация маршрутов с 1С.
+
+        1) Из Catalog_Маршруты читаются только Ref_Key/DataVersion/DeletionMark.
+        2) Если отпечаток версий совпал с водяным знаком прошлой синхронизации —
+           ничего не делаем.
+        3) Полные записи запрашиваются только для новых/изменённых маршрутов
+           и пишутся в БД пачками через INSERT ... ON CONFLICT DO UPDATE.
+        4) Удалённые в 1С (или помеченные на удаление) маршруты становятся inactive.
+
+        Возвращает статистику синхронизации или None при ошибке.
+        """
         try:
-            routes_data = await self.client.get_routes()
-            if not routes_data:
-                return False
-            
-            for route_data in routes_data:
-                # Обработка и сохранение маршрута в БД
-                route = Route(
-                    gars_id=route_data.get("Ref_Key"),
-                    code=route_data.get("Code"),
-                    name=route_data.get("Description"),
-                    description=route_data.get("Комментарий", "")
+            local_versions: Dict[str, Optional[str]] = {}
+            inactive: set = set()
+            for gars_id, version, status in (
+                db.query(Route.gars_id, Route.gars_data_version, Route.status)
+                .filter(Route.gars_id.isnot(None))
+            ):
+                local_versions[gars_id] = version
+                if status != RouteStatus.ACTIVE:
+                    inactive.add(gars_id)
+
+            # Помеченные на удаление в 1С считаем удалёнными
+            remote_versions: Dict[str, str] = {}
+            async for record in self.client.iter_routes(select=ROUTE_VERSION_FIELDS):
+                ref_key = record.get("Ref_Key")
+                if ref_key and not record.get("DeletionMark"):
+                    remote_versions[ref_key] = record.get("DataVersion") or ""
+
+            watermark = self._versions_fingerprint(remote_versions)
+            state = db.query(SyncState).filter(SyncState.name == "gars_routes").first()
+            if state is None:
+                state = SyncState(name="gars_routes")
+                db.add(state)
+
+            # новые, изменённые и вернувшиеся в 1С после удаления
+            changed = [
+                ref_key for ref_key, version in remote_versions.items()
+                if local_versions.get(ref_key) != version or ref_key in inactive
+            ]
+            removed = [
+                ref_key for ref_key in local_versions
+                if ref_key not in remote_versions and ref_key not in inactive
+            ]
+
+            if state.watermark == watermark and not changed and not removed:
+                state.last_synced_at = func.now()
+                db.commit()
+                return {"total": len(remote_versions), "changed": 0, "deactivated": 0}
+
+            route_service = RouteService(db)
+            batch_size = int(os.getenv("GARS_SYNC_BATCH_SIZE", "500"))
+            batch: List[Dict[str, Any]] = []
+            async for route_data in self.client.iter_routes_by_keys(changed, select=ROUTE_SYNC_FIELDS):
+                batch.append(self._route_row(route_data))
+                if len(batch) >= batch_size:
+                    route_service.bulk_upsert_routes(batch, commit=False)
+                    batch = []
+            if batch:
+                route_service.bulk_upsert_routes(batch, commit=False)
+
+            deactivated = 0
+            if removed:
+                deactivated = (
+                    db.query(Route)
+                    .filter(Route.gars_id.in_(removed))
+                    .update({Route.status: RouteStatus.INACTIVE}, synchronize_session=False)
                 )
-                db.add(route)
-            
+
+            state.watermark = watermark
+            state.last_synced_at = func.now()
+            state.records_total = len(remote_versions)
+            state.records_changed = len(changed)
+            state.records_deactivated = deactivated
             db.commit()
-            return True
+
+            if changed or deactivated:
+                # каталог и всё, что зависит от изменённых/удалённых маршрутов
+                await cache_service.invalidate_tags(
+                    GARS_ROUTES_TAG, *[route_tag(ref_key) for ref_key in changed + removed]
+                )
+
+            return {"total": len(remote_versions), "changed": len(changed), "deactivated": deactivated}
         except Exception as e:
-            print(f"Error syncing routes: {e}")
+            logger.error(f"Error syncing routes: {e}")
             db.rollback()
-            return False
-    
+            return None
+
+    @staticmethod
+    def _versions_fingerprint(versions: Dict[str, str]) -> str:
+        """Отпечаток каталога: хэш отсортированных пар Ref_Key/DataVersion."""
+        digest = hashlib.sha1()
+        for ref_key in sorted(versions):
+            digest.update(f"{ref_key}:{versions[ref_key]};".encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _route_row(route_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "gars_id": route_data.get("Ref_Key"),
+            "code": route_data.get("Code"),
+            "name": route_data.get("Description"),
+            "description": route_data.get("Комментарий", ""),
+            "gars_data_version": route_data.get("DataVersion"),
+            "status": RouteStatus.ACTIVE,
+        }
+
+    @staticmethod
+    def _route_tags(route_id: str) -> Tuple[str, str]:
+        return GARS_TAG, route_tag(route_id)
+
+    @cached("schedule", ttl=1800, tags=lambda self, route_id, *_: self._route_tags(route_id))
     async def get_route_schedule_with_cache(self, route_id: str, start_date: date, end_date: date) -> Optional[List[Dict]]:
-        """Получение расписания с кэшированием"""
-        cache_key = f"schedule:{route_id}:{start_date}:{end_date}"
-        
-        # Попытка получить из кэша
-        cached_data = await cache_service.get(cache_key)
-        if cached_data:
-            return json.loads(cached_data)
-        
-        # Получение из 1С
+        """Получение расписания с кэшированием (30 минут; пустое не кэшируется)"""
         schedule_data = await self.client.get_route_schedule(route_id, start_date, end_date)
-        if schedule_data:
-            # Сохранение в кэш на 30 минут
-            await cache_service.set(cache_key, json.dumps(schedule_data), ttl=1800)
-        
-        return schedule_data
+        return schedule_data or None
     
     async def search_multimodal_routes(self, search_request: RouteSearchRequest) -> List[Dict[str, Any]]:
         """Поиск мультимодальных маршрутов"""
         # Логика поиска комбинаций маршрутов
         # Это сложная логика, которая должна комбинировать разные типы транспорта
         
-        routes = []
+        matched: List[Dict[str, Any]] = []
         
-        # Получение всех активных маршрутов
-        all_routes = await self.client.get_routes()
-        if not all_routes:
-            return routes
-        
-        # Фильтрация по типу транспорта и маршруту
-        for route_data in all_routes:
-            # Здесь должна быть логика поиска комбинаций
-            # Пока простой пример фильтрации
-            if self._matches_route_criteria(route_data, search_request):
-                route_info = await self._enrich_route_info(route_data, search_request)
-                if route_info:
-                    routes.append(route_info)
+        # Обходим активные маршруты постранично и фильтруем на лету
+        try:
+            async for route_data in self.client.iter_routes(select=ROUTE_FIELDS):
+                # Здесь должна быть логика поиска комбинаций
+                # Пока простой пример фильтрации
+                if self._matches_route_criteria(route_data, search_request) and route_data.get("Ref_Key"):
+                    matched.append(route_data)
+        except GARSError as e:
+            logger.error(f"Error searching routes: {e}")
         
-        return routes
+        if not matched:
+            return []
+        return await self._enrich_routes_info(matched, search_request)
     
     def _matches_route_criteria(self, route_data: Dict, search_request: RouteSearchRequest) -> bool:
         """Проверка соответствия маршрута критериям поиска"""
@@ -84,82 +213,365 @@ class GARSService:
         
         return departure in route_name and arrival in route_name
     
-    async def _enrich_route_info(self, route_data: Dict, search_request: RouteSearchRequest) -> Optional[Dict[str, Any]]:
-        """Обогащение информацией о маршруте"""
-        route_id = route_data.get("Ref_Key")
-        if not route_id:
-            return None
-        
-        # Получение расписания
-        schedule = await self.get_route_schedule_with_cache(
-            route_id, 
-            search_request.departure_date,
-            search_request.departure_date + timedelta(days=7)
+    async def _enrich_routes_info(
+        self, routes_data: List[Dict], search_request: RouteSearchRequest
+    ) -> List[Dict[str, Any]]:
+        """
+        Обогащение маршрутов расписанием, ценами и занятостью мест.
+
+        Все чтения по всем маршрутам уходят в 1С одним $batch
+        (расписание — только для тех маршрутов, которых нет в кэше);
+        кэш расписаний читается одним MGET и пополняется одним pipeline.
+        Устаревшие расписания отдаются сразу и обновляются в фоне
+        (как в get_routes_timetables_with_cache).
+        """
+        start_date = search_request.departure_date
+        end_date = start_date + timedelta(days=7)
+
+        # ключи кэша — те же, что у get_route_schedule_with_cache
+        schedule_cache = GARSService.get_route_schedule_with_cache
+        versions = await cache_service.tag_versions(
+            tag for route_data in routes_data for tag in self._route_tags(route_data["Ref_Key"])
         )
-        
-        # Получение цен
-        prices = await self.client.get_prices(route_id, search_request.departure_date)
-        
-        # Проверка доступности мест
-        availability = await self.client.check_seats_availability(route_id, search_request.departure_date)
-        
-        return {
-            "route_data": route_data,
-            "schedule": schedule or [],
-            "prices": prices or [],
-            "availability": availability or {},
-            "min_price": min([p.get("Price", 0) for p in prices]) if prices else 0
+        schedule_keys = {
+            route_data["Ref_Key"]: versioned_key(
+                schedule_cache.base_key(self, route_data["Ref_Key"], start_date, end_date),
+                self._route_tags(route_data["Ref_Key"]),
+                versions,
+            )
+            for route_data in routes_data
         }
+        # все расписания из кэша — одним MGET
+        cached_schedules = await cache_service.get_swr_many(list(schedule_keys.values()))
+        schedules: Dict[str, Optional[List[Dict]]] = {}
+        requests = []
+        refresh: Dict[str, str] = {}
+        for route_data in routes_data:
+            route_id = route_data["Ref_Key"]
+            cached_schedule, stale = cached_schedules.get(schedule_keys[route_id], (None, False))
+            if isinstance(cached_schedule, list) and cached_schedule:
+                schedules[route_id] = cached_schedule
+                if stale:
+                    token = await cache_service.acquire_lock(schedule_keys[route_id], TIMETABLE_REFRESH_LOCK_TTL)
+                    if token is not None:
+                        refresh[route_id] = token
+            else:
+                requests.append(self.client.schedule_request(route_id, start_date, end_date))
+            requests.append(self.client.prices_request(route_id, start_date))
+            requests.append(self.client.seats_request(route_id, start_date))
+
+        if refresh:
+            cache_service.run_in_background(self._refresh_schedules(refresh, schedule_keys, start_date, end_date))
+
+        try:
+            batch_results = await self.client.batch_get(requests)
+        except GARSUnavailableError as e:
+            logger.error(f"Error enriching routes: {e}")
+            batch_results = [None] * len(requests)
+        results = iter(batch_results)
+
+        enriched: List[Dict[str, Any]] = []
+        fetched_schedules: Dict[str, List[Dict]] = {}
+        for route_data in routes_data:
+            route_id = route_data["Ref_Key"]
+            if route_id not in schedules:
+                schedules[route_id] = next(results)
+                if schedules[route_id]:
+                    fetched_schedules[schedule_keys[route_id]] = schedules[route_id]
+            prices = next(results)
+            availability = next(results)
+
+            enriched.append({
+                "route_data": route_data,
+                "schedule": schedules[route_id] or [],
+                "prices": prices or [],
+                "availability": availability or {},
+                "min_price": min([p.get("Price", 0) for p in prices]) if prices else 0
+            })
+        if fetched_schedules:
+            # новые расписания — в кэш одним pipeline
+            await cache_service.set_swr_many(fetched_schedules, schedule_cache.ttl)
+        return enriched
         
+    @staticmethod
+    def find_bus_route(routes: List[Dict[str, Any]], point_a: str, point_b: str) -> Optional[Dict[str, Any]]:
+        """
+        Ищем маршрут 1С, в описании которого есть обоих пункта (независимо от порядка).
+        Пример: 'Якутск Автовокзал — Чурапча с.' или 'Чурапча с. — Якутск Автовокзал'.
+        """
+        a = point_a.lower()
+        b = point_b.lower()
+
+        for r in routes:
+            desc = (r.get("Description") or "").lower()
+            if a in desc and b in desc:
+                return r
+        return None
+
+    @staticmethod
+    def _is_actual_route(r: Dict[str, Any]) -> bool:
+        desc = (r.get("Description") or "")
+
+        # 1) убираем '2024' и 'Тест'
+        if "2024" in desc or "Тест" in desc:
+            return False
+
+        # 2) убираем старые маршруты с суффиксом ' С' в конце (большая русская "С")
+        if desc.strip().endswith("С"):
+            return False
+
+        return True
+
     async def get_filtered_routes_cached(self) -> List[Dict[str, Any]]:
         """
         Маршруты из 1С с кэшированием.
 
+        Из 1С запрашиваются и кэшируются только поля ROUTE_FIELDS.
+
         Фильтр:
         - выкидываем старые с суффиксом ' С' в описании (пример: 'Сангар - Якутск С')
         - выкидываем те, где в Description есть '2024' или 'Тест'
         """
-        cache_key = "gars:routes:filtered"
-        cached = await cache_service.get_json(cache_key)
-        if cached is not None:
-            return cached
-
-        routes_data = await self.client.get_routes()
-        if not routes_data:
-            return []
+        try:
+            return await self._filtered_routes()
+        except (GARSError, CachedError) as e:
+            # CachedError — ошибка 1С, запомненная на CACHE_TTL_ERROR секунд
+            logger.error(f"Error loading routes: {e}")
+            stale = await self._get_stale(self._filtered_routes.base_key(self))
+            if stale is None:
+                return []
+            filtered, age = stale
+            _mark_stale(age)
+            return filtered
 
+    # Просроченный каталог отдаётся сразу и обновляется в фоне;
+    # синхронизация маршрутов сбрасывает его через тег GARS_ROUTES_TAG.
+    # Пустой каталог и ошибки 1С кэшируются ненадолго (негативный кэш)
+    @cached(
+        "gars:routes",
+        ttl=ROUTES_CACHE_TTL,
+        key=lambda self: ("filtered",),
+        tags=lambda self: (GARS_TAG, GARS_ROUTES_TAG),
+        empty_ttl=CACHE_TTL_EMPTY,
+        error_ttl=CACHE_TTL_ERROR,
+    )
+    async def _filtered_routes(self) -> List[Dict[str, Any]]:
+        # Фильтруем постранично, не держа в памяти весь каталог
         filtered: List[Dict[str, Any]] = []
-        for r in routes_data:
-            desc = (r.get("Description") or "")
+        async for r in self.client.iter_routes(select=ROUTE_FIELDS):
+            if self._is_actual_route(r):
+                filtered.append(r)
 
-            # 1) убираем '2024' и 'Тест'
-            if "2024" in desc or "Тест" in desc:
-                continue
+        await self._set_stale(self._filtered_routes.base_key(self), filtered)
+        return filtered
 
-            # 2) убираем старые маршруты с суффиксом ' С' в конце (большая русская "С")
-            if desc.strip().endswith("С"):
+    async def get_route_timetables_with_cache(self, route_id: str) -> List[Dict[str, Any]]:
+        """
+        Расписания рейсов из Catalog_РейсыРасписания по маршруту (с кэшем).
+
+        Из 1С запрашиваются и кэшируются только поля TIMETABLE_FIELDS.
+        """
+        timetables = await self.get_routes_timetables_with_cache([route_id])
+        return timetables[route_id]
+
+    async def get_routes_timetables_with_cache(self, route_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Расписания рейсов сразу по нескольким маршрутам (с кэшем).
+
+        Маршруты, которых нет в кэше, запрашиваются из 1С одним $batch.
+        Устаревшие расписания отдаются сразу; их обновление уходит в фон
+        (по маршруту его забирает ровно один воркер — под Redis-блокировкой).
+        Пустые расписания и недоступность 1С кэшируются ненадолго
+        (CACHE_TTL_EMPTY / CACHE_TTL_ERROR), чтобы не дёргать 1С на каждый запрос.
+        """
+        route_ids = list(dict.fromkeys(route_ids))
+        keys = await self.timetable_cache_keys(route_ids)
+
+        # все расписания из кэша — одним MGET
+        found = await cache_service.get_swr_many(list(keys.values()))
+
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        missing: List[str] = []
+        refresh: Dict[str, str] = {}
+        for route_id in route_ids:
+            cache_key = keys[route_id]
+            if cache_key not in found:
+                missing.append(route_id)
                 continue
+            timetables, stale = found[cache_key]
+            if isinstance(timetables, CachedError):
+                # 1С недавно был недоступен — запасная копия без похода в 1С
+                timetables, age = await self._get_stale(f"gars:timetable:{route_id}") or ([], None)
+                if age is not None:
+                    _mark_stale(age)
+            result[route_id] = timetables
+            if stale:
+                token = await cache_service.acquire_lock(cache_key, TIMETABLE_REFRESH_LOCK_TTL)
+                if token is not None:
+                    refresh[route_id] = token
 
-            filtered.append(r)
+        if refresh:
+            cache_service.run_in_background(self._refresh_timetables(refresh, keys))
 
-        ttl = int(os.getenv("CACHE_TTL_ROUTES", "3600"))
-        await cache_service.set_json(cache_key, filtered, expire=ttl)
-        return filtered
+        if missing:
+            fetched = await self.flight.do(
+                "gars:timetable:" + ",".join(sorted(keys[route_id] for route_id in missing)),
+                lambda: self._load_timetables(missing, keys, cache_errors=True),
+            )
+            for route_id, (timetables, age) in fetched.items():
+                result[route_id] = timetables
+                if age is not None:
+                    _mark_stale(age)
 
-    async def get_route_timetables_with_cache(self, route_id: str) -> List[Dict[str, Any]]:
+        return result
+
+    async def timetable_cache_keys(self, route_ids: List[str]) -> Dict[str, str]:
+        """Ключи кэша расписаний (с версиями тегов маршрутов): route_id -> ключ."""
+        versions = await cache_service.tag_versions(
+            tag for route_id in route_ids for tag in self._route_tags(route_id)
+        )
+        return {
+            route_id: versioned_key(f"gars:timetable:{route_id}", self._route_tags(route_id), versions)
+            for route_id in route_ids
+        }
+
+    # ---------- прогрев кэша (app/services/prewarm_service.py) ----------
+
+    async def warm_filtered_routes(self, min_fresh: float) -> List[Dict[str, Any]]:
+        """Каталог маршрутов; перезапрашивается из 1С, если в кэше он свеж меньше min_fresh секунд."""
+        key = await self._filtered_routes.cache_key(self)
+        if (await cache_service.fresh_for_many([key])).get(key, 0) >= min_fresh:
+            return await self.get_filtered_routes_cached()
+        return await self._filtered_routes.refresh(self)
+
+    async def warm_timetables(self, route_ids: List[str], min_fresh: float) -> int:
+        """Перезапрос (одним $batch) расписаний, которые в кэше свежи меньше min_fresh секунд."""
+        keys = await self.timetable_cache_keys(list(dict.fromkeys(route_ids)))
+        fresh = await cache_service.fresh_for_many(list(keys.values()))
+        due = [route_id for route_id, key in keys.items() if fresh.get(key, 0) < min_fresh]
+        if due:
+            await self._load_timetables(due, keys)
+        return len(due)
+
+    async def _load_timetables(
+        self, route_ids: List[str], keys: Dict[str, str], cache_errors: bool = False
+    ) -> Dict[str, Tuple[List[Dict[str, Any]], Optional[float]]]:
         """
-        Расписания рейсов из Catalog_РейсыРасписания по маршруту (с кэшем).
+        Запрос расписаний из 1С и запись в кэш. cache_errors — запомнить
+        недоступность 1С в негативном кэше; только для ключей, которых
+        в кэше нет, иначе ошибка затёрла бы устаревшие, но годные расписания.
         """
-        cache_key = f"gars:timetable:{route_id}"
-        cached = await cache_service.get_json(cache_key)
-        if cached is not None:
-            return cached
+        try:
+            fetched = await self.client.get_route_timetables_many(route_ids, select=TIMETABLE_FIELDS)
+        except GARSUnavailableError as e:
+            logger.error(f"Error loading timetables: {e}")
+            return await self._timetables_failed(route_ids, keys, str(e), cache_errors)
 
-        timetables = await self.client.get_route_timetables(route_id) or []
+        # None — запрос по маршруту не удался (4xx, некорректный ответ), [] — рейсов нет
+        failed = [route_id for route_id in route_ids if fetched.get(route_id) is None]
+        result = (
+            await self._timetables_failed(failed, keys, "1С не вернул расписание", cache_errors)
+            if failed else {}
+        )
 
         ttl = int(os.getenv("CACHE_TTL_SCHEDULE", "1800"))
-        if timetables:
-            await cache_service.set_json(cache_key, timetables, expire=ttl)
+        to_cache: Dict[str, List[Dict[str, Any]]] = {}
+        empty: Dict[str, List[Dict[str, Any]]] = {}
+        for route_id in route_ids:
+            if route_id in result:
+                continue
+            timetables = fetched[route_id]
+            if timetables:
+                to_cache[keys[route_id]] = timetables
+                await self._set_stale(f"gars:timetable:{route_id}", timetables)
+            else:
+                empty[keys[route_id]] = timetables
+            result[route_id] = (timetables, None)
+        await cache_service.set_swr_many(to_cache, ttl)
+        await cache_service.set_negative_many(empty, NEGATIVE_EMPTY, CACHE_TTL_EMPTY)
+        return result
+
+    async def _timetables_failed(
+        self, route_ids: List[str], keys: Dict[str, str], error: str, cache_errors: bool
+    ) -> Dict[str, Tuple[List[Dict[str, Any]], Optional[float]]]:
+        """Расписания не получены: последние удачные (если есть) и, при cache_errors, негативная запись об ошибке."""
+        result: Dict[str, Tuple[List[Dict[str, Any]], Optional[float]]] = {}
+        for route_id in route_ids:
+            stale = await self._get_stale(f"gars:timetable:{route_id}")
+            result[route_id] = stale if stale is not None else ([], None)
+        if cache_errors:
+            await cache_service.set_negative_many(
+                {keys[route_id]: None for route_id in route_ids}, NEGATIVE_ERROR, CACHE_TTL_ERROR, error=error
+            )
+        return result
+
+    async def _refresh_timetables(self, tokens: Dict[str, str], keys: Dict[str, str]) -> None:
+        """Фоновое обновление устаревших расписаний; tokens — route_id -> токен блокировки."""
+        try:
+            await self._load_timetables(list(tokens), keys)
+        except Exception as e:
+            logger.error(f"Error refreshing timetables: {e}")
+        finally:
+            for route_id, token in tokens.items():
+                await cache_service.release_lock(keys[route_id], token)
+
+    async def _refresh_schedules(
+        self, tokens: Dict[str, str], keys: Dict[str, str], start_date: date, end_date: date
+    ) -> None:
+        """
+        Фоновое обновление устаревших расписаний (_enrich_routes_info) одним $batch;
+        tokens — route_id -> токен блокировки. Неудачное — оставляет устаревшее в кэше.
+        """
+        route_ids = list(tokens)
+        try:
+            fetched = await self.client.batch_get(
+                [self.client.schedule_request(route_id, start_date, end_date) for route_id in route_ids]
+            )
+            fresh = {keys[route_id]: schedule for route_id, schedule in zip(route_ids, fetched) if schedule}
+            await cache_service.set_swr_many(fresh, GARSService.get_route_schedule_with_cache.ttl)
+        except Exception as e:
+            logger.error(f"Error refreshing schedules: {e}")
+        finally:
+            for route_id, token in tokens.items():
+                await cache_service.release_lock(keys[route_id], token)
+
+    # ---------- запасная копия на случай недоступности 1С ----------
+
+    @staticmethod
+    def _stale_key(cache_key: str) -> str:
+        return f"{cache_key}:stale"
+
+    async def _set_stale(self, cache_key: str, value: Any) -> None:
+        """Последний удачный ответ 1С; живёт гораздо дольше основного кэша."""
+        ttl = int(os.getenv("GARS_STALE_TTL", str(7 * 24 * 3600)))
+        await cache_service.set_json(
+            self._stale_key(cache_key),
+            {"stored_at": time.time(), "value": value},
+            expire=ttl,
+        )
+
+    async def _get_stale(self, cache_key: str) -> Optional[Tuple[Any, float]]:
+        """(значение, возраст в секундах) последнего удачного ответа или None."""
+        stale = await cache_service.get_json(self._stale_key(cache_key))
+        if not stale:
+            return None
+        age = max(0.0, time.time() - stale.get("stored_at", 0))
+        logger.warning(f"Serving stale GARS data for {cache_key} (age {int(age)}s)")
+        return stale.get("value"), age
+
+
+    def breaker_stats(self) -> Dict[str, Any]:
+        """Состояние circuit breaker клиента 1С."""
+        return self.client.breaker.stats()
+
+    def flight_stats(self) -> Dict[str, Any]:
+        """Статистика склейки запросов (сколько вызовов не дошло до 1С)."""
+        return {
+            "service": self.flight.stats(),
+            "client": self.client.flight.stats(),
+        }
 
-        return timetables
 
+# Глобальный экземпляр сервиса: живёт всё время работы приложения,
+# пул соединений к 1С открывается/закрывается в lifespan (app/main.py)
+gars_service = GARSService()
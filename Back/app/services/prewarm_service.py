@@ -0,0 +1,260 @@
+"""
+Прогрев кэша для популярных направлений (Celery beat, очередь prewarm).
+
+Популярность направления — сумма поисков за PREWARM_HISTORY_DAYS дней
+(журнал поисков в Redis, см. record_search) и бронирований за тот же
+период с весом PREWARM_BOOKING_WEIGHT. Для PREWARM_TOP_N направлений на
+PREWARM_DAYS дней вперёд заранее обновляются:
+
+- каталог маршрутов 1С (gars:routes:filtered);
+- расписания автобусных маршрутов направления (одним $batch);
+- списки рейсов S7 для перелётных плеч, а при PREWARM_INCLUDE_RETURN —
+  и обратных: на дату вылета плюс PREWARM_RETURN_OFFSETS самых частых
+  длительностей поездки по направлению из того же журнала.
+
+Обновляются только записи, которым осталось быть свежими меньше
+PREWARM_REFRESH_AHEAD секунд. Бюджеты — PREWARM_MAX_S7_SCRAPES парсингов
+и PREWARM_TIME_BUDGET секунд на запуск. Сама задача идёт в отдельной
+очереди с одним воркером; парсинги S7 она по одному отдаёт воркерам S7
+(задача parse_s7_flights) — с постоянным браузером, а не новым Chromium
+на каждое плечо.
+"""
+
+import asyncio
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from app.database import SessionLocal
+from app.logging_config import logger
+from app.models.route_models import Booking, Route
+from app.services.gars_service import gars_service
+from app.services.s7_service import fetch_s7_flights, get_s7_flights
+from app.utils.cache import cache_service
+from app.utils.gars_client import GARSError
+
+# Журнал поисков: по сортированному множеству на день, элемент — "откуда|куда"
+SEARCH_LOG_PREFIX = "stats:searches:"
+# Длительности поездок туда-обратно: элемент — "откуда|куда|дней между датами"
+STAY_LOG_PREFIX = "stats:stays:"
+
+# Транзитный город для мультимодальных цепочек самолёт + автобус
+HUB_CITY = "Якутск"
+
+
+def _normalize_city(city: str) -> str:
+    return " ".join(city.split()).lower()
+
+
+def _search_log_key(day: date) -> str:
+    return f"{SEARCH_LOG_PREFIX}{day.isoformat()}"
+
+
+def _stay_log_key(day: date) -> str:
+    return f"{STAY_LOG_PREFIX}{day.isoformat()}"
+
+
+async def record_search(
+    origin: str,
+    destination: str,
+    departure_date: Optional[date] = None,
+    return_date: Optional[date] = None,
+) -> None:
+    """
+    Учёт поиска направления в журнале популярности (ошибки не мешают поиску).
+    Для поисков туда-обратно запоминается и длительность поездки в днях.
+    """
+    today = date.today()
+    member = f"{_normalize_city(origin)}|{_normalize_city(destination)}"
+    history_days = int(os.getenv("PREWARM_HISTORY_DAYS", "7"))
+    expire = (history_days + 1) * 24 * 3600
+    try:
+        async with cache_service.redis_client.pipeline(transaction=False) as pipe:
+            pipe.zincrby(_search_log_key(today), 1, member)
+            pipe.expire(_search_log_key(today), expire)
+            if departure_date and return_date and return_date >= departure_date:
+                pipe.zincrby(_stay_log_key(today), 1, f"{member}|{(return_date - departure_date).days}")
+                pipe.expire(_stay_log_key(today), expire)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Search log error: {e}")
+
+
+def _booking_counts(db, since: datetime) -> Dict[Tuple[str, str], int]:
+    """Бронирования по направлениям; направление берётся из имени маршрута 'Откуда — Куда'."""
+    counts: Dict[Tuple[str, str], int] = {}
+    rows = (
+        db.query(Route.name, func.count(Booking.id))
+        .join(Booking, Booking.route_id == Route.id)
+        .filter(Booking.created_at >= since)
+        .group_by(Route.name)
+        .all()
+    )
+    for name, count in rows:
+        origin, sep, destination = (name or "").partition(" — ")
+        if sep and origin and destination:
+            pair = (_normalize_city(origin), _normalize_city(destination))
+            counts[pair] = counts.get(pair, 0) + count
+    return counts
+
+
+async def top_pairs(db, limit: int) -> List[Tuple[str, str]]:
+    """Самые популярные направления (откуда, куда) по поискам и бронированиям."""
+    history_days = int(os.getenv("PREWARM_HISTORY_DAYS", "7"))
+    booking_weight = float(os.getenv("PREWARM_BOOKING_WEIGHT", "5"))
+    today = date.today()
+
+    scores: Dict[Tuple[str, str], float] = defaultdict(float)
+    try:
+        async with cache_service.redis_client.pipeline(transaction=False) as pipe:
+            for i in range(history_days):
+                pipe.zrevrange(_search_log_key(today - timedelta(days=i)), 0, limit * 5 - 1, withscores=True)
+            for day_top in await pipe.execute():
+                for member, score in day_top:
+                    origin, _, destination = member.decode("utf-8").partition("|")
+                    if origin and destination:
+                        scores[(origin, destination)] += score
+    except Exception as e:
+        logger.warning(f"Search log read error: {e}")
+
+    since = datetime.combine(today - timedelta(days=history_days), datetime.min.time())
+    for pair, count in _booking_counts(db, since).items():
+        scores[pair] += count * booking_weight
+
+    return [pair for pair, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]]
+
+
+async def stay_offsets(pairs: List[Tuple[str, str]], per_pair: int) -> Dict[Tuple[str, str], List[int]]:
+    """Самые частые длительности поездки (дней) по направлениям из журнала поисков."""
+    history_days = int(os.getenv("PREWARM_HISTORY_DAYS", "7"))
+    today = date.today()
+    wanted = set(pairs)
+
+    counts: Dict[Tuple[str, str], Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+    try:
+        async with cache_service.redis_client.pipeline(transaction=False) as pipe:
+            for i in range(history_days):
+                pipe.zrange(_stay_log_key(today - timedelta(days=i)), 0, -1, withscores=True)
+            for day_stays in await pipe.execute():
+                for member, score in day_stays:
+                    origin, _, rest = member.decode("utf-8").partition("|")
+                    destination, _, days = rest.rpartition("|")
+                    if (origin, destination) in wanted and days.isdigit():
+                        counts[(origin, destination)][int(days)] += score
+    except Exception as e:
+        logger.warning(f"Stay log read error: {e}")
+
+    return {
+        pair: [days for days, _ in sorted(by_days.items(), key=lambda item: item[1], reverse=True)[:per_pair]]
+        for pair, by_days in counts.items()
+    }
+
+
+def _bus_routes(routes: List[Dict[str, Any]], destination: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """Автобусные маршруты Якутск -> destination и обратно — как в поиске (routers/routes.py)."""
+    hub = HUB_CITY.lower()
+    out = (
+        gars_service.find_bus_route(routes, f"{hub} автовокзал", destination)
+        or gars_service.find_bus_route(routes, hub, destination)
+    )
+    back = (
+        gars_service.find_bus_route(routes, destination, f"{hub} автовокзал")
+        or gars_service.find_bus_route(routes, destination, hub)
+    )
+    return out, back
+
+
+async def prewarm_cache(db) -> Dict[str, Any]:
+    """Один прогон прогрева; возвращает статистику."""
+    top_n = int(os.getenv("PREWARM_TOP_N", "10"))
+    days = int(os.getenv("PREWARM_DAYS", "3"))
+    ahead = float(os.getenv("PREWARM_REFRESH_AHEAD", "900"))
+    max_scrapes = int(os.getenv("PREWARM_MAX_S7_SCRAPES", "10"))
+    time_budget = float(os.getenv("PREWARM_TIME_BUDGET", "600"))
+    include_return = os.getenv("PREWARM_INCLUDE_RETURN", "1") == "1"
+    return_offsets = int(os.getenv("PREWARM_RETURN_OFFSETS", "2"))
+
+    started = time.monotonic()
+    stats: Dict[str, Any] = {"pairs": 0, "timetables_refreshed": 0, "s7_refreshed": 0, "s7_skipped": 0}
+
+    pairs = await top_pairs(db, top_n)
+    stats["pairs"] = len(pairs)
+    if not pairs:
+        return stats
+
+    # 1. Каталог маршрутов и расписания автобусов направлений
+    routes: List[Dict[str, Any]] = []
+    try:
+        routes = await gars_service.warm_filtered_routes(ahead)
+    except GARSError as e:
+        logger.error(f"Prewarm: routes not refreshed: {e}")
+
+    route_ids: List[str] = []
+    has_bus: Dict[Tuple[str, str], bool] = {}
+    for origin, destination in pairs:
+        out, back = _bus_routes(routes, destination)
+        has_bus[(origin, destination)] = out is not None
+        route_ids += [r["Ref_Key"] for r in (out, back) if r is not None and r.get("Ref_Key")]
+    if route_ids:
+        stats["timetables_refreshed"] = await gars_service.warm_timetables(route_ids, ahead)
+
+    # 2. Плечи S7 в порядке популярности направлений, ближайшие даты первыми.
+    # Обратное плечо ищут на дату возвращения, поэтому оно прогревается на
+    # дату вылета плюс типичную для направления длительность поездки
+    stays = await stay_offsets(pairs, return_offsets) if include_return else {}
+    legs: List[Tuple[str, str, date]] = []
+    for day in (date.today() + timedelta(days=i) for i in range(days)):
+        for origin, destination in pairs:
+            if has_bus[(origin, destination)]:
+                if origin.startswith(HUB_CITY.lower()):
+                    continue
+                leg = (origin, HUB_CITY.lower())
+            else:
+                leg = (origin, destination)
+            legs.append((leg[0], leg[1], day))
+            for stay in stays.get((origin, destination), []):
+                legs.append((leg[1], leg[0], day + timedelta(days=stay)))
+    legs = list(dict.fromkeys(legs))
+
+    keys = await get_s7_flights.cache_keys(legs)
+    fresh = await cache_service.fresh_for_many(keys)
+    for leg, key in zip(legs, keys):
+        if fresh.get(key, 0) >= ahead:
+            continue
+        if stats["s7_refreshed"] >= max_scrapes or time.monotonic() - started >= time_budget:
+            stats["s7_skipped"] += 1
+            continue
+        try:
+            flights = await fetch_s7_flights(*leg)
+        except Exception as e:
+            logger.error(f"Prewarm: S7 {leg} not refreshed: {e}")
+            continue
+        await get_s7_flights.store(flights, *leg)
+        stats["s7_refreshed"] += 1
+
+    stats["seconds"] = round(time.monotonic() - started, 1)
+    return stats
+
+
+def run_prewarm() -> Dict[str, Any]:
+    """Точка входа для Celery: свой event loop, свои соединения с Redis и 1С."""
+
+    async def _run() -> Dict[str, Any]:
+        try:
+            return await prewarm_cache(db)
+        finally:
+            # соединения привязаны к этому event loop — закрываем их вместе с ним
+            await gars_service.close()
+            await cache_service.close()
+
+    db = SessionLocal()
+    try:
+        stats = asyncio.run(_run())
+    finally:
+        db.close()
+    logger.info(f"Cache prewarm finished: {stats}")
+    return stats
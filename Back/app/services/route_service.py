@@ -1,8 +1,57 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from pydantic import BaseModel
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.models.route_models import Route, RouteSegment
 from app.schemas.route_schemas import RouteCreate, RouteSegmentBase
 
+# Сколько строк в одном INSERT (лимит Postgres — 65535 параметров на запрос)
+BULK_CHUNK_SIZE = 1000
+
+# Поля, которые обновляются при конфликте по ключу
+ROUTE_UPSERT_FIELDS = ("code", "name", "description", "duration_minutes", "status", "gars_data_version")
+
+
+def _as_row(item: Union[BaseModel, Dict[str, Any]]) -> Dict[str, Any]:
+    return item.model_dump() if isinstance(item, BaseModel) else dict(item)
+
+
+def _uniform_rows(model, items: Sequence[Union[BaseModel, Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Строки для многострочного INSERT с одинаковым набором ключей.
+
+    pg_insert(...).values(rows) берёт колонки из первой строки: поля, которых
+    в ней нет, у остальных строк молча теряются (или компиляция падает).
+    Поэтому набор ключей — объединение по всем строкам, недостающие значения —
+    скалярный default колонки или NULL. Возвращает (строки, ключи).
+    """
+    rows = [_as_row(item) for item in items]
+    keys = list(dict.fromkeys(key for row in rows for key in row))
+    defaults = {key: _column_default(model, key) for key in keys}
+    return [{key: row[key] if key in row else defaults[key] for key in keys} for row in rows], keys
+
+
+def _last_per_key(items: Sequence[Union[BaseModel, Dict[str, Any]]], key: str) -> List[Dict[str, Any]]:
+    """
+    Строки без повторов ключа конфликта (побеждает последняя): Postgres не даёт
+    одному INSERT ... ON CONFLICT DO UPDATE обновить одну строку дважды.
+    """
+    rows: Dict[Any, Dict[str, Any]] = {}
+    for item in items:
+        row = _as_row(item)
+        # NULL в ключе ни с чем не конфликтует — такие строки не схлопываются
+        rows[row[key] if row.get(key) is not None else object()] = row
+    return list(rows.values())
+
+
+def _column_default(model, key: str) -> Any:
+    column = model.__table__.c.get(key)
+    if column is not None and column.default is not None and column.default.is_scalar:
+        return column.default.arg
+    return None
+
+
 class RouteService:
     def __init__(self, db: Session):
         self.db = db
@@ -50,3 +99,38 @@ class RouteService:
     def get_active_routes(self, skip: int = 0, limit: int = 100) -> List[Route]:
         """Получение активных маршрутов"""
         return self.db.query(Route).filter(Route.status == "active").offset(skip).limit(limit).all()
+
+    def bulk_upsert_routes(
+        self, routes: Sequence[Union[RouteCreate, Dict[str, Any]]], commit: bool = True
+    ) -> Dict[str, int]:
+        """
+        Массовое создание/обновление маршрутов по gars_id.
+
+        Пишет пачками INSERT ... ON CONFLICT (gars_id) DO UPDATE в одной
+        транзакции, без refresh по каждой строке. Обновляются все поля,
+        переданные хотя бы в одной строке пачки; у строк, где поля нет,
+        оно записывается как NULL (или default колонки). Из повторов одного
+        gars_id берётся последний.
+        Возвращает {gars_id: id}. При commit=False транзакцию завершает вызывающий.
+        """
+        ids: Dict[str, int] = {}
+        routes = _last_per_key(routes, "gars_id")
+        try:
+            for start in range(0, len(routes), BULK_CHUNK_SIZE):
+                rows, keys = _uniform_rows(Route, routes[start:start + BULK_CHUNK_SIZE])
+                stmt = pg_insert(Route).values(rows)
+                update_fields = [f for f in ROUTE_UPSERT_FIELDS if f in keys]
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Route.gars_id],
+                    set_={
+                        **{f: stmt.excluded[f] for f in update_fields},
+                        "updated_at": func.now(),
+                    },
+                ).returning(Route.gars_id, Route.id)
+                ids.update(dict(self.db.execute(stmt).all()))
+            if commit:
+                self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return ids
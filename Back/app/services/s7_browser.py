@@ -0,0 +1,137 @@
+# app/services/s7_browser.py
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from playwright.sync_api import Browser, Page, Playwright, sync_playwright
+
+from app.logging_config import logger
+
+
+class BrowserPool:
+    """Постоянный Chromium для парсинга S7 в процессе Celery-воркера.
+
+    Браузер запускается один раз на процесс (start() из сигнала
+    worker_process_init, см. app/tasks.py); каждая задача получает новый
+    изолированный контекст (свои cookies, storage, кэш) и закрывает его.
+    Браузер перезапускается после max_uses задач (Chromium со временем
+    распухает) и если он упал или отключился; close() — при остановке
+    процесса.
+
+    Sync API Playwright привязан к потоку, в котором его запустили.
+    Вызов из другого потока (например, asyncio.to_thread) или при
+    S7_BROWSER_POOL=0 получает одноразовый браузер, как раньше.
+    """
+
+    def __init__(self, max_uses: Optional[int] = None):
+        self.enabled = os.getenv("S7_BROWSER_POOL", "1") == "1"
+        self.max_uses = max_uses or int(os.getenv("S7_BROWSER_MAX_USES", "50"))
+        self.headless = os.getenv("S7_HEADLESS", "1") == "1"
+
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._thread: Optional[int] = None
+        self._uses = 0
+
+        self.launches = 0       # сколько раз запускался браузер
+        self.crashes = 0        # из них — после падения
+        self.one_shot = 0       # задач с одноразовым браузером
+
+    def start(self) -> None:
+        """Запуск браузера заранее; при ошибке он запустится при первой задаче."""
+        if not self.enabled:
+            return
+        try:
+            self._launch()
+        except Exception as e:
+            logger.error(f"S7 browser start error: {e}")
+            self.close()
+
+    def close(self) -> None:
+        self._close_browser()
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+        self._playwright = None
+        self._thread = None
+
+    @contextmanager
+    def page(self) -> Iterator[Page]:
+        """Новая страница в новом контексте; контекст закрывается на выходе."""
+        if not self.enabled or (self._thread is not None and self._thread != threading.get_ident()):
+            self.one_shot += 1
+            with sync_playwright() as p:
+                browser = p.chromium.launch(headless=self.headless)
+                try:
+                    yield browser.new_page()
+                finally:
+                    browser.close()
+            return
+
+        try:
+            context = self._acquire().new_context()
+        except Exception as e:
+            # браузер или драйвер Playwright умер между задачами — поднимаем заново
+            logger.warning(f"S7 browser unusable, restarting: {e}")
+            self.crashes += 1
+            self.close()
+            context = self._acquire().new_context()
+
+        try:
+            yield context.new_page()
+        finally:
+            try:
+                context.close()
+            except Exception:
+                # контекст не закрывается — браузер в плохом состоянии
+                self.crashes += 1
+                self._close_browser()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._browser is not None and self._browser.is_connected(),
+            "uses": self._uses,
+            "max_uses": self.max_uses,
+            "launches": self.launches,
+            "crashes": self.crashes,
+            "one_shot": self.one_shot,
+        }
+
+    def _acquire(self) -> Browser:
+        """Живой браузер с запасом по числу задач."""
+        if self._browser is not None and not self._browser.is_connected():
+            self.crashes += 1
+            self._close_browser()
+        if self._browser is not None and self._uses >= self.max_uses:
+            self._close_browser()
+        if self._browser is None:
+            self._launch()
+        self._uses += 1
+        return self._browser
+
+    def _launch(self) -> None:
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+            self._thread = threading.get_ident()
+        self._browser = self._playwright.chromium.launch(headless=self.headless)
+        self._uses = 0
+        self.launches += 1
+        logger.info(f"S7 browser launched (pid {os.getpid()}, launch #{self.launches})")
+
+    def _close_browser(self) -> None:
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+        self._browser = None
+        self._uses = 0
+
+
+# Один пул на процесс: после fork у каждого воркера свой экземпляр (браузер
+# запускается уже в дочернем процессе, в worker_process_init)
+browser_pool = BrowserPool()
@@ -0,0 +1,262 @@
+# app/services/s7_ibe_json.py
+#
+# Разбор JSON-ответов IBE S7, перехваченных через page.on("response").
+# Схема ответов не документирована и меняется, поэтому поля ищутся по списку
+# известных имён (*_KEYS), но сегментом считается только словарь, где есть
+# все обязательные поля: номер рейса вида "S7 1234" / "1234" и дата И время
+# вылета и прилёта. Рейс — словарь со списком сегментов, тарифы — словари
+# с суммой в рублях рядом с ними. Рейсы, вылетающие не в даты поиска,
+# отбрасываются: так ответы календаря цен, допуслуг и т.п. не превращаются
+# в выдачу. Если ничего не нашлось, парсер возвращает [] и движок читает
+# выдачу из DOM. Пример ответа — tests/fixtures/s7_ibe_search.json.
+
+import datetime as dt
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+FLIGHT_NO_KEYS = ("flightNumber", "flightNo", "flight_number", "marketingFlightNumber", "number")
+CARRIER_KEYS = ("marketingCarrier", "carrierCode", "carrier", "airlineCode", "airline", "company")
+DEPARTURE_KEYS = (
+    "departure", "departureDateTime", "departureLocalDateTime", "departureDate", "departureTime",
+    "departureAirport", "departureAirportCode", "origin",
+)
+ARRIVAL_KEYS = (
+    "arrival", "arrivalDateTime", "arrivalLocalDateTime", "arrivalDate", "arrivalTime",
+    "arrivalAirport", "arrivalAirportCode", "destination",
+)
+AIRPORT_KEYS = ("airportCode", "airport", "iata", "locationCode", "code")
+TIME_KEYS = ("localDateTime", "dateTime", "datetime", "scheduled", "date", "time", "localTime", "at")
+AMOUNT_KEYS = ("amount", "total", "totalAmount", "value", "price")
+FARE_NAME_KEYS = ("brandName", "fareFamily", "tariffName", "brand", "tariff", "name", "code")
+
+_FLIGHT_NO_RE = re.compile(r"(?:[A-Z0-9]{2}\s?-?\s?)?\d{1,4}[A-Z]?")
+_DATETIME_RE = re.compile(r"(\d{4}-\d{2}-\d{2})[T ](\d{1,2}):(\d{2})")
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_TIME_RE = re.compile(r"(\d{1,2}):(\d{2})(?::\d{2})?")
+_AIRPORT_RE = re.compile(r"[A-Z]{3}")
+
+
+def is_ibe_json_response(response) -> bool:
+    """XHR/fetch с JSON от S7 — кандидат в ответ с выдачей (для sync и async Response)."""
+    try:
+        if response.request.resource_type not in ("xhr", "fetch"):
+            return False
+        return "s7.ru" in response.url and "json" in (response.headers.get("content-type") or "")
+    except Exception:
+        return False
+
+
+def search_dates(date_out: str, date_back: Optional[str] = None) -> List[str]:
+    """Даты поиска из формы (ДД.ММ.ГГГГ) в формате ГГГГ-ММ-ДД, как в ответах IBE."""
+    return [
+        dt.datetime.strptime(value, "%d.%m.%Y").date().isoformat()
+        for value in (date_out, date_back) if value
+    ]
+
+
+def flights_from_payloads(payloads: Sequence[Any], dates: Optional[Iterable[str]] = None) -> List[Dict]:
+    """
+    Рейсы из того ответа, где их нашлось больше всего.
+    dates — даты поиска (search_dates): рейсы с вылетом в другие дни не берутся.
+    """
+    best: List[Dict] = []
+    for payload in payloads:
+        flights = parse_ibe_payload(payload, dates)
+        if len(flights) > len(best):
+            best = flights
+    return best
+
+
+def parse_ibe_payload(payload: Any, dates: Optional[Iterable[str]] = None) -> List[Dict]:
+    """
+    Рейсы в формате DOM-парсера (flight_no, dep_time, arr_time, price_rub)
+    плюс segments и fares. Повторы (один рейс в нескольких местах ответа)
+    схлопываются.
+    """
+    allowed = set(dates) if dates else None
+    flights: List[Dict] = []
+    seen = set()
+    for flight in _walk(payload, None):
+        if allowed is not None and flight["segments"][0]["dep_date"] not in allowed:
+            continue
+        signature = (flight["flight_no"], flight["dep_time"], flight["arr_time"], flight["price_rub"])
+        if signature not in seen:
+            seen.add(signature)
+            flights.append(flight)
+    return flights
+
+
+def _walk(node: Any, parent: Optional[Dict]) -> Iterator[Dict]:
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk(item, parent)
+        return
+    if not isinstance(node, dict):
+        return
+
+    segments, container = _child_segments(node)
+    if not segments:
+        segment = _segment(node)
+        if segment is not None:
+            segments, container = [segment], None
+    if segments:
+        fares = _fares(node, skip=container)
+        if not fares and parent is not None:
+            # цены часто лежат рядом со списком сегментов, у родителя (offer -> itinerary)
+            fares = _fares(parent, skip=node)
+        yield _flight(segments, fares)
+        return
+
+    for value in node.values():
+        yield from _walk(value, node)
+
+
+def _child_segments(node: Dict) -> Tuple[List[Dict], Any]:
+    """Сегменты из прямого потомка-списка (segments, legs, flights, ...)."""
+    for value in node.values():
+        if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            segments = [_segment(item) for item in value]
+            if all(segment is not None for segment in segments):
+                return segments, value
+    return [], None
+
+
+def _segment(node: Dict) -> Optional[Dict]:
+    number = _first(node, FLIGHT_NO_KEYS)
+    if isinstance(node.get("flight"), dict):
+        number = number or _first(node["flight"], FLIGHT_NO_KEYS)
+    if not isinstance(number, (str, int)) or isinstance(number, bool):
+        return None
+    if not _FLIGHT_NO_RE.fullmatch(str(number).strip()):
+        return None
+
+    departure = _point(node, DEPARTURE_KEYS)
+    arrival = _point(node, ARRIVAL_KEYS)
+    if not (departure.get("date") and departure.get("time") and arrival.get("date") and arrival.get("time")):
+        return None
+
+    carrier = _first(node, CARRIER_KEYS)
+    if carrier is None and isinstance(node.get("flight"), dict):
+        carrier = _first(node["flight"], CARRIER_KEYS)
+    if isinstance(carrier, dict):
+        carrier = _first(carrier, ("code", "iata", "name"))
+    carrier = str(carrier).strip() if isinstance(carrier, (str, int)) else ""
+    number = str(number).strip()
+    flight_no = number if not carrier or number.upper().startswith(carrier.upper()) else f"{carrier} {number}"
+
+    return {
+        "flight_no": flight_no,
+        "origin": departure.get("airport", ""),
+        "destination": arrival.get("airport", ""),
+        "dep_date": departure["date"],
+        "dep_time": departure["time"],
+        "arr_date": arrival["date"],
+        "arr_time": arrival["time"],
+    }
+
+
+def _point(node: Dict, keys: Sequence[str]) -> Dict[str, str]:
+    """
+    Вылет/прилёт сегмента из полей keys: дата ГГГГ-ММ-ДД, время ЧЧ:ММ и код
+    аэропорта. Поле — строка ("2025-11-25T10:15", "SVO") или словарь
+    ({"airport": {"code": "SVO"}, "localDateTime": "..."}).
+    """
+    point: Dict[str, str] = {}
+    for key in keys:
+        value = node.get(key)
+        if isinstance(value, str):
+            _read_moment(point, value)
+            if "airport" not in point and _AIRPORT_RE.fullmatch(value):
+                point["airport"] = value
+        elif isinstance(value, dict):
+            for time_key in TIME_KEYS:
+                if isinstance(value.get(time_key), str):
+                    _read_moment(point, value[time_key])
+            airport = _first(value, AIRPORT_KEYS)
+            if isinstance(airport, dict):
+                airport = _first(airport, ("code", "iata"))
+            if "airport" not in point and isinstance(airport, str) and _AIRPORT_RE.fullmatch(airport):
+                point["airport"] = airport
+    return point
+
+
+def _read_moment(point: Dict[str, str], value: str) -> None:
+    """Дата и/или время из строки: "2025-11-25T10:15:00", "2025-11-25" или "10:15"."""
+    value = value.strip()
+    match = _DATETIME_RE.match(value)
+    if match:
+        point.setdefault("date", match.group(1))
+        point.setdefault("time", f"{int(match.group(2)):02d}:{match.group(3)}")
+    elif _DATE_RE.fullmatch(value):
+        point.setdefault("date", value)
+    else:
+        match = _TIME_RE.fullmatch(value)
+        if match:
+            point.setdefault("time", f"{int(match.group(1)):02d}:{match.group(2)}")
+
+
+def _fares(node: Any, skip: Any) -> List[Dict]:
+    """Тарифы (название, цена в рублях) в поддереве node, кроме поддерева skip."""
+    fares: List[Dict] = []
+
+    def visit(value: Any, name: str) -> None:
+        if value is skip:
+            return
+        if isinstance(value, list):
+            for item in value:
+                visit(item, name)
+        elif isinstance(value, dict):
+            own_name = _first(value, FARE_NAME_KEYS)
+            if isinstance(own_name, str) and own_name.strip():
+                name = own_name.strip()
+            amount = _amount(value)
+            if amount:
+                fares.append({"name": name, "price_rub": amount})
+                return
+            for item in value.values():
+                visit(item, name)
+
+    visit(node, "")
+    # безымянная сумма рядом с брендами — итог предложения, он дублирует один из тарифов
+    named = [fare for fare in fares if fare["name"]]
+    return named or fares
+
+
+def _amount(node: Dict) -> int:
+    """Сумма в рублях из словаря цены (валюта, если указана, должна быть RUB)."""
+    currency = node.get("currency") or node.get("currencyCode")
+    if isinstance(currency, dict):
+        currency = currency.get("code")
+    if isinstance(currency, str) and currency.upper() not in ("RUB", "RUR"):
+        return 0
+    for key in AMOUNT_KEYS:
+        value = node.get(key)
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)) and value > 0:
+            return int(round(value))
+        if isinstance(value, str):
+            digits = value.replace(" ", "").replace(" ", "").split(".")[0].split(",")[0]
+            if digits.isdigit() and int(digits) > 0:
+                return int(digits)
+    return 0
+
+
+def _flight(segments: List[Dict], fares: List[Dict]) -> Dict:
+    return {
+        "flight_no": " / ".join(segment["flight_no"] for segment in segments),
+        "dep_time": segments[0]["dep_time"],
+        "arr_time": segments[-1]["arr_time"],
+        "price_rub": min((fare["price_rub"] for fare in fares), default=0),
+        "segments": segments,
+        "fares": fares,
+    }
+
+
+def _first(node: Dict, keys: Sequence[str]) -> Any:
+    for key in keys:
+        value = node.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
@@ -0,0 +1,490 @@
+# app/services/s7_page.py
+#
+# Разметка страницы ibe.s7.ru, ожидания и сам сценарий поиска, общие для
+# sync-движка (s7_parser) и async-движка (s7_parser_async). Все ожидания —
+# по конкретным условиям на странице, а не фиксированные паузы; таймауты —
+# только верхняя граница.
+#
+# Сценарий написан один раз — генераторами шагов: каждое обращение к браузеру
+# отдаётся через yield как вызов без аргументов, а его результат (или
+# исключение) возвращается в генератор. run_steps выполняет шаги sync API
+# Playwright, run_steps_async — async API (методы у них называются одинаково).
+
+import datetime as dt
+import re
+from functools import partial
+from typing import Any, Callable, Dict, Generator, List, Optional
+
+from app.services.s7_ibe_json import flights_from_payloads, is_ibe_json_response
+from app.utils.step_timer import StepTimer
+
+# Генератор шагов: отдаёт вызовы к браузеру, получает их результаты
+Steps = Generator[Callable[[], Any], Any, Any]
+
+START_URL = "https://ibe.s7.ru/air"
+
+# Карточка рейса в выдаче и её части
+TRIP_ITEM = "[data-qa='tripItem']"
+CARD_CARRIER = "[class*='title_logo']"
+CARD_TIME = "[class*='segment_route__time']"
+CARD_PRICE = "[data-qa='cost_tariffItem']"
+
+# Выпадающий список подсказок городов (используется вместе с текстом IATA-кода)
+SUGGESTION = "[role='listbox'] [role='option'], [role='option']"
+
+# Контейнер календаря выбора даты
+CALENDAR_XPATH = "//div[contains(@class,'calendar') or contains(@class,'datepicker')]"
+
+# Сообщение о пустой выдаче: без него пустой поиск ждал бы карточки до таймаута
+NO_RESULTS_TEXT = re.compile("рейсов не найдено|нет рейсов|не нашли|нет подходящих", re.I)
+
+
+class S7ScrapeError(RuntimeError):
+    """Выдача S7 не получена (таймаут, не та страница). Пустая выдача — не ошибка."""
+
+
+MONTH_STEMS = {
+    1: "январ",  2: "феврал", 3: "март",
+    4: "апрел", 5: "ма",     6: "июн",
+    7: "июл",   8: "август", 9: "сентябр",
+    10: "октябр", 11: "ноябр", 12: "декабр",
+}
+
+# Таймауты ожиданий, мс
+FORM_TIMEOUT = 30_000        # форма поиска отрисована
+SUGGESTION_TIMEOUT = 3_000   # список подсказок появился / закрылся
+CALENDAR_TIMEOUT = 3_000     # календарь открылся / перелистнулся
+RESULTS_TIMEOUT = 60_000     # первые карточки или сообщение «рейсов нет»
+STABLE_QUIET_MS = 500        # число карточек не меняется столько мс ...
+STABLE_MAX_MS = 5_000        # ... но ждём не дольше
+
+# Ждёт, пока число элементов selector не перестанет меняться quietMs мс
+# (выдача дорисовывается порциями); возвращает итоговое число
+WAIT_COUNT_STABLE_JS = """
+([selector, quietMs, maxMs]) => new Promise(resolve => {
+    const started = performance.now();
+    let last = -1;
+    let changedAt = started;
+    const check = () => {
+        const now = performance.now();
+        const count = document.querySelectorAll(selector).length;
+        if (count !== last) {
+            last = count;
+            changedAt = now;
+        }
+        if (now - changedAt >= quietMs || now - started >= maxMs) {
+            resolve(count);
+        } else {
+            setTimeout(check, 100);
+        }
+    };
+    check();
+})
+"""
+
+# Истинно, когда текст календаря отличается от prev (месяц перелистнулся)
+CALENDAR_CHANGED_JS = """
+([xpath, prev]) => {
+    const el = document.evaluate(
+        xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+    ).singleNodeValue;
+    return !!el && el.innerText !== prev;
+}
+"""
+
+
+def suggestion_pattern(code: str) -> "re.Pattern[str]":
+    """Подсказка с введённым кодом ('MOW') — признак того, что список подсказок отрисован."""
+    return re.compile(rf"\b{re.escape(code)}\b", re.I)
+
+
+# Все карточки выдачи за один page.evaluate: вместо get_attribute/inner_text
+# на каждый узел (O(карточек × узлов) обращений к браузеру) — один вызов,
+# возвращающий [{index, direction, carrier, times, prices}, ...]
+EXTRACT_CARDS_JS = """
+([cardSel, carrierSel, timeSel, priceSel]) => {
+    const text = el => (el ? (el.innerText || el.textContent || "") : "").trim();
+    return Array.from(document.querySelectorAll(cardSel), (card, i) => ({
+        index: i + 1,
+        direction: card.getAttribute("data-direction") || "",
+        carrier: text(card.querySelector(carrierSel)),
+        times: Array.from(card.querySelectorAll(timeSel), text),
+        prices: Array.from(card.querySelectorAll(priceSel), node => text(node).replace(/\\D/g, ""))
+            .filter(digits => digits)
+            .map(Number),
+    }));
+}
+"""
+
+EXTRACT_CARDS_ARGS = [TRIP_ITEM, CARD_CARRIER, CARD_TIME, CARD_PRICE]
+
+
+def cards_to_flights(cards: List[Dict[str, Any]]) -> List[Dict]:
+    """Результат EXTRACT_CARDS_JS -> рейсы в том же виде, что у поузлового парсера."""
+    flights: List[Dict] = []
+    for card in cards:
+        carrier = card.get("carrier") or ""
+        direction = card.get("direction") or ""
+        if direction:
+            flight_no = f"{carrier} {direction}".strip()
+        else:
+            flight_no = f"{carrier or 'S7'} #{card.get('index')}"
+
+        times = card.get("times") or []
+        prices = card.get("prices") or []
+        flights.append(
+            {
+                "flight_no": flight_no,
+                "dep_time": times[0] if len(times) >= 2 else "",
+                "arr_time": times[-1] if len(times) >= 2 else "",
+                "price_rub": min(prices) if prices else 0,
+            }
+        )
+    return flights
+
+
+def run_steps(steps: Steps) -> Any:
+    """Выполняет шаги sync API Playwright; возвращает результат генератора."""
+    result, error = None, None
+    while True:
+        try:
+            call = steps.throw(error) if error is not None else steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+        result, error = None, None
+        try:
+            result = call()
+        except Exception as e:
+            error = e
+
+
+async def run_steps_async(steps: Steps) -> Any:
+    """То же для async API Playwright: результат каждого вызова ожидается."""
+    result, error = None, None
+    while True:
+        try:
+            call = steps.throw(error) if error is not None else steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+        result, error = None, None
+        try:
+            result = await call()
+        except Exception as e:
+            error = e
+
+
+def capture_ibe_responses(page) -> List[Any]:
+    """
+    Подписка на JSON-ответы IBE; вызывать до поиска. Возвращает список,
+    который пополняется объектами Response по мере их прихода.
+    """
+    responses: List[Any] = []
+    page.on("response", lambda response: responses.append(response) if is_ibe_json_response(response) else None)
+    return responses
+
+
+def search_steps(
+    page,
+    origin: str,
+    dest: str,
+    date_out: str,
+    date_back: Optional[str],
+    timer: StepTimer,
+    dates: Optional[List[str]] = None,
+) -> Steps:
+    """Поиск на открытой странице: форма и выдача; origin / dest — IATA-коды."""
+    page.set_default_timeout(60_000)
+    responses = capture_ibe_responses(page)
+
+    with timer.step("open"):
+        yield partial(page.goto, START_URL, wait_until="domcontentloaded")
+        yield partial(page.wait_for_url, "**/air?execution=*", timeout=60_000)
+
+    yield from fill_search_form_steps(page, origin, dest, date_out, date_back, timer)
+
+    # results — от нажатия «Найти» до готовой выдачи
+    return (yield from parse_results_steps(page, timer, responses, dates))
+
+
+def parse_results_steps(
+    page,
+    timer: StepTimer,
+    responses: Optional[List[Any]] = None,
+    dates: Optional[List[str]] = None,
+) -> Steps:
+    """
+    Рейсы со страницы выбора перелёта S7.
+
+    responses — перехваченные JSON-ответы IBE (capture_ibe_responses):
+    рейсы, тарифы и сегменты берутся из них, а карточки в DOM читаются,
+    только если в ответах не нашлось рейсов на даты поиска dates
+    (s7_ibe_json.search_dates).
+    """
+    try:
+        with timer.step("results"):
+            # первая карточка или сообщение «рейсов нет»
+            yield partial(
+                page.locator(TRIP_ITEM).or_(page.get_by_text(NO_RESULTS_TEXT)).first.wait_for,
+                state="visible",
+                timeout=RESULTS_TIMEOUT,
+            )
+    except Exception as e:
+        # ни карточек, ни сообщения «рейсов нет» — поиск не удался, а не пуст:
+        # ошибка уходит из задачи Celery и кэшируется на CACHE_TTL_ERROR
+        raise S7ScrapeError(f"Выдача S7 не загрузилась: {e}") from e
+
+    if responses:
+        with timer.step("json"):
+            payloads = []
+            for response in list(responses):
+                try:
+                    payloads.append((yield response.json))
+                except Exception:
+                    continue  # тело недоступно (редирект, обрыв) или не JSON
+            flights = flights_from_payloads(payloads, dates)
+        if flights:
+            return flights
+
+    with timer.step("stable"):
+        count = yield partial(page.evaluate, WAIT_COUNT_STABLE_JS, [TRIP_ITEM, STABLE_QUIET_MS, STABLE_MAX_MS])
+    if not count:
+        if (yield page.get_by_text(NO_RESULTS_TEXT).first.is_visible):
+            return []
+        raise S7ScrapeError("В выдаче S7 нет ни карточек, ни сообщения «рейсов нет»")
+
+    with timer.step("parse"):
+        try:
+            return (yield from extract_cards_bulk_steps(page))
+        except Exception:
+            return (yield from extract_cards_per_node_steps(page))
+
+
+def extract_cards_bulk_steps(page) -> Steps:
+    """Все карточки выдачи за один page.evaluate (см. EXTRACT_CARDS_JS)."""
+    return cards_to_flights((yield partial(page.evaluate, EXTRACT_CARDS_JS, EXTRACT_CARDS_ARGS)))
+
+
+def extract_cards_per_node_steps(page) -> Steps:
+    """
+    Карточки выдачи по узлам: несколько обращений к браузеру на карточку.
+    Запасной вариант для extract_cards_bulk_steps и эталон для бенчмарка
+    (benchmarks/bench_s7_dom_extract.py).
+    """
+    cards = yield page.locator(TRIP_ITEM).all
+    flights: List[Dict] = []
+
+    for i, card in enumerate(cards, start=1):
+        try:
+            direction = (yield partial(card.get_attribute, "data-direction")) or ""
+
+            carrier = ""
+            try:
+                carrier = (yield partial(card.locator(CARD_CARRIER).first.inner_text, timeout=1_000)).strip()
+            except Exception:
+                pass
+
+            times = []
+            try:
+                time_nodes = yield card.locator(CARD_TIME).all
+                if len(time_nodes) >= 2:
+                    times = [
+                        (yield time_nodes[0].inner_text).strip(),
+                        (yield time_nodes[-1].inner_text).strip(),
+                    ]
+            except Exception:
+                pass
+
+            prices = []
+            try:
+                for node in (yield card.locator(CARD_PRICE).all):
+                    digits = "".join(ch for ch in (yield node.inner_text) if ch.isdigit())
+                    if digits:
+                        prices.append(int(digits))
+            except Exception:
+                pass
+
+            flights.extend(
+                cards_to_flights(
+                    [{"index": i, "direction": direction, "carrier": carrier, "times": times, "prices": prices}]
+                )
+            )
+        except Exception:
+            continue
+
+    return flights
+
+
+def fill_search_form_steps(
+    page,
+    origin: str,
+    dest: str,
+    date_out: str,
+    date_back: Optional[str],
+    timer: StepTimer,
+) -> Steps:
+    """
+    Заполняет форму поиска на странице S7.
+    Взято из исходного кода, убраны print/input; вместо пауз — ожидания
+    конкретных состояний страницы.
+    """
+
+    def input_near_text(text: str) -> Steps:
+        label = page.get_by_text(text, exact=True).first
+        for up in range(1, 6):
+            container = label.locator("xpath=" + "/.." * up)
+            inputs = container.locator("input:not([type='hidden'])")
+            if (yield inputs.count) > 0:
+                return inputs.nth(0)
+        raise RuntimeError(f"Не нашёл видимый input рядом с текстом «{text}»")
+
+    def type_city(label_text: str, code: str) -> Steps:
+        field = yield from input_near_text(label_text)
+        yield field.click
+        yield partial(field.fill, "")
+        yield partial(field.type, code, delay=80)
+
+        # подсказки отрисованы — кликаем по первой (под полем)
+        suggestions = page.locator(SUGGESTION).or_(page.get_by_text(suggestion_pattern(code))).first
+        try:
+            yield partial(suggestions.wait_for, state="visible", timeout=SUGGESTION_TIMEOUT)
+        except Exception:
+            pass
+        box = yield field.bounding_box
+        if not box:
+            return
+        yield partial(page.mouse.click, box["x"] + box["width"] / 2, box["y"] + box["height"] + 35)
+        try:
+            yield partial(page.locator(SUGGESTION).first.wait_for, state="hidden", timeout=SUGGESTION_TIMEOUT)
+        except Exception:
+            pass
+
+    def calendar_text() -> Steps:
+        try:
+            return (yield partial(page.locator(f"xpath={CALENDAR_XPATH}").first.inner_text, timeout=CALENDAR_TIMEOUT))
+        except Exception:
+            return ""
+
+    def open_calendar_for_label(label_text: str) -> Steps:
+        box = yield page.get_by_text(label_text, exact=True).first.bounding_box
+        x = box["x"] + box["width"] - 20
+        y = box["y"] + box["height"] / 2
+        yield partial(page.mouse.click, x, y)
+        try:
+            yield partial(
+                page.locator(f"xpath={CALENDAR_XPATH}").first.wait_for, state="visible", timeout=CALENDAR_TIMEOUT
+            )
+        except Exception:
+            pass
+
+    def pick_date_for_label(label_text: str, date_str: str) -> Steps:
+        target = dt.datetime.strptime(date_str, "%d.%m.%Y")
+        mstem = MONTH_STEMS[target.month]
+
+        yield from open_calendar_for_label(label_text)
+
+        header_pattern = re.compile(f"{mstem}.*{target.year}", re.I)
+
+        for _ in range(24):
+            try:
+                if (yield page.get_by_text(header_pattern).first.is_visible):
+                    break
+            except Exception:
+                pass
+            try:
+                next_btn = page.get_by_role("button", name=re.compile("следующий", re.I)).first
+                if (yield next_btn.is_visible):
+                    before = yield from calendar_text()
+                    yield next_btn.click
+                    # ждём, пока календарь перелистнётся, а не фиксированную секунду
+                    try:
+                        yield partial(
+                            page.wait_for_function,
+                            CALENDAR_CHANGED_JS,
+                            arg=[CALENDAR_XPATH, before],
+                            timeout=CALENDAR_TIMEOUT,
+                        )
+                    except Exception:
+                        pass
+                    continue
+            except Exception:
+                break
+
+        day_pattern = re.compile(rf"\b{target.day}\b.*{mstem}.*{target.year}", re.I)
+        try:
+            btn = page.get_by_role("button", name=day_pattern).first
+            if (yield btn.is_visible):
+                yield btn.click
+                return
+        except Exception:
+            pass
+
+        try:
+            calendar = page.locator(f"xpath={CALENDAR_XPATH}").first
+            day_loc = calendar.locator(f"xpath=.//*[text()='{target.day}']").first
+            if (yield day_loc.is_visible):
+                yield partial(day_loc.click, force=True)
+                return
+        except Exception:
+            pass
+
+        try:
+            yield partial(page.get_by_text(str(target.day), exact=True).first.click, force=True)
+        except Exception:
+            pass
+
+    def click_round_trip() -> Steps:
+        try:
+            yield page.get_by_role("radio", name=re.compile("Туда и обратно", re.I)).click
+        except Exception:
+            pass
+
+    # Форма отрисована
+    with timer.step("form_ready"):
+        yield partial(page.get_by_text("Откуда", exact=True).first.wait_for, state="visible", timeout=FORM_TIMEOUT)
+
+    # Тип поездки
+    with timer.step("trip_type"):
+        if date_back:
+            yield from click_round_trip()
+        else:
+            try:
+                yield page.get_by_role("radio", name=re.compile("В одну сторону", re.I)).click
+            except Exception:
+                pass
+
+    # Откуда
+    with timer.step("origin"):
+        yield from type_city("Откуда", origin)
+
+    # Куда
+    with timer.step("dest"):
+        yield from type_city("Куда", dest)
+
+    # Дата туда
+    with timer.step("date_out"):
+        yield from pick_date_for_label("Туда", date_out)
+
+    # Дата обратно (если есть)
+    if date_back:
+        with timer.step("date_back"):
+            yield from click_round_trip()
+            yield from pick_date_for_label("Обратно", date_back)
+
+    # Кнопка поиска (click сам ждёт, пока кнопка станет доступной)
+    with timer.step("submit"):
+        try:
+            search_button = None
+            for text in ["Искать", "Найти рейсы", "Найти билеты", "Найти"]:
+                try:
+                    search_button = page.get_by_role("button", name=re.compile(text, re.I))
+                    if (yield search_button.is_visible):
+                        break
+                except Exception:
+                    search_button = None
+
+            if search_button is None:
+                search_button = page.get_by_text(re.compile("Искать|Найти", re.I)).first
+
+            yield search_button.click
+        except Exception:
+            pass
@@ -0,0 +1,237 @@
+# app/services/s7_parser_async.py
+
+import asyncio
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from playwright.async_api import Browser, Page, Playwright, async_playwright
+
+from app.logging_config import logger
+from app.services.s7_ibe_json import search_dates
+from app.services.s7_page import run_steps_async, search_steps
+from app.utils.iata import city_to_iata
+from app.utils.step_timer import StepTimer
+
+if TYPE_CHECKING:
+    import concurrent.futures
+
+
+async def search_on_page(page: Page, origin: str, dest: str, date_out: str, date_back: Optional[str]) -> List[Dict]:
+    """
+    Поиск на уже открытой странице; origin / dest — IATA-коды. Шаги пишутся в лог.
+    Сценарий общий с sync-движком (s7_page.search_steps), здесь — через async API.
+    """
+    timer = StepTimer(f"S7 async search {origin}-{dest} {date_out}")
+    flights = await run_steps_async(
+        search_steps(page, origin, dest, date_out, date_back, timer, dates=search_dates(date_out, date_back))
+    )
+
+    logger.info(f"{timer.summary()}, flights: {len(flights)}")
+    return flights
+
+
+class AsyncS7Engine:
+    """Асинхронный парсер S7: много поисков в одном процессе.
+
+    Свой event loop в фоновом потоке, один Chromium и по контексту на
+    поиск; одновременно идёт не больше S7_ASYNC_CONCURRENCY поисков.
+    Страница почти всё время ждёт сеть и анимации, поэтому несколько
+    контекстов в одном loop обходятся намного дешевле процесса на поиск.
+
+    Поиски отправляются из любых потоков (submit, run_s7_search_sync —
+    например, из Celery-воркера с -P threads) и из любых event loop
+    (run_s7_search). Браузер перезапускается после S7_BROWSER_MAX_USES
+    поисков или после падения; старый закрывается, когда на нём
+    завершатся начатые поиски.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None):
+        self.concurrency = concurrency or int(os.getenv("S7_ASYNC_CONCURRENCY", "4"))
+        self.max_uses = int(os.getenv("S7_BROWSER_MAX_USES", "50"))
+        self.headless = os.getenv("S7_HEADLESS", "1") == "1"
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        # создаются в потоке движка (примитивы asyncio привязаны к loop)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._uses = 0
+        self._active: Dict[Browser, int] = {}  # поисков в работе на каждом браузере
+
+        self.launches = 0
+        self.searches = 0
+        self.in_flight = 0
+
+    def start(self) -> None:
+        """Запуск потока с event loop и браузера (повторный вызов ничего не делает)."""
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="s7-async-engine", daemon=True)
+            thread.start()
+            self._loop, self._thread = loop, thread
+        try:
+            asyncio.run_coroutine_threadsafe(self._warm_up(), loop).result(timeout=60)
+        except Exception as e:
+            # браузер запустится при первом поиске
+            logger.error(f"S7 async engine start error: {e}")
+
+    def close(self) -> None:
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=30)
+        except Exception as e:
+            logger.error(f"S7 async engine close error: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+    def submit(
+        self, origin: str, dest: str, date_out: str, date_back: Optional[str] = None
+    ) -> "concurrent.futures.Future[List[Dict]]":
+        """Поиск в потоке движка; origin / dest — IATA-коды."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._search(origin, dest, date_out, date_back), self._loop)
+
+    async def search(self, origin: str, dest: str, date_out: str, date_back: Optional[str] = None) -> List[Dict]:
+        """То же из любого event loop."""
+        if self._loop is not None and asyncio.get_running_loop() is self._loop:
+            return await self._search(origin, dest, date_out, date_back)
+        return await asyncio.wrap_future(self.submit(origin, dest, date_out, date_back))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._browser is not None and self._browser.is_connected(),
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "searches": self.searches,
+            "uses": self._uses,
+            "max_uses": self.max_uses,
+            "launches": self.launches,
+        }
+
+    async def _search(self, origin: str, dest: str, date_out: str, date_back: Optional[str]) -> List[Dict]:
+        self._init_primitives()
+        async with self._semaphore:
+            browser = await self._checkout()
+            self.in_flight += 1
+            try:
+                context = await browser.new_context()
+                try:
+                    return await search_on_page(await context.new_page(), origin, dest, date_out, date_back)
+                finally:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+            finally:
+                self.in_flight -= 1
+                self.searches += 1
+                await self._checkin(browser)
+
+    def _init_primitives(self) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._browser_lock = asyncio.Lock()
+
+    async def _warm_up(self) -> None:
+        self._init_primitives()
+        await self._checkin(await self._checkout(count_use=False))
+
+    async def _checkout(self, count_use: bool = True) -> Browser:
+        """Живой браузер с запасом по числу поисков; учитывается как занятый."""
+        async with self._browser_lock:
+            browser = self._browser
+            if browser is not None and (not browser.is_connected() or self._uses >= self.max_uses):
+                self._browser = None
+                if not self._active.get(browser):
+                    self._active.pop(browser, None)
+                    await _close_quietly(browser)
+            if self._browser is None:
+                await self._launch()
+            if count_use:
+                self._uses += 1
+            self._active[self._browser] += 1
+            return self._browser
+
+    async def _checkin(self, browser: Browser) -> None:
+        self._active[browser] -= 1
+        if browser is not self._browser and self._active[browser] == 0:
+            # браузер уже заменён — закрываем, когда на нём не осталось поисков
+            del self._active[browser]
+            await _close_quietly(browser)
+
+    async def _launch(self) -> None:
+        try:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        except Exception:
+            # драйвер Playwright мог умереть вместе с браузером — в следующий раз с нуля
+            await self._stop_playwright()
+            raise
+        self._uses = 0
+        self._active[self._browser] = 0
+        self.launches += 1
+        logger.info(f"S7 async browser launched (pid {os.getpid()}, launch #{self.launches})")
+
+    async def _shutdown(self) -> None:
+        for browser in list(self._active):
+            await _close_quietly(browser)
+        self._active.clear()
+        self._browser = None
+        await self._stop_playwright()
+
+    async def _stop_playwright(self) -> None:
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+        self._playwright = None
+
+
+async def _close_quietly(browser: Browser) -> None:
+    try:
+        await browser.close()
+    except Exception:
+        pass
+
+
+# Один движок на процесс; поток и браузер запускаются при первом поиске
+# или заранее — в worker_process_init (app/tasks.py)
+engine = AsyncS7Engine()
+
+
+async def run_s7_search(
+    origin: str,
+    dest: str,
+    date_out: str,
+    date_back: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Async-аналог s7_parser.run_s7_search: города/коды и даты ДД.ММ.ГГГГ -> список рейсов.
+    Можно вызывать из любого event loop; сам поиск идёт в движке процесса.
+    """
+    return await engine.search(city_to_iata(origin), city_to_iata(dest), date_out, date_back)
+
+
+def run_s7_search_sync(
+    origin: str,
+    dest: str,
+    date_out: str,
+    date_back: Optional[str] = None,
+    timeout: float = 120,
+) -> List[Dict]:
+    """Блокирующий вызов async-движка — для Celery-задач."""
+    return engine.submit(city_to_iata(origin), city_to_iata(dest), date_out, date_back).result(timeout=timeout)
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Union
+from datetime import date
+
+from app.tasks import parse_s7_flights_task
+from app.utils.cache import CACHE_TTL_EMPTY, CACHE_TTL_ERROR, city_pair_tag
+from app.utils.cache_decorators import cached, canonical_city, canonical_date, parse_date
+from app.utils.iata import city_to_iata
+
+DateLike = Union[date, str]
+
+
+def _s7_date(value: Optional[DateLike]) -> Optional[str]:
+    """Дата в формате формы S7: ДД.ММ.ГГГГ."""
+    parsed = parse_date(value)
+    return parsed.strftime("%d.%m.%Y") if parsed else None
+
+
+def _s7_key(origin: str, dest: str, date_out: DateLike, date_back: Optional[DateLike] = None):
+    return canonical_city(origin), canonical_city(dest), canonical_date(date_out), canonical_date(date_back)
+
+
+def _s7_tags(origin: str, dest: str, date_out: DateLike, date_back: Optional[DateLike] = None):
+    # бронирование по направлению сбрасывает эти поиски через тег направления
+    tags = ["s7", city_pair_tag(origin, dest)]
+    if date_back:
+        tags.append(city_pair_tag(dest, origin))
+    return tags
+
+
+# Пустая выдача и сбой парсинга кэшируются ненадолго: повтор того же поиска
+# не запускает новый парсинг сразу, но и не держит «нет рейсов» целый час
+@cached(
+    "s7",
+    ttl=3600,
+    key=_s7_key,
+    tags=_s7_tags,
+    lock_ttl=180,
+    empty_ttl=CACHE_TTL_EMPTY,
+    error_ttl=CACHE_TTL_ERROR,
+)
+async def get_s7_flights(
+    origin: str,
+    dest: str,
+    date_out: DateLike,
+    date_back: Optional[DateLike] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Рейсы S7 (парсинг в Celery + кэш).
+
+    origin / dest — город по-русски или IATA-код ('Москва', 'MOW'),
+    даты — date или строка ДД.ММ.ГГГГ / ГГГГ-ММ-ДД. Все эндпоинты ходят
+    сюда, поэтому одинаковые поиски делят одну запись кэша. После сбоя
+    парсинга CACHE_TTL_ERROR секунд бросается CachedError.
+    """
+    return await fetch_s7_flights(origin, dest, date_out, date_back)
+
+
+async def fetch_s7_flights(
+    origin: str,
+    dest: str,
+    date_out: DateLike,
+    date_back: Optional[DateLike] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Парсинг S7 задачей parse_s7_flights, без кэша.
+
+    Задачу выполняет воркер S7 с постоянным браузером (или async-движком),
+    поэтому и прогрев кэша парсит здесь, а не в своём процессе.
+    """
+    async_result = parse_s7_flights_task.delay(
+        city_to_iata(origin),
+        city_to_iata(dest),
+        _s7_date(date_out),
+        _s7_date(date_back),
+    )
+    # ожидание результата Celery не должно блокировать event loop;
+    # disable_sync_subtasks=False — прогрев ждёт задачу из своей задачи
+    # (очереди разные, так что взаимной блокировки воркеров нет)
+    return await asyncio.to_thread(async_result.get, timeout=120, disable_sync_subtasks=False)
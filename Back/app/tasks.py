@@ -1,12 +1,25 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from typing import Optional
 
+from app.services.s7_browser import browser_pool
 from app.services.s7_parser import run_s7_search
+from app.services.s7_parser_async import engine as s7_async_engine, run_s7_search_sync
 
 BROKER_URL = os.getenv("CELERY_BROKER_URL", os.getenv("REDIS_URL", "redis://redis:6379/0"))
 RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", os.getenv("REDIS_URL", "redis://redis:6379/0"))
 
+# Прогрев кэша идёт отдельной очередью, чтобы не занимать воркеры интерактивных поисков
+PREWARM_QUEUE = os.getenv("PREWARM_QUEUE", "prewarm")
+PREWARM_INTERVAL = int(os.getenv("PREWARM_INTERVAL", "1800"))
+
+# Движок парсинга S7: sync — Playwright sync API, один поиск на процесс;
+# async — s7_parser_async, до S7_ASYNC_CONCURRENCY поисков в одном процессе
+# (воркер запускается с -P threads, чтобы задачи шли параллельно; в этом
+# режиме worker_process_init не приходит и движок стартует при первом поиске)
+S7_ENGINE = os.getenv("S7_ENGINE", "sync")
+
 celery = Celery(
     "app",
     broker=BROKER_URL,
@@ -19,10 +32,44 @@ celery.conf.update(
     accept_content=["json"],
     timezone="UTC",
     enable_utc=True,
+    task_routes={"prewarm_cache": {"queue": PREWARM_QUEUE}},
+    beat_schedule={
+        "prewarm-cache": {
+            "task": "prewarm_cache",
+            "schedule": PREWARM_INTERVAL,
+            # пропущенный запуск не копится в очереди, если прошлый ещё идёт
+            "options": {"expires": PREWARM_INTERVAL},
+        },
+    },
 )
 
 
+@worker_process_init.connect
+def start_s7_browser(**kwargs):
+    """Chromium запускается один раз на процесс воркера, а не на каждую задачу."""
+    if S7_ENGINE == "async":
+        s7_async_engine.start()
+    else:
+        browser_pool.start()
+
+
+@worker_process_shutdown.connect
+def stop_s7_browser(**kwargs):
+    s7_async_engine.close()
+    browser_pool.close()
+
+
 @celery.task(name="parse_s7_flights")
 def parse_s7_flights_task(origin: str, dest: str, date_out: str, date_back: Optional[str]):
     """Celery-задача для парсинга рейсов S7."""
-    return run_s7_search(origin=origin, dest=dest, date_out=date_out, date_back=date_back)
+    search = run_s7_search_sync if S7_ENGINE == "async" else run_s7_search
+    return search(origin=origin, dest=dest, date_out=date_out, date_back=date_back)
+
+
+@celery.task(name="prewarm_cache")
+def prewarm_cache_task():
+    """Celery-задача прогрева кэша для популярных направлений (по расписанию beat)."""
+    # импорт здесь: prewarm_service через s7_service импортирует этот модуль
+    from app.services.prewarm_service import run_prewarm
+
+    return run_prewarm()
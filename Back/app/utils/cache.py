@@ -1,84 +1,737 @@
-import redis
-import json
-from typing import Optional, Any, Union
+import redis.asyncio as aioredis
+from typing import Optional, Any, Awaitable, Callable, Dict, Iterable, List, Sequence, Set, Tuple, Union
 from datetime import timedelta
+import asyncio
 import os
+import time
+import uuid
+
+from app.utils import fast_json
+from app.utils.cache_codec import CacheCodec
+from app.utils.cache_metrics import CacheMetrics
+from app.utils.iata import city_to_iata
+from app.utils.local_cache import LocalTTLCache
+from app.utils.singleflight import SingleFlight
+
+# Канал Redis pub/sub для сброса L1-кэша во всех воркерах
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Счётчики версий тегов: tagver:<тег> -> int
+TAG_VERSION_PREFIX = "tagver:"
+
+# Сколько ключей за раз просматривает SCAN и удаляет UNLINK
+SCAN_BATCH_SIZE = 500
+
+# Негативный кэш: источник ответил пустым результатом или ошибкой.
+# Такие записи живут недолго и не обновляются в фоне — после истечения
+# следующий запрос снова идёт к источнику.
+NEGATIVE_EMPTY = "empty"
+NEGATIVE_ERROR = "error"
+CACHE_TTL_EMPTY = int(os.getenv("CACHE_TTL_EMPTY", "300"))
+CACHE_TTL_ERROR = int(os.getenv("CACHE_TTL_ERROR", "30"))
+
+
+# Снятие блокировки только её владельцем
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def key_namespace(key: str) -> str:
+    """Пространство имён ключа: 'gars:timetable:<id>' -> 'gars:timetable', 's7:...' -> 's7'."""
+    parts = key.split("#", 1)[0].split(":")
+    if parts[0] == "gars" and len(parts) > 1:
+        return f"{parts[0]}:{parts[1]}"
+    return parts[0]
+
+
+def route_tag(route_id: str) -> str:
+    """Тег всех кэшей, зависящих от маршрута 1С."""
+    return f"route:{route_id}"
+
+
+def city_pair_tag(origin: str, destination: str) -> str:
+    """Тег поисков по направлению ('Москва' и 'MOW' — одно направление)."""
+    return f"pair:{city_to_iata(origin)}:{city_to_iata(destination)}"
+
+
+def versioned_key(key: str, tags: Sequence[str], versions: Dict[str, int]) -> str:
+    """Ключ с версиями тегов: 's7:...#v0.3'. Смена любой версии даёт новый ключ."""
+    if not tags:
+        return key
+    return f"{key}#v" + ".".join(str(versions.get(tag, 0)) for tag in tags)
+
+
+def is_empty(value: Any) -> bool:
+    """Пустой ответ источника ([], {}, '') — кандидат в негативный кэш."""
+    return isinstance(value, (list, tuple, dict, str)) and len(value) == 0
+
+
+class CachedError(Exception):
+    """Ошибка источника, сохранённая в негативном кэше (CACHE_TTL_ERROR)."""
+
+    def __init__(self, key: str, message: str):
+        super().__init__(f"{message} (cached error for {key})")
+        self.key = key
+        self.message = message
+
+
+def _parse_l1_ttls(raw: str) -> Dict[str, float]:
+    """'gars:routes=60,gars:timetable=30' -> {'gars:routes': 60.0, ...}"""
+    ttls: Dict[str, float] = {}
+    for item in raw.split(","):
+        namespace, _, ttl = item.strip().partition("=")
+        if namespace and ttl:
+            ttls[namespace] = float(ttl)
+    return ttls
 
 
 class CacheService:
     """Сервис кэширования на Redis.
 
-    Обёртка над redis_client с асинхронными методами,
-    чтобы удобно вызывать их из async-кода FastAPI.
+    Асинхронный клиент redis.asyncio с явным пулом соединений: обращения
+    к Redis не блокируют event loop. Пул создаётся в startup() (lifespan
+    приложения) и закрывается в close(); если startup() не вызывали
+    (скрипты, Celery), пул создаётся лениво при первом обращении.
+
+    Для самых горячих ключей есть L1 — in-process кэш декодированных
+    значений перед Redis (get_json/set_json). По умолчанию выключен,
+    включается CACHE_L1_ENABLED=1. TTL задаются по пространствам имён
+    в CACHE_L1_TTLS и должны быть короче TTL в Redis; ключи из остальных
+    пространств в L1 не попадают.
+    Запись или удаление ключа рассылается остальным воркерам через
+    Redis pub/sub, и они выбрасывают свою L1-копию.
+
+    Инвалидация по тегам: у каждого тега (провайдер, маршрут, направление)
+    есть счётчик версии, и его версия входит в ключ (versioned_key).
+    invalidate_tags() просто увеличивает счётчики — все зависимые ключи
+    за O(1) становятся недостижимыми и доживают свой TTL. Удаление по
+    маске (delete_pattern) идёт инкрементальным SCAN, без KEYS.
+
+    Формат значений get_json/set_json задаёт CacheCodec (JSON или
+    msgpack со сжатием больших значений, см. app/utils/cache_codec.py);
+    читаются оба формата.
+
+    metrics — попадания/промахи, устаревшие ответы, ошибки, размеры
+    значений и задержки get/set по пространствам имён (key_namespace).
+
+    Негативный кэш (set_negative, параметры empty_ttl/error_ttl у
+    get_or_set): пустой ответ источника хранится как обычное значение,
+    но с коротким TTL; ошибка источника — как CachedError, которую
+    get_swr/get_swr_many отдают вместо значения, а get_or_set бросает.
     """
 
     def __init__(self):
-        self.redis_client = redis.from_url(os.getenv("REDIS_URL", "redis://redis:6379/0"))
+        self.redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
+        self.max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+        self.pool: Optional[aioredis.ConnectionPool] = None
+        self._redis: Optional[aioredis.Redis] = None
+        self.codec = CacheCodec()
+        self.metrics = CacheMetrics()
 
-    async def get(self, key: str) -> Optional[str]:
-        """Получение строкового значения из кэша."""
+        self.l1_enabled = os.getenv("CACHE_L1_ENABLED", "0") == "1"
+        self.l1_ttls = _parse_l1_ttls(
+            os.getenv("CACHE_L1_TTLS", "gars:routes=60,gars:timetable=30,schedule=30,tagver=5")
+        )
+        self.l1 = LocalTTLCache(max_entries=int(os.getenv("CACHE_L1_MAX_ENTRIES", "1024")))
+        self.instance_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+
+        # stale-while-revalidate: фоновые обновления и склейка блокирующих загрузок
+        self.flight = SingleFlight("cache")
+        self._background: Set[asyncio.Task] = set()
+
+    @property
+    def redis_client(self) -> aioredis.Redis:
+        if self._redis is None:
+            self.pool = aioredis.ConnectionPool.from_url(self.redis_url, max_connections=self.max_connections)
+            self._redis = aioredis.Redis(connection_pool=self.pool)
+        return self._redis
+
+    async def startup(self) -> None:
+        """Создание пула соединений, проверка Redis и подписка на сброс L1."""
+        try:
+            await self.redis_client.ping()
+        except Exception as e:
+            print(f"Cache startup error: {e}")
+        if self.l1_enabled and self._listener is None:
+            self._listener = asyncio.create_task(self._listen_invalidations())
+
+    async def close(self) -> None:
+        """Закрытие клиента и всех соединений пула."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self.l1.clear()
+        if self._redis is not None:
+            await self._redis.close()
+        if self.pool is not None:
+            await self.pool.disconnect()
+        self._redis = None
+        self.pool = None
+
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        """Получение значения из кэша как есть (bytes)."""
+        namespace = key_namespace(key)
+        started = time.perf_counter()
         try:
-            value = self.redis_client.get(key)
-            return value.decode("utf-8") if value else None
+            value = await self.redis_client.get(key)
         except Exception as e:
+            self.metrics.error(namespace, "get")
             print(f"Cache get error: {e}")
             return None
+        self.metrics.get(namespace, None if value is None else len(value), time.perf_counter() - started)
+        return value
+
+    async def get(self, key: str) -> Optional[str]:
+        """Получение строкового значения из кэша."""
+        value = await self.get_raw(key)
+        return value.decode("utf-8") if value else None
 
-    async def set(self, key: str, value: str, expire: Optional[Union[int, timedelta]] = None) -> bool:
+    async def set(self, key: str, value: Union[str, bytes], expire: Optional[Union[int, timedelta]] = None) -> bool:
         """Сохранение строкового значения в кэш.
 
         expire — время жизни в секундах или timedelta.
         """
+        namespace = key_namespace(key)
         try:
             ex = None
             if isinstance(expire, timedelta):
                 ex = int(expire.total_seconds())
             else:
                 ex = expire
-            self.redis_client.set(key, value, ex=ex)
+            started = time.perf_counter()
+            await self.redis_client.set(key, value, ex=ex)
+            self.metrics.set(namespace, len(value), time.perf_counter() - started)
+            await self._invalidate_l1(key=key)
             return True
         except Exception as e:
+            self.metrics.error(namespace, "set")
             print(f"Cache set error: {e}")
             return False
 
     async def get_json(self, key: str) -> Optional[Any]:
-        """Получение JSON-значения (dict/list) из кэша."""
-        raw = await self.get(key)
+        """Получение значения (dict/list) из кэша (сначала из L1)."""
+        l1_ttl = self._l1_ttl(key)
+        if l1_ttl:
+            found, value = self.l1.get(key)
+            if found:
+                self.metrics.l1_hit(key_namespace(key))
+                return value
+
+        raw = await self.get_raw(key)
         if raw is None:
             return None
         try:
-            return json.loads(raw)
+            value = self.codec.decode(raw)
         except Exception as e:
+            self.metrics.error(key_namespace(key), "decode")
             print(f"Cache get_json error: {e}")
             return None
 
+        if l1_ttl:
+            self.l1.set(key, value, l1_ttl)
+        return value
+
     async def set_json(self, key: str, value: Any, expire: Optional[Union[int, timedelta]] = None) -> bool:
-        """Сохранение JSON-значения (dict/list) в кэш."""
+        """Сохранение значения (dict/list) в кэш в формате CACHE_CODEC."""
         try:
-            raw = json.dumps(value, ensure_ascii=False)
-            return await self.set(key, raw, expire=expire)
+            raw = self.codec.encode(value)
         except Exception as e:
+            self.metrics.error(key_namespace(key), "encode")
             print(f"Cache set_json error: {e}")
             return False
 
+        ok = await self.set(key, raw, expire=expire)
+        if ok:
+            self._l1_store(key, value, expire)
+        return ok
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """
+        Несколько значений за один запрос: сначала L1, остальное — одним MGET.
+
+        Возвращает только найденные ключи.
+        """
+        result: Dict[str, Any] = {}
+        remote: List[str] = []
+        for key in dict.fromkeys(keys):
+            found, value = self.l1.get(key) if self._l1_ttl(key) else (False, None)
+            if found:
+                self.metrics.l1_hit(key_namespace(key))
+                result[key] = value
+            else:
+                remote.append(key)
+        if not remote:
+            return result
+
+        started = time.perf_counter()
+        try:
+            raws = await self.redis_client.mget(remote)
+        except Exception as e:
+            for key in remote:
+                self.metrics.error(key_namespace(key), "get")
+            print(f"Cache get_many error: {e}")
+            return result
+        elapsed = time.perf_counter() - started
+
+        for key, raw in zip(remote, raws):
+            self.metrics.get(key_namespace(key), None if raw is None else len(raw), elapsed)
+            if raw is None:
+                continue
+            try:
+                value = self.codec.decode(raw)
+            except Exception as e:
+                self.metrics.error(key_namespace(key), "decode")
+                print(f"Cache get_many error: {e}")
+                continue
+            l1_ttl = self._l1_ttl(key)
+            if l1_ttl:
+                self.l1.set(key, value, l1_ttl)
+            result[key] = value
+        return result
+
+    async def set_many(self, items: Dict[str, Any], expire: Optional[Union[int, timedelta]] = None) -> bool:
+        """Запись нескольких значений одним pipeline (SET ... EX на каждый ключ)."""
+        if not items:
+            return True
+        ex = int(expire.total_seconds()) if isinstance(expire, timedelta) else expire
+        encoded: Dict[str, bytes] = {}
+        for key, value in items.items():
+            try:
+                encoded[key] = self.codec.encode(value)
+            except Exception as e:
+                self.metrics.error(key_namespace(key), "encode")
+                print(f"Cache set_many error: {e}")
+
+        started = time.perf_counter()
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, raw in encoded.items():
+                    pipe.set(key, raw, ex=ex)
+                await pipe.execute()
+        except Exception as e:
+            for key in encoded:
+                self.metrics.error(key_namespace(key), "set")
+            print(f"Cache set_many error: {e}")
+            return False
+        elapsed = time.perf_counter() - started
+
+        for key, raw in encoded.items():
+            self.metrics.set(key_namespace(key), len(raw), elapsed)
+        await self._invalidate_l1(keys=list(encoded))
+        for key in encoded:
+            self._l1_store(key, items[key], expire)
+        return len(encoded) == len(items)
+
     async def delete(self, key: str) -> int:
         """Удаление ключа."""
         try:
-            return int(self.redis_client.delete(key) or 0)
+            deleted = int(await self.redis_client.delete(key) or 0)
+            await self._invalidate_l1(key=key)
+            return deleted
         except Exception as e:
+            self.metrics.error(key_namespace(key), "delete")
             print(f"Cache delete error: {e}")
             return 0
 
     async def delete_pattern(self, pattern: str) -> int:
-        """Удаление значений по паттерну."""
+        """Удаление значений по паттерну.
+
+        Ключи перебираются инкрементальным SCAN и удаляются пачками через
+        UNLINK (память освобождается в фоне) — Redis не блокируется на
+        обходе всего keyspace, как с KEYS. Для частой инвалидации
+        предпочтительнее теги (invalidate_tags).
+        """
+        deleted = 0
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                return int(self.redis_client.delete(*keys) or 0)
-            return 0
+            batch: List[bytes] = []
+            async for key in self.redis_client.scan_iter(match=pattern, count=SCAN_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    deleted += int(await self.redis_client.unlink(*batch) or 0)
+                    batch = []
+            if batch:
+                deleted += int(await self.redis_client.unlink(*batch) or 0)
+            await self._invalidate_l1(pattern=pattern)
+            return deleted
         except Exception as e:
             print(f"Cache delete pattern error: {e}")
-            return 0
+            return deleted
+
+    # ---------- инвалидация по тегам ----------
+
+    async def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        """Текущие версии тегов одним MGET (недавно прочитанные — из L1)."""
+        versions: Dict[str, int] = {}
+        missing: List[str] = []
+        for tag in dict.fromkeys(tags):
+            l1_ttl = self._l1_ttl(TAG_VERSION_PREFIX + tag)
+            found, version = self.l1.get(TAG_VERSION_PREFIX + tag) if l1_ttl else (False, None)
+            if found:
+                versions[tag] = version
+            else:
+                missing.append(tag)
+        if not missing:
+            return versions
+
+        try:
+            raw = await self.redis_client.mget([TAG_VERSION_PREFIX + tag for tag in missing])
+        except Exception as e:
+            self.metrics.error("tagver", "get")
+            print(f"Cache tag versions error: {e}")
+            raw = [None] * len(missing)
+        for tag, value in zip(missing, raw):
+            versions[tag] = int(value) if value else 0
+            l1_ttl = self._l1_ttl(TAG_VERSION_PREFIX + tag)
+            if l1_ttl:
+                self.l1.set(TAG_VERSION_PREFIX + tag, versions[tag], l1_ttl)
+        return versions
+
+    async def tagged_key(self, key: str, *tags: str) -> str:
+        """Ключ с текущими версиями тегов (см. versioned_key)."""
+        return versioned_key(key, tags, await self.tag_versions(tags))
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        """Инвалидация всех ключей с этими тегами: INCR счётчиков одним pipeline."""
+        tags = tuple(dict.fromkeys(tags))
+        if not tags:
+            return
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.incr(TAG_VERSION_PREFIX + tag)
+                await pipe.execute()
+        except Exception as e:
+            print(f"Cache invalidate tags error: {e}")
+            return
+        await self._invalidate_l1(keys=[TAG_VERSION_PREFIX + tag for tag in tags])
+
+    # ---------- cache-aside со stale-while-revalidate ----------
+
+    async def get_swr(self, key: str) -> Tuple[bool, Any, bool]:
+        """
+        Чтение записи, сохранённой через set_swr.
+
+        Возвращает (найдено, значение, устарело). Значение в старом формате
+        (без мягкого срока) считается устаревшим, чтобы его перезаписали.
+        Для негативной записи об ошибке значение — экземпляр CachedError.
+        """
+        entry = await self.get_json(key)
+        if entry is None:
+            return False, None, False
+        value, stale = self._unwrap_swr(key, entry)
+        return True, value, stale
+
+    async def get_swr_many(self, keys: Sequence[str]) -> Dict[str, Tuple[Any, bool]]:
+        """get_swr для нескольких ключей одним MGET: {ключ: (значение, устарело)} по найденным."""
+        entries = await self.get_many(keys)
+        return {key: self._unwrap_swr(key, entry) for key, entry in entries.items()}
+
+    async def fresh_for_many(self, keys: Sequence[str]) -> Dict[str, float]:
+        """
+        Сколько секунд ещё свежи записи set_swr (0 — устарели или негативные);
+        отсутствующих в ответе нет.
+        """
+        now = time.time()
+        return {
+            key: max(0.0, entry.get("soft", 0) - now)
+            if isinstance(entry, dict) and "__swr__" in entry and not entry.get("neg") else 0.0
+            for key, entry in (await self.get_many(keys)).items()
+        }
+
+    def _unwrap_swr(self, key: str, entry: Any) -> Tuple[Any, bool]:
+        if isinstance(entry, dict) and "__swr__" in entry:
+            value, stale = entry.get("v"), time.time() >= entry.get("soft", 0)
+            negative = entry.get("neg")
+            if negative:
+                self.metrics.negative(key_namespace(key), negative)
+                if negative == NEGATIVE_ERROR:
+                    value = CachedError(key, entry.get("err", ""))
+        else:
+            value, stale = entry, True
+        if stale:
+            self.metrics.stale(key_namespace(key))
+        return value, stale
+
+    @staticmethod
+    def _swr_entry(value: Any, ttl: int, stale_ttl: Optional[int]) -> Tuple[Dict[str, Any], int]:
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+        return {"__swr__": 1, "soft": time.time() + ttl, "v": value}, ttl + stale_ttl
+
+    @staticmethod
+    def _negative_entry(kind: str, value: Any, ttl: int, error: str = "") -> Dict[str, Any]:
+        # мягкий срок равен жёсткому: негативная запись не отдаётся устаревшей
+        entry = {"__swr__": 1, "soft": time.time() + ttl, "neg": kind}
+        if kind == NEGATIVE_ERROR:
+            entry["err"] = error[:500]
+        else:
+            entry["v"] = value
+        return entry
+
+    async def set_swr(self, key: str, value: Any, ttl: int, stale_ttl: Optional[int] = None) -> bool:
+        """
+        Запись с мягким сроком: ttl секунд значение свежее, ещё stale_ttl
+        секунд (по умолчанию столько же) его можно отдавать, обновляя в фоне.
+        """
+        entry, expire = self._swr_entry(value, ttl, stale_ttl)
+        return await self.set_json(key, entry, expire=expire)
+
+    async def set_swr_many(self, items: Dict[str, Any], ttl: int, stale_ttl: Optional[int] = None) -> bool:
+        """set_swr для нескольких ключей одним pipeline."""
+        entries: Dict[str, Any] = {}
+        expire = ttl
+        for key, value in items.items():
+            entries[key], expire = self._swr_entry(value, ttl, stale_ttl)
+        return await self.set_many(entries, expire=expire)
+
+    async def set_negative(self, key: str, kind: str, ttl: int, value: Any = None, error: str = "") -> bool:
+        """
+        Негативная запись на ttl секунд: NEGATIVE_EMPTY — пустой ответ
+        источника (value), NEGATIVE_ERROR — ошибка источника (error).
+        """
+        return await self.set_json(key, self._negative_entry(kind, value, ttl, error), expire=ttl)
+
+    async def set_negative_many(
+        self, items: Dict[str, Any], kind: str, ttl: int, error: str = ""
+    ) -> bool:
+        """set_negative для нескольких ключей одним pipeline; items — ключ -> value."""
+        entries = {key: self._negative_entry(kind, value, ttl, error) for key, value in items.items()}
+        return await self.set_many(entries, expire=ttl)
+
+    async def acquire_lock(self, key: str, ttl: int) -> Optional[str]:
+        """Распределённая блокировка (SET NX EX); токен владельца или None."""
+        token = uuid.uuid4().hex
+        try:
+            if await self.redis_client.set(f"lock:{key}", token, nx=True, ex=ttl):
+                return token
+        except Exception as e:
+            print(f"Cache lock error: {e}")
+        return None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        try:
+            await self.redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+        except Exception as e:
+            print(f"Cache unlock error: {e}")
+
+    def run_in_background(self, coro: Awaitable[Any]) -> None:
+        """Фоновая задача, которую не соберёт GC до завершения."""
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get_or_set(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: Optional[int] = None,
+        lock_ttl: int = 30,
+        empty_ttl: Optional[int] = None,
+        error_ttl: Optional[int] = None,
+    ) -> Any:
+        """
+        Cache-aside со stale-while-revalidate.
+
+        - свежее значение — отдаём сразу;
+        - устаревшее — отдаём сразу, а ровно один вызывающий во всём кластере
+          (под Redis-блокировкой lock:<key>) обновляет его в фоне;
+        - значения нет совсем — блокирующая загрузка (одна на процесс).
+
+        fetch возвращает значение для кэша; None не кэшируется. Пустое
+        значение ([], {}) с empty_ttl хранится empty_ttl секунд вместо ttl.
+        Исключения fetch при блокирующей загрузке пробрасываются; с error_ttl
+        ошибка запоминается, и ещё error_ttl секунд вместо похода к источнику
+        бросается CachedError.
+        """
+        found, value, stale = await self.get_swr(key)
+        if found:
+            if isinstance(value, CachedError):
+                raise value
+            if stale:
+                token = await self.acquire_lock(key, lock_ttl)
+                if token is not None:
+                    self.run_in_background(self._refresh(key, fetch, ttl, stale_ttl, empty_ttl, token))
+            return value
+
+        return await self.flight.do(key, lambda: self._load(key, fetch, ttl, stale_ttl, empty_ttl, error_ttl))
+
+    async def get_or_set_many(
+        self,
+        entries: Sequence[Tuple[str, Callable[[], Awaitable[Any]]]],
+        ttl: int,
+        stale_ttl: Optional[int] = None,
+        lock_ttl: int = 30,
+        empty_ttl: Optional[int] = None,
+        error_ttl: Optional[int] = None,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """
+        get_or_set для нескольких ключей: все чтения — одним MGET,
+        промахи загружаются параллельно. entries — пары (ключ, fetch);
+        результаты — в том же порядке. Ошибка (в том числе из негативного
+        кэша) любого ключа пробрасывается; при return_exceptions=True она
+        возвращается на месте результата этого ключа, как в asyncio.gather.
+        """
+        found = await self.get_swr_many([key for key, _ in entries])
+        results: List[Any] = [None] * len(entries)
+        pending: List[int] = []
+        for i, (key, fetch) in enumerate(entries):
+            if key not in found:
+                pending.append(i)
+                continue
+            results[i], stale = found[key]
+            if isinstance(results[i], CachedError):
+                if return_exceptions:
+                    continue
+                raise results[i]
+            if stale:
+                token = await self.acquire_lock(key, lock_ttl)
+                if token is not None:
+                    self.run_in_background(self._refresh(key, fetch, ttl, stale_ttl, empty_ttl, token))
+
+        if pending:
+            loaded = await asyncio.gather(*[
+                self.flight.do(
+                    key,
+                    lambda key=key, fetch=fetch: self._load(key, fetch, ttl, stale_ttl, empty_ttl, error_ttl),
+                )
+                for key, fetch in (entries[i] for i in pending)
+            ], return_exceptions=return_exceptions)
+            for i, value in zip(pending, loaded):
+                results[i] = value
+        return results
+
+    async def _load(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: Optional[int],
+        empty_ttl: Optional[int] = None,
+        error_ttl: Optional[int] = None,
+    ) -> Any:
+        try:
+            value = await fetch()
+        except Exception as e:
+            if error_ttl:
+                await self.set_negative(key, NEGATIVE_ERROR, error_ttl, error=str(e) or type(e).__name__)
+            raise
+        if value is None:
+            return value
+        if empty_ttl is not None and is_empty(value):
+            await self.set_negative(key, NEGATIVE_EMPTY, empty_ttl, value=value)
+        else:
+            await self.set_swr(key, value, ttl, stale_ttl)
+        return value
+
+    async def _refresh(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: Optional[int],
+        empty_ttl: Optional[int],
+        token: str,
+    ) -> None:
+        # ошибка фонового обновления не затирает устаревшее, но годное значение
+        try:
+            await self._load(key, fetch, ttl, stale_ttl, empty_ttl)
+        except Exception as e:
+            self.metrics.error(key_namespace(key), "refresh")
+            print(f"Cache background refresh error for {key}: {e}")
+        finally:
+            await self.release_lock(key, token)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики кэша для /api/v1/metrics/cache."""
+        return {
+            "namespaces": self.metrics.stats(),
+            "l1": {"enabled": self._listener is not None, "entries": len(self.l1)},
+            "single_flight": self.flight.stats(),
+            "background_refreshes": len(self._background),
+            "codec": {"format": self.codec.codec, "compression": self.codec.compression},
+        }
+
+    # ---------- L1 ----------
+
+    def _l1_store(self, key: str, value: Any, expire: Optional[Union[int, timedelta]]) -> None:
+        """Копия только что записанного значения в L1 (не дольше, чем в Redis)."""
+        l1_ttl = self._l1_ttl(key)
+        if not l1_ttl:
+            return
+        if expire is not None:
+            seconds = expire.total_seconds() if isinstance(expire, timedelta) else expire
+            l1_ttl = min(l1_ttl, seconds)
+        self.l1.set(key, value, l1_ttl)
+
+    def _l1_ttl(self, key: str) -> Optional[float]:
+        # без подписки на сброс (процесс не вызывал startup()) L1 не используем
+        if not self.l1_enabled or self._listener is None:
+            return None
+        return self.l1_ttls.get(key_namespace(key))
+
+    async def _invalidate_l1(
+        self, key: Optional[str] = None, pattern: Optional[str] = None, keys: Optional[List[str]] = None
+    ) -> None:
+        """Сброс L1 у себя и рассылка сброса остальным воркерам."""
+        if not self.l1_enabled:
+            return
+        if key is not None:
+            if not self._l1_ttl(key):
+                return
+            self.l1.delete(key)
+        if keys is not None:
+            keys = [k for k in keys if self._l1_ttl(k)]
+            if not keys:
+                return
+            for k in keys:
+                self.l1.delete(k)
+        if pattern is not None:
+            self.l1.delete_pattern(pattern)
+        message = {"sender": self.instance_id, "key": key, "keys": keys, "pattern": pattern}
+        try:
+            await self.redis_client.publish(INVALIDATION_CHANNEL, fast_json.dumps(message))
+        except Exception as e:
+            print(f"Cache invalidation publish error: {e}")
+
+    async def _listen_invalidations(self) -> None:
+        """Фоновая подписка на сброс L1 от других воркеров (с переподключением)."""
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # после (пере)подключения могли пропустить сообщения — начинаем с чистого L1
+                self.l1.clear()
+                async for message in pubsub.listen():
+                    data = fast_json.loads(message["data"])
+                    if data.get("sender") == self.instance_id:
+                        continue
+                    if data.get("key"):
+                        self.l1.delete(data["key"])
+                    for k in data.get("keys") or ():
+                        self.l1.delete(k)
+                    if data.get("pattern"):
+                        self.l1.delete_pattern(data["pattern"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Cache invalidation listener error: {e}")
+                self.l1.clear()
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
 
 
 # Глобальный экземпляр сервиса кэширования
@@ -0,0 +1,121 @@
+"""
+Кодирование значений кэша.
+
+Формат значения в Redis определяется первым байтом:
+
+- 0x01 — msgpack;
+- 0x02 — msgpack, сжатый zstd;
+- 0x03 — msgpack, сжатый lz4 (frame);
+- 0x04 — JSON, сжатый zstd;
+- 0x05 — JSON, сжатый lz4 (frame);
+- всё остальное — несжатый JSON (старые записи).
+
+JSON не может начинаться с байтов 0x01–0x05, поэтому старые значения
+читаются как раньше, а формат новых выбирается настройками:
+
+CACHE_CODEC              — json (по умолчанию) или msgpack;
+CACHE_COMPRESSION        — none (по умолчанию), zstd или lz4;
+CACHE_COMPRESS_MIN_BYTES — сжимать только значения не меньше этого размера.
+
+По умолчанию формат не меняется: включать сжатие стоит после того, как
+все воркеры обновлены и умеют его читать. Замеры (benchmarks/
+cache_codec_report.py): основной выигрыш в памяти даёт сжатие, а msgpack
+разбирается медленнее orjson — для горячих ключей разумно json + zstd.
+
+msgpack, zstandard и lz4 опциональны: без них пишется JSON / без сжатия.
+"""
+
+import os
+from typing import Any, Optional
+
+from app.utils import fast_json
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack опционален
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard опционален
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - lz4 опционален
+    lz4_frame = None
+
+MARKER_MSGPACK = 0x01
+MARKER_MSGPACK_ZSTD = 0x02
+MARKER_MSGPACK_LZ4 = 0x03
+MARKER_JSON_ZSTD = 0x04
+MARKER_JSON_LZ4 = 0x05
+
+_ZSTD_LEVEL = 3
+
+
+class CacheCodec:
+    """Кодек значений кэша с маркером формата в первом байте."""
+
+    def __init__(
+        self,
+        codec: Optional[str] = None,
+        compression: Optional[str] = None,
+        compress_min_bytes: Optional[int] = None,
+    ):
+        self.codec = codec or os.getenv("CACHE_CODEC", "json")
+        self.compression = compression or os.getenv("CACHE_COMPRESSION", "none")
+        self.compress_min_bytes = (
+            compress_min_bytes
+            if compress_min_bytes is not None
+            else int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "2048"))
+        )
+
+        if self.codec == "msgpack" and msgpack is None:
+            self.codec = "json"
+        if self.compression == "zstd" and zstandard is None:
+            self.compression = "none"
+        if self.compression == "lz4" and lz4_frame is None:
+            self.compression = "none"
+
+        # Компрессор/декомпрессор zstd переиспользуются (в одном потоке)
+        self._zstd_c = zstandard.ZstdCompressor(level=_ZSTD_LEVEL) if zstandard is not None else None
+        self._zstd_d = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def encode(self, value: Any) -> bytes:
+        is_msgpack = self.codec == "msgpack"
+        if is_msgpack:
+            body = msgpack.packb(value, use_bin_type=True, default=str)
+        else:
+            body = fast_json.dumps(value)
+
+        if len(body) >= self.compress_min_bytes:
+            if self.compression == "zstd":
+                marker = MARKER_MSGPACK_ZSTD if is_msgpack else MARKER_JSON_ZSTD
+                return bytes((marker,)) + self._zstd_c.compress(body)
+            if self.compression == "lz4":
+                marker = MARKER_MSGPACK_LZ4 if is_msgpack else MARKER_JSON_LZ4
+                return bytes((marker,)) + lz4_frame.compress(body)
+        return bytes((MARKER_MSGPACK,)) + body if is_msgpack else body
+
+    def decode(self, raw: bytes) -> Any:
+        marker = raw[0] if raw else None
+        if marker == MARKER_MSGPACK:
+            return _unpack(raw[1:])
+        if marker in (MARKER_MSGPACK_ZSTD, MARKER_JSON_ZSTD):
+            if self._zstd_d is None:
+                raise ValueError("zstandard is not installed")
+            body = self._zstd_d.decompress(raw[1:])
+        elif marker in (MARKER_MSGPACK_LZ4, MARKER_JSON_LZ4):
+            if lz4_frame is None:
+                raise ValueError("lz4 is not installed")
+            body = lz4_frame.decompress(raw[1:])
+        else:
+            return fast_json.loads(raw)
+        return _unpack(body) if marker in (MARKER_MSGPACK_ZSTD, MARKER_MSGPACK_LZ4) else fast_json.loads(body)
+
+
+def _unpack(data: bytes) -> Any:
+    if msgpack is None:
+        raise ValueError("msgpack is not installed")
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
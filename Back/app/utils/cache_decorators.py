@@ -0,0 +1,183 @@
+"""
+Декларативное кэширование async-функций.
+
+    @cached("s7", ttl=3600, key=lambda origin, dest, day: (canonical_city(origin), canonical_city(dest), day))
+    async def get_flights(origin, dest, day): ...
+
+Ключ строится из namespace и частей, которые вернул key (по умолчанию —
+все аргументы, кроме self/cls), и каждая часть приводится к канонической
+форме: регистр, пробелы, даты в ISO. Поэтому одинаковые запросы из разных
+эндпоинтов попадают в одну запись кэша. Значения хранятся через
+CacheService.get_or_set (stale-while-revalidate); tags — теги для
+инвалидации (см. CacheService.invalidate_tags); empty_ttl и error_ttl —
+сроки негативного кэша для пустых результатов и ошибок функции.
+
+У обёрнутой функции есть:
+- base_key(*args, **kwargs)        — ключ без версий тегов;
+- key_tags(*args, **kwargs)        — теги ключа;
+- await cache_key(*args, **kwargs) — полный ключ в Redis;
+- await cache_keys([args, ...])    — полные ключи для нескольких вызовов;
+- await many([args, ...])          — несколько вызовов: чтения из Redis
+                                     одним MGET, промахи — параллельно;
+- await refresh(*args, **kwargs)   — вызвать функцию и перезаписать кэш;
+- await store(value, *args, **kw)  — записать готовое значение под ключ вызова;
+- uncached                         — исходная функция;
+- ttl                              — время свежести записи.
+"""
+
+import functools
+import inspect
+from datetime import date, datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from app.utils.cache import NEGATIVE_EMPTY, cache_service, is_empty, versioned_key
+from app.utils.iata import city_to_iata
+
+# Аргументы методов, которые не входят в ключ по умолчанию
+_SKIP_ARGS = ("self", "cls")
+
+
+def parse_date(value: Any) -> Optional[date]:
+    """date/datetime, 'ДД.ММ.ГГГГ' или 'ГГГГ-ММ-ДД' -> date; пустое -> None."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Неверный формат даты: {value!r}")
+
+
+def canonical(value: Any) -> str:
+    """Каноническая часть ключа: нижний регистр, схлопнутые пробелы, даты в ISO."""
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return ",".join(sorted(canonical(v) for v in value))
+    if isinstance(value, (list, tuple)):
+        return ",".join(canonical(v) for v in value)
+    # ':' разделяет части ключа
+    return " ".join(str(value).split()).lower().replace(":", "_")
+
+
+def canonical_city(value: str) -> str:
+    """Город или IATA-код -> IATA ('Москва', ' москва ', 'MOW' -> 'MOW')."""
+    return city_to_iata(value)
+
+
+def canonical_date(value: Any) -> str:
+    """Дата в любом из поддерживаемых форматов -> 'ГГГГ-ММ-ДД' ('-' для пустой)."""
+    parsed = parse_date(value)
+    return parsed.isoformat() if parsed else "-"
+
+
+def build_key(namespace: str, parts: Sequence[Any]) -> str:
+    return ":".join([namespace] + [canonical(part) for part in parts])
+
+
+def cached(
+    namespace: str,
+    ttl: int,
+    key: Optional[Callable[..., Sequence[Any]]] = None,
+    tags: Optional[Callable[..., Sequence[str]]] = None,
+    stale_ttl: Optional[int] = None,
+    lock_ttl: int = 30,
+    empty_ttl: Optional[int] = None,
+    error_ttl: Optional[int] = None,
+):
+    """
+    Кэширование результата async-функции в Redis.
+
+    key и tags получают те же аргументы, что и функция. Результат None
+    не кэшируется; пустой ([], {}) с empty_ttl живёт empty_ttl секунд.
+    Исключения функции пробрасываются вызывающему; с error_ttl ещё
+    error_ttl секунд вместо вызова функции бросается CachedError.
+    """
+
+    def decorator(fn: Callable[..., Any]):
+        signature = inspect.signature(fn)
+
+        def key_parts(args: Tuple[Any, ...], kwargs: dict) -> Sequence[Any]:
+            if key is not None:
+                return key(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return [value for name, value in bound.arguments.items() if name not in _SKIP_ARGS]
+
+        def base_key(*args, **kwargs) -> str:
+            return build_key(namespace, key_parts(args, kwargs))
+
+        def key_tags(*args, **kwargs) -> Sequence[str]:
+            return tuple(tags(*args, **kwargs)) if tags is not None else ()
+
+        async def cache_key(*args, **kwargs) -> str:
+            return await cache_service.tagged_key(base_key(*args, **kwargs), *key_tags(*args, **kwargs))
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await cache_service.get_or_set(
+                await cache_key(*args, **kwargs),
+                lambda: fn(*args, **kwargs),
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+                lock_ttl=lock_ttl,
+                empty_ttl=empty_ttl,
+                error_ttl=error_ttl,
+            )
+
+        async def cache_keys(calls: Sequence[Sequence[Any]]) -> List[str]:
+            """Полные ключи для списка наборов позиционных аргументов (версии тегов — одним MGET)."""
+            calls = [tuple(args) for args in calls]
+            tags_by_call = [key_tags(*args) for args in calls]
+            versions = await cache_service.tag_versions(tag for call_tags in tags_by_call for tag in call_tags)
+            return [versioned_key(base_key(*args), call_tags, versions) for args, call_tags in zip(calls, tags_by_call)]
+
+        async def many(calls: Sequence[Sequence[Any]], return_exceptions: bool = False) -> List[Any]:
+            """
+            Результаты для списка наборов позиционных аргументов (в том же порядке);
+            return_exceptions — ошибки на месте результатов, как в asyncio.gather.
+            """
+            calls = [tuple(args) for args in calls]
+            entries = [
+                (key, functools.partial(fn, *args)) for key, args in zip(await cache_keys(calls), calls)
+            ]
+            return await cache_service.get_or_set_many(
+                entries, ttl=ttl, stale_ttl=stale_ttl, lock_ttl=lock_ttl, empty_ttl=empty_ttl,
+                error_ttl=error_ttl, return_exceptions=return_exceptions,
+            )
+
+        async def store(value: Any, *args, **kwargs) -> bool:
+            if value is None:
+                return False
+            key = await cache_key(*args, **kwargs)
+            if empty_ttl is not None and is_empty(value):
+                return await cache_service.set_negative(key, NEGATIVE_EMPTY, empty_ttl, value=value)
+            return await cache_service.set_swr(key, value, ttl, stale_ttl)
+
+        async def refresh(*args, **kwargs) -> Any:
+            value = await fn(*args, **kwargs)
+            await store(value, *args, **kwargs)
+            return value
+
+        wrapper.base_key = base_key
+        wrapper.key_tags = key_tags
+        wrapper.cache_key = cache_key
+        wrapper.cache_keys = cache_keys
+        wrapper.many = many
+        wrapper.refresh = refresh
+        wrapper.store = store
+        wrapper.uncached = fn
+        wrapper.ttl = ttl
+        return wrapper
+
+    return decorator
@@ -0,0 +1,131 @@
+import bisect
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+# Границы корзин гистограммы задержек, мс (последняя — всё, что дольше)
+LATENCY_BUCKETS_MS = (0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами.
+
+    Перцентили оцениваются верхней границей корзины — точности хватает,
+    чтобы отличить попадание в L1 от похода в Redis и от таймаута.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class NamespaceMetrics:
+    """Счётчики одного пространства имён ключей ('s7', 'gars:timetable', ...)."""
+
+    def __init__(self):
+        self.hits = 0
+        self.l1_hits = 0          # из них обслужено in-process кэшем
+        self.misses = 0
+        self.stale = 0            # отдано устаревшее значение (stale-while-revalidate)
+        self.negative: Dict[str, int] = defaultdict(int)  # попадания в негативный кэш по виду
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.writes = 0
+        self.max_payload = 0
+        self.get_latency = LatencyHistogram()
+        self.set_latency = LatencyHistogram()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        redis_hits = self.hits - self.l1_hits
+        return {
+            "hits": self.hits,
+            "l1_hits": self.l1_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "stale_served": self.stale,
+            "negative_hits": dict(self.negative),
+            "errors": dict(self.errors),
+            "writes": self.writes,
+            "avg_read_bytes": self.bytes_read // redis_hits if redis_hits else None,
+            "avg_write_bytes": self.bytes_written // self.writes if self.writes else None,
+            "max_payload_bytes": self.max_payload,
+            "get_latency": self.get_latency.stats(),
+            "set_latency": self.set_latency.stats(),
+        }
+
+
+class CacheMetrics:
+    """Метрики CacheService по пространствам имён (в памяти процесса)."""
+
+    def __init__(self):
+        self._namespaces: Dict[str, NamespaceMetrics] = defaultdict(NamespaceMetrics)
+
+    def get(self, namespace: str, size: Optional[int], seconds: float) -> None:
+        """Чтение из Redis: size — размер значения, None — промах."""
+        m = self._namespaces[namespace]
+        m.get_latency.observe(seconds)
+        if size is None:
+            m.misses += 1
+        else:
+            m.hits += 1
+            m.bytes_read += size
+            m.max_payload = max(m.max_payload, size)
+
+    def l1_hit(self, namespace: str) -> None:
+        m = self._namespaces[namespace]
+        m.hits += 1
+        m.l1_hits += 1
+
+    def set(self, namespace: str, size: int, seconds: float) -> None:
+        m = self._namespaces[namespace]
+        m.set_latency.observe(seconds)
+        m.writes += 1
+        m.bytes_written += size
+        m.max_payload = max(m.max_payload, size)
+
+    def stale(self, namespace: str) -> None:
+        self._namespaces[namespace].stale += 1
+
+    def negative(self, namespace: str, kind: str) -> None:
+        self._namespaces[namespace].negative[kind] += 1
+
+    def error(self, namespace: str, operation: str) -> None:
+        self._namespaces[namespace].errors[operation] += 1
+
+    def reset(self) -> None:
+        self._namespaces.clear()
+
+    def stats(self, namespaces: Optional[List[str]] = None) -> Dict[str, Any]:
+        names = namespaces if namespaces is not None else sorted(self._namespaces)
+        return {name: self._namespaces[name].stats() for name in names if name in self._namespaces}
@@ -0,0 +1,48 @@
+"""
+Быстрая (де)сериализация JSON для горячего пути поиска.
+
+Используется orjson, если он установлен; иначе — стандартный json
+с тем же интерфейсом. BOM, который иногда присылает 1С, срезается
+здесь один раз при разборе.
+"""
+
+import json
+from typing import Any, Union
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson опционален
+    orjson = None
+
+_BOM_BYTES = b"\xef\xbb\xbf"
+_BOM_STR = "\ufeff"
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Разбор JSON из bytes или str (с BOM или без)."""
+    if isinstance(data, str):
+        if data.startswith(_BOM_STR):
+            data = data[1:]
+    else:
+        data = bytes(data)
+        if data.startswith(_BOM_BYTES):
+            data = data[3:]
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """Сериализация в UTF-8 JSON (кириллица без \\u-экранирования)."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse, сериализующий ответ через fast_json.dumps."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
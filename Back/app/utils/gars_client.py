@@ -1,92 +1,389 @@
 import aiohttp
-import base64
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Sequence, Tuple
 from datetime import datetime, date
+from urllib.parse import urlencode, quote
 import asyncio
 # from app.core.config import settings
-import json
 import os
+import random
+import uuid
+
+from app.logging_config import logger
+from app.utils import fast_json
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.gars_transport import create_transport
+from app.utils.singleflight import SingleFlight
+
+
+# Проекции ($select): только те поля, которые реально используются в поиске
+# и отдаются клиентам. Остановки — табличная часть, раскрываемая через $expand.
+ROUTE_FIELDS = ("Ref_Key", "Description")
+# Для инкрементальной синхронизации: сначала только версии, потом полные записи изменённых
+ROUTE_VERSION_FIELDS = ("Ref_Key", "DataVersion", "DeletionMark")
+ROUTE_SYNC_FIELDS = ("Ref_Key", "DataVersion", "DeletionMark", "Code", "Description", "Комментарий")
+TIMETABLE_FIELDS = (
+    "Ref_Key",
+    "Description",
+    "ВремяОтправления",
+    "ВремяПрибытия",
+    "РегулярностьТип",
+    "РегулярностьДниИЧисла",
+    "Остановки",
+)
+
+
+def _with_select(params: Dict[str, str], select: Optional[Sequence[str]]) -> Dict[str, str]:
+    """Добавляет $select к параметрам запроса (None — все поля)."""
+    if select:
+        params = dict(params)
+        params["$select"] = ",".join(select)
+    return params
+
+
+def _record_key(record: Any) -> Any:
+    """Ключ записи для сравнения страниц: Ref_Key, иначе сама запись."""
+    if isinstance(record, dict) and record.get("Ref_Key"):
+        return record["Ref_Key"]
+    return fast_json.dumps(record) if isinstance(record, (dict, list)) else record
+
+
+def _next_link(response: Dict) -> Optional[str]:
+    """Ссылка на следующую страницу коллекции (серверная разбивка 1С)."""
+    return response.get("odata.nextLink") or response.get("@odata.nextLink")
+
+
+# Запрос на чтение для $batch: (endpoint, params)
+GARSRequest = Tuple[str, Dict[str, str]]
+
+# Статусы, которыми 1С явно отвечает, что $batch на публикации не поддерживается
+BATCH_UNSUPPORTED_STATUSES = {404, 405, 501}
+
+
+# Ответы, после которых GET имеет смысл повторить
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GARSError(Exception):
+    """Ошибка обращения к 1С ГАРС (сетевая ошибка или неуспешный ответ)."""
+
+
+class GARSUnavailableError(GARSError):
+    """1С недоступен: исчерпаны повторы или открыт circuit breaker."""
+
 
 class GARSClient:
-    def __init__(self):
+    """Клиент OData-сервиса 1С ГАРС.
+
+    HTTP-запросы выполняет транспорт (app/utils/gars_transport.py): в бою —
+    одна долгоживущая aiohttp-сессия с пулом keep-alive соединений, чтобы не
+    платить за TCP/TLS-рукопожатие на каждый запрос; офлайн — воспроизведение
+    записанных ответов. Транспорт открывается в startup() и закрывается в close().
+    """
+
+    def __init__(self, transport=None):
         self.base_url  = os.getenv("GARS_BASE_URL")
         self.username  = os.getenv("GARS_USERNAME")
         self.password  = os.getenv("GARS_PASSWORD")
         self.timeout   = int(os.getenv("GARS_TIMEOUT", 30))
-        
-        # Создание Basic Auth заголовка
-        credentials = f"{self.username}:{self.password}"
-        encoded_credentials = base64.b64encode(credentials.encode()).decode()
-        self.auth_header = f"Basic {encoded_credentials}"
-    
-    def _get_headers(self) -> Dict[str, str]:
-        return {
-            "Authorization": self.auth_header,
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        self.connect_timeout = float(os.getenv("GARS_CONNECT_TIMEOUT", 5))
+
+        # Повторы идемпотентных чтений: число попыток сверх первой
+        # и база экспоненциальной задержки (с полным джиттером)
+        self.retries       = int(os.getenv("GARS_RETRIES", 2))
+        self.backoff_base  = float(os.getenv("GARS_BACKOFF_BASE", 0.2))
+        self.backoff_max   = float(os.getenv("GARS_BACKOFF_MAX", 2.0))
+
+        # Circuit breaker: после N неудач подряд не ходим в 1С recovery секунд
+        self.breaker = CircuitBreaker(
+            "gars",
+            failure_threshold=int(os.getenv("GARS_BREAKER_THRESHOLD", 5)),
+            recovery_timeout=float(os.getenv("GARS_BREAKER_RECOVERY", 30)),
+        )
+
+        # Размер страницы при постраничном обходе коллекций ($top/$skip)
+        # и предел числа страниц (защита от сервера, игнорирующего $skip)
+        self.page_size = int(os.getenv("GARS_PAGE_SIZE", 500))
+        self.max_pages = int(os.getenv("GARS_MAX_PAGES", 1000))
+
+        # $batch: сколько запросов упаковывать в один multipart и включён ли он.
+        # Если 1С отверг $batch, флаг сбрасывается до перезапуска процесса.
+        self.batch_size = int(os.getenv("GARS_BATCH_SIZE", 50))
+        self.batch_enabled = os.getenv("GARS_BATCH_ENABLED", "1") == "1"
+
+        # Одинаковые одновременные GET/$batch-запросы уходят в 1С один раз
+        self.flight = SingleFlight("gars_client")
+
+        self.transport = transport or create_transport(
+            self.base_url, self.username, self.password, self.timeout, self.connect_timeout
+        )
+
+    async def startup(self) -> None:
+        """Открытие пула соединений (вызывается из lifespan приложения)."""
+        await self.transport.startup()
+
+    async def close(self) -> None:
+        """Закрытие сессии и всех keep-alive соединений."""
+        await self.transport.close()
     
+    @staticmethod
+    def _flight_key(method: str, endpoint: str, params: Optional[Dict] = None) -> str:
+        return f"{method} {endpoint} {sorted((params or {}).items())}"
+
     async def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
-        url = f"{self.base_url}{endpoint}"
-        
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
-            try:
-                async with session.request(method, url, headers=self._get_headers(), params=params) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        print(f"GARS API Error: {response.status} - {await response.text()}")
-                        return None
-            except Exception as e:
-                print(f"Request failed: {e}")
-                return None
+        # Чтения склеиваем: одновременные одинаковые GET получат один ответ
+        if method == "GET":
+            return await self.flight.do(
+                self._flight_key(method, endpoint, params),
+                lambda: self._send_request(method, endpoint, params),
+            )
+        return await self._send_request(method, endpoint, params)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Экспоненциальная задержка с полным джиттером."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _execute(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict] = None,
+        data: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        idempotent: bool = False,
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Выполняет HTTP-запрос к 1С с учётом circuit breaker и повторов.
+
+        Идемпотентные запросы повторяются при сетевых ошибках, таймаутах
+        и 429/5xx. Возвращает (status, headers, body) любого «окончательного»
+        ответа (в т.ч. 4xx). Если 1С так и не ответил — GARSUnavailableError.
+        """
+        if not self.breaker.allow_request():
+            raise GARSUnavailableError("Circuit breaker открыт, 1С временно не опрашивается")
+        # в half_open allow_request пропускает только пробный запрос — значит, это он
+        probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+
+        attempts = 1 + (self.retries if idempotent else 0)
+        last_error = ""
+        try:
+            for attempt in range(attempts):
+                if attempt:
+                    await asyncio.sleep(self._backoff_delay(attempt - 1))
+                try:
+                    status, resp_headers, body = await self.transport.request(
+                        method, url, params=params, data=data, headers=headers
+                    )
+                    if status not in RETRYABLE_STATUSES:
+                        self.breaker.record_success()
+                        return status, resp_headers, body
+                    last_error = f"{status} - {body[:300].decode('utf-8', errors='replace')}"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    last_error = repr(e)
+                logger.warning(f"GARS request {method} {url} failed (attempt {attempt + 1}/{attempts}): {last_error}")
+        except Exception:
+            # неожиданная ошибка транспорта/разбора — тоже сбой обращения к 1С
+            self.breaker.record_failure()
+            raise
+        finally:
+            # отмена (CancelledError) ничего не говорит о здоровье 1С, но пробный
+            # запрос надо отпустить, иначе breaker навсегда останется half_open
+            if probe:
+                self.breaker.release_probe()
+
+        self.breaker.record_failure()
+        raise GARSUnavailableError(f"1С не ответил на {method} {url}: {last_error}")
+
+    async def _send_request(self, method: str, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Запрос к 1С с разбором JSON.
+
+        None — 1С ответил ошибкой (4xx/некорректный JSON);
+        GARSUnavailableError — 1С недоступен.
+        """
+        # endpoint может быть абсолютной ссылкой (odata.nextLink от сервера)
+        url = endpoint if endpoint.startswith("http") else f"{self.base_url}{endpoint}"
+        status, _, body = await self._execute(method, url, params=params, idempotent=(method == "GET"))
+
+        if status != 200:
+            logger.error(f"GARS API Error: {status} - {body[:300].decode('utf-8', errors='replace')}")
+            return None
+        try:
+            return fast_json.loads(body)
+        except ValueError as e:
+            logger.error(f"GARS API returned invalid JSON: {e}")
+            return None
     
-    async def get_routes(self) -> Optional[List[Dict]]:
+    async def iter_collection(
+        self,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Постраничный обход OData-коллекции.
+
+        Отдаёт записи страницами по page_size штук ($top/$skip), а если сервер
+        сам прислал ссылку на следующую страницу (odata.nextLink) — идёт по ней.
+        Так в памяти одновременно лежит не больше одной страницы, а первые
+        записи доступны до того, как скачан весь каталог.
+
+        Некоторые публикации 1С игнорируют $top/$skip и каждый раз отдают весь
+        набор: страница больше $top считается всей коллекцией, а повтор
+        предыдущей страницы (те же ключи) останавливает обход.
+
+        Если страница не получена, повторилась или обход превысил max_pages
+        страниц, бросает GARSError: молча обрезать коллекцию нельзя, иначе в кэш
+        попадёт неполный список.
+        """
+        page_size = page_size or self.page_size
+        base_params = dict(params or {})
+        base_params.setdefault("$format", "json")
+
+        skip = 0
+        pages = 0
+        previous_keys: Optional[List[Any]] = None
+        next_link: Optional[str] = None
+        while True:
+            pages += 1
+            if pages > self.max_pages:
+                raise GARSError(f"Обход {endpoint} превысил {self.max_pages} страниц")
+            if next_link:
+                response = await self._make_request("GET", next_link)
+            else:
+                page_params = dict(base_params)
+                page_params["$top"] = str(page_size)
+                if skip:
+                    page_params["$skip"] = str(skip)
+                response = await self._make_request("GET", endpoint, page_params)
+
+            if not response or "value" not in response:
+                raise GARSError(f"Не удалось получить страницу {endpoint} (skip={skip})")
+
+            records = response["value"]
+            keys = [_record_key(record) for record in records]
+            if records and keys == previous_keys:
+                # $skip проигнорирован: остальные записи так не получить
+                raise GARSError(f"1С повторно отдал ту же страницу {endpoint} (skip={skip})")
+            previous_keys = keys
+            if records:
+                yield records
+
+            paged_by_server = next_link is not None
+            next_link = _next_link(response)
+            if next_link:
+                continue
+            if len(records) < page_size:
+                break
+            if len(records) > page_size and not paged_by_server:
+                logger.warning(f"GARS ignored $top={page_size} for {endpoint}, got {len(records)} records at once")
+                break
+            skip += len(records)
+
+    async def iter_records(
+        self,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[Dict]:
+        """Обход коллекции по одной записи (поверх iter_collection)."""
+        async for page in self.iter_collection(endpoint, params, page_size):
+            for record in page:
+                yield record
+
+    async def _collect(self, endpoint: str, params: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """Вся коллекция списком; None, если 1С не ответил."""
+        try:
+            return [record async for record in self.iter_records(endpoint, params)]
+        except GARSError as e:
+            logger.error(f"GARS collection error: {e}")
+            return None
+
+    def _routes_params(self, select: Optional[Sequence[str]]) -> Dict[str, str]:
+        return _with_select({"$orderby": "Ref_Key"}, select)
+
+    def iter_routes(self, select: Optional[Sequence[str]] = None) -> AsyncIterator[Dict]:
+        """Постраничный обход Catalog_Маршруты"""
+        return self.iter_records("Catalog_Маршруты", self._routes_params(select))
+
+    async def get_routes(self, select: Optional[Sequence[str]] = None) -> Optional[List[Dict]]:
         """Получение списка маршрутов"""
-        params = {"$format": "json"}
-        response = await self._make_request("GET", "Catalog_Маршруты", params)
-        
-        if response and "value" in response:
-            return response["value"]
-        return None
-    
-    async def get_route_schedule(self, route_id: str, start_date: date, end_date: date) -> Optional[List[Dict]]:
-        """Получение расписания маршрута"""
+        return await self._collect("Catalog_Маршруты", self._routes_params(select))
+
+    async def iter_routes_by_keys(
+        self, ref_keys: Sequence[str], select: Optional[Sequence[str]] = None, chunk_size: int = 50
+    ) -> AsyncIterator[Dict]:
+        """Маршруты по списку Ref_Key (фильтр с OR пачками по chunk_size)."""
+        for start in range(0, len(ref_keys), chunk_size):
+            chunk = ref_keys[start:start + chunk_size]
+            params = _with_select({
+                "$filter": " or ".join(f"Ref_Key eq guid'{key}'" for key in chunk),
+            }, select)
+            async for record in self.iter_records("Catalog_Маршруты", params):
+                yield record
+
+    def _schedule_params(self, start_date: date, end_date: date, select: Optional[Sequence[str]]) -> Dict[str, str]:
         filter_query = f"Period ge datetime'{start_date.isoformat()}T00:00:00' and Period le datetime'{end_date.isoformat()}T23:59:59'"
-        params = {
+        return _with_select({
             "$filter": filter_query,
-            "$format": "json"
-        }
-        
-        response = await self._make_request("GET", "InformationRegister_РасписаниеРейсов", params)
-        
-        if response and "value" in response:
-            return response["value"]
-        return None
+            "$orderby": "Period",
+        }, select)
+
+    def schedule_request(
+        self, route_id: str, start_date: date, end_date: date, select: Optional[Sequence[str]] = None
+    ) -> GARSRequest:
+        return "InformationRegister_РасписаниеРейсов", self._schedule_params(start_date, end_date, select)
+
+    def iter_route_schedule(
+        self, route_id: str, start_date: date, end_date: date, select: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[Dict]:
+        """Постраничный обход расписания маршрута"""
+        return self.iter_records(
+            "InformationRegister_РасписаниеРейсов", self._schedule_params(start_date, end_date, select)
+        )
     
-    async def get_prices(self, route_id: str, departure_date: date) -> Optional[List[Dict]]:
-        """Получение цен на маршрут"""
+    async def get_route_schedule(
+        self, route_id: str, start_date: date, end_date: date, select: Optional[Sequence[str]] = None
+    ) -> Optional[List[Dict]]:
+        """Получение расписания маршрута"""
+        return await self._collect(
+            "InformationRegister_РасписаниеРейсов", self._schedule_params(start_date, end_date, select)
+        )
+    
+    def prices_request(
+        self, route_id: str, departure_date: date, select: Optional[Sequence[str]] = None
+    ) -> GARSRequest:
         filter_query = f"Date eq datetime'{departure_date.isoformat()}T00:00:00'"
-        params = {
+        return "InformationRegister_ДействующиеТарифы", _with_select({
             "$filter": filter_query,
             "$format": "json"
-        }
-        
-        response = await self._make_request("GET", "InformationRegister_ДействующиеТарифы", params)
+        }, select)
+
+    async def get_prices(
+        self, route_id: str, departure_date: date, select: Optional[Sequence[str]] = None
+    ) -> Optional[List[Dict]]:
+        """Получение цен на маршрут"""
+        endpoint, params = self.prices_request(route_id, departure_date, select)
+        response = await self._make_request("GET", endpoint, params)
         
         if response and "value" in response:
             return response["value"]
         return None
-    
-    async def check_seats_availability(self, route_id: str, departure_date: date) -> Optional[Dict]:
-        """Проверка доступности мест"""
+
+    def seats_request(
+        self, route_id: str, departure_date: date, select: Optional[Sequence[str]] = None
+    ) -> GARSRequest:
         filter_query = f"Route eq '{route_id}' and Date eq datetime'{departure_date.isoformat()}T00:00:00'"
-        params = {
+        return "InformationRegister_ЗанятостьМест", _with_select({
             "$filter": filter_query,
             "$format": "json"
-        }
-        
-        response = await self._make_request("GET", "InformationRegister_ЗанятостьМест", params)
+        }, select)
+    
+    async def check_seats_availability(
+        self, route_id: str, departure_date: date, select: Optional[Sequence[str]] = None
+    ) -> Optional[Dict]:
+        """Проверка доступности мест"""
+        endpoint, params = self.seats_request(route_id, departure_date, select)
+        response = await self._make_request("GET", endpoint, params)
         
         if response and "value" in response:
             return response["value"]
@@ -110,20 +407,166 @@ class GARSClient:
         )
         return response
 
-    async def get_route_timetables(self, route_id: str) -> Optional[List[Dict]]:
+    def _timetables_params(self, route_id: str, select: Optional[Sequence[str]]) -> Dict[str, str]:
+        return _with_select({
+            "$filter": f"Маршрут_Key eq guid'{route_id}'",
+            "$expand": "Остановки",
+            "$orderby": "Ref_Key",
+        }, select)
+
+    def timetables_request(self, route_id: str, select: Optional[Sequence[str]] = None) -> GARSRequest:
+        return "Catalog_РейсыРасписания", self._timetables_params(route_id, select)
+
+    def iter_route_timetables(self, route_id: str, select: Optional[Sequence[str]] = None) -> AsyncIterator[Dict]:
+        """Постраничный обход Catalog_РейсыРасписания по маршруту"""
+        return self.iter_records("Catalog_РейсыРасписания", self._timetables_params(route_id, select))
+
+    async def get_route_timetables(self, route_id: str, select: Optional[Sequence[str]] = None) -> Optional[List[Dict]]:
         """
         Расписания рейсов из Catalog_РейсыРасписания по конкретному маршруту.
 
         route_id = Ref_Key из Catalog_Маршруты
+        select — список полей ($select); раскрытые Остановки нужно указывать явно.
         """
-        params = {
-            "$filter": f"Маршрут_Key eq guid'{route_id}'",
-            "$format": "json",
-            "$expand": "Остановки"
-        }
+        return await self._collect("Catalog_РейсыРасписания", self._timetables_params(route_id, select))
 
-        response = await self._make_request("GET", "Catalog_РейсыРасписания", params)
+    async def get_route_timetables_many(
+        self, route_ids: Sequence[str], select: Optional[Sequence[str]] = None
+    ) -> Dict[str, Optional[List[Dict]]]:
+        """
+        Расписания рейсов сразу по нескольким маршрутам (одним $batch).
+        None у маршрута — запрос не удался (в отличие от [] — рейсов нет).
+        """
+        results = await self.batch_get([self.timetables_request(r, select) for r in route_ids])
+        return dict(zip(route_ids, results))
 
-        if response and "value" in response:
+    # ---------- $batch ----------
+
+    async def batch_get(self, requests: Sequence[GARSRequest]) -> List[Optional[List[Dict]]]:
+        """
+        Выполняет несколько GET-запросов на чтение коллекций.
+
+        Запросы упаковываются в OData $batch (multipart/mixed) пачками по
+        batch_size — один HTTP round trip на пачку. Если $batch не сработал,
+        запросы пачки уходят параллельно по одному; а если 1С ответил, что
+        $batch не поддерживается (404/405/501), больше его не пробуем.
+
+        Если 1С отдал коллекцию не целиком (в ответе есть odata.nextLink),
+        она дочитывается постранично через iter_collection.
+
+        Возвращает список в порядке запросов: вся коллекция или None,
+        если конкретный запрос не удался. Если 1С недоступен целиком —
+        GARSUnavailableError.
+        """
+        requests = [(endpoint, {**params, "$format": "json"}) for endpoint, params in requests]
+
+        results: List[Optional[List[Dict]]] = []
+        for start in range(0, len(requests), self.batch_size):
+            chunk = requests[start:start + self.batch_size]
+            responses = None
+            if self.batch_enabled and len(chunk) > 1:
+                responses = await self.flight.do(
+                    "$batch " + "|".join(self._flight_key("GET", e, p) for e, p in chunk),
+                    lambda chunk=chunk: self._send_batch(chunk),
+                )
+            if responses is None:
+                responses = await asyncio.gather(
+                    *(self._make_request("GET", endpoint, params) for endpoint, params in chunk)
+                )
+            results.extend(await asyncio.gather(
+                *(self._collection(endpoint, params, response) for (endpoint, params), response in zip(chunk, responses))
+            ))
+        return results
+
+    async def _collection(
+        self, endpoint: str, params: Dict[str, str], response: Optional[Dict]
+    ) -> Optional[List[Dict]]:
+        """Коллекция из ответа на одиночный запрос; с odata.nextLink — дочитывает остальное."""
+        if not isinstance(response, dict) or "value" not in response:
+            return None
+        if not _next_link(response):
             return response["value"]
-        return None
\ No newline at end of file
+        # первая страница серверной разбивки: обходим коллекцию целиком с теми же
+        # ограничениями, что и у iter_collection (max_pages, повтор страниц)
+        return await self._collect(endpoint, params)
+
+    @staticmethod
+    def _batch_part_url(endpoint: str, params: Dict[str, str]) -> str:
+        query = urlencode(params, quote_via=quote, safe="$,'")
+        return f"{quote(endpoint)}?{query}" if query else quote(endpoint)
+
+    def _build_batch_body(self, boundary: str, requests: Sequence[GARSRequest]) -> str:
+        parts = []
+        for endpoint, params in requests:
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                "Content-Transfer-Encoding: binary\r\n"
+                "\r\n"
+                f"GET {self._batch_part_url(endpoint, params)} HTTP/1.1\r\n"
+                "Accept: application/json\r\n"
+                "\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        return "".join(parts)
+
+    @staticmethod
+    def _parse_batch_response(content_type: str, body: str) -> List[Optional[Dict]]:
+        """Разбор multipart/mixed ответа $batch на отдельные JSON-ответы (None — часть с ошибкой)."""
+        boundary = None
+        for item in content_type.split(";"):
+            key, _, value = item.strip().partition("=")
+            if key.lower() == "boundary":
+                boundary = value.strip('"')
+        if not boundary:
+            raise ValueError("В ответе $batch нет boundary")
+
+        results: List[Optional[Dict]] = []
+        for part in body.split(f"--{boundary}")[1:]:
+            if part.startswith("--"):
+                break
+            # part: заголовки MIME, пустая строка, HTTP-ответ (статус, заголовки, тело)
+            sections = part.replace("\r\n", "\n").split("\n\n", 2)
+            if len(sections) < 3:
+                raise ValueError("Некорректная часть ответа $batch")
+            status_line = sections[1].strip().split("\n", 1)[0]
+            status = int(status_line.split(" ")[1])
+            if status != 200:
+                results.append(None)
+                continue
+            results.append(fast_json.loads(sections[2].strip()))
+        return results
+
+    async def _send_batch(self, requests: Sequence[GARSRequest]) -> Optional[List[Optional[Dict]]]:
+        """Один $batch-запрос; None — $batch не сработал, нужен fallback."""
+        boundary = f"batch_{uuid.uuid4().hex}"
+        body = self._build_batch_body(boundary, requests)
+
+        # $batch состоит только из чтений, поэтому его можно повторять
+        status, headers, body = await self._execute(
+            "POST",
+            f"{self.base_url}$batch",
+            data=body.encode("utf-8"),
+            headers={"Content-Type": f"multipart/mixed; boundary={boundary}"},
+            idempotent=True,
+        )
+        if status in BATCH_UNSUPPORTED_STATUSES:
+            logger.warning(f"GARS $batch is not supported ({status}), falling back to single requests")
+            self.batch_enabled = False
+            return None
+        if status not in (200, 202):
+            logger.error(f"GARS $batch error: {status} - {body[:300].decode('utf-8', errors='replace')}")
+            return None
+        try:
+            results = self._parse_batch_response(
+                headers.get("Content-Type", ""), body.decode("utf-8", errors="replace")
+            )
+        except (ValueError, IndexError, AttributeError) as e:
+            # Обрезанное тело, ответ прокси и т.п. — fallback только для этого вызова
+            logger.warning(f"GARS $batch response is malformed ({e!r}), falling back to single requests")
+            return None
+
+        if len(results) != len(requests):
+            logger.error(f"GARS $batch returned {len(results)} parts for {len(requests)} requests")
+            return None
+        return results
@@ -0,0 +1,270 @@
+"""
+Транспорты HTTP для GARSClient.
+
+- AiohttpTransport   — боевой: общая aiohttp-сессия с пулом keep-alive соединений;
+- ReplayTransport    — офлайн-замена 1С: отдаёт записанные ответы с настраиваемой
+                       задержкой и инъекцией ошибок (нагрузочные тесты, бенчмарки);
+- RecordingTransport — ходит в настоящий 1С через другой транспорт и сохраняет
+                       ответы как фикстуры для ReplayTransport.
+
+Выбор транспорта — переменной окружения GARS_TRANSPORT=live|replay|record,
+каталог фикстур — GARS_FIXTURES_DIR.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote
+
+import aiohttp
+
+from app.logging_config import logger
+
+# (status, headers, body)
+TransportResponse = Tuple[int, Dict[str, str], bytes]
+
+# Граница multipart в $batch случайная — для ключа фикстуры её нормализуем
+_BOUNDARY_RE = re.compile(rb"batch_[0-9a-f]{32}")
+
+
+class AiohttpTransport:
+    """Запросы к 1С через одну долгоживущую aiohttp-сессию."""
+
+    def __init__(self, username: Optional[str], password: Optional[str], timeout: float, connect_timeout: float):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+
+        # Параметры пула соединений
+        self.pool_size          = int(os.getenv("GARS_POOL_SIZE", 20))
+        self.pool_size_per_host = int(os.getenv("GARS_POOL_SIZE_PER_HOST", 10))
+        self.keepalive_timeout  = int(os.getenv("GARS_KEEPALIVE_TIMEOUT", 60))
+        self.dns_cache_ttl      = int(os.getenv("GARS_DNS_CACHE_TTL", 300))
+
+        # Создание Basic Auth заголовка
+        credentials = f"{username}:{password}"
+        encoded_credentials = base64.b64encode(credentials.encode()).decode()
+        self.auth_header = f"Basic {encoded_credentials}"
+
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": self.auth_header,
+            "Accept": "application/json",
+            "Content-Type": "application/json"
+        }
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout),
+            headers=self._get_headers(),
+        )
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Общая сессия; пересоздаётся, если её успели закрыть.
+
+        Между проверкой и созданием нет await, поэтому гонки внутри
+        одного event loop здесь невозможны.
+        """
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    async def startup(self) -> None:
+        self._get_session()
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict] = None,
+        data: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> TransportResponse:
+        session = self._get_session()
+        async with session.request(method, url, params=params, data=data, headers=headers) as response:
+            body = await response.read()
+            return response.status, dict(response.headers), body
+
+
+def fixture_path(fixtures_dir: Path, base_url: str, method: str, url: str,
+                 params: Optional[Dict], data: Optional[bytes]) -> Path:
+    """
+    Путь к фикстуре запроса: <каталог>/<коллекция>/<метод>_<хэш>.json.
+
+    Хэш считается от метода, пути относительно base_url, отсортированных
+    параметров и тела (с нормализованной границей $batch).
+    """
+    path = unquote(url[len(base_url):] if base_url and url.startswith(base_url) else url)
+    collection = re.sub(r"[^\w$-]+", "_", path.split("?", 1)[0]) or "_root"
+
+    digest = hashlib.sha1()
+    digest.update(method.upper().encode("utf-8"))
+    digest.update(path.encode("utf-8"))
+    digest.update(json.dumps(sorted((params or {}).items()), ensure_ascii=False).encode("utf-8"))
+    if data:
+        digest.update(_BOUNDARY_RE.sub(b"batch_fixture", data))
+    return fixtures_dir / collection / f"{method.lower()}_{digest.hexdigest()[:16]}.json"
+
+
+class ReplayTransport:
+    """
+    Офлайн-стенд 1С: отвечает записанными фикстурами.
+
+    GARS_REPLAY_LATENCY_MS — средняя задержка ответа, GARS_REPLAY_JITTER_MS — разброс;
+    GARS_REPLAY_ERROR_RATE — доля запросов с ошибкой (0..1),
+    GARS_REPLAY_ERROR_MODE — status (503), timeout или connection.
+    Незаписанный запрос получает 404.
+    """
+
+    def __init__(self, fixtures_dir: str, base_url: str):
+        self.fixtures_dir = Path(fixtures_dir)
+        self.base_url = base_url or ""
+        self.latency = float(os.getenv("GARS_REPLAY_LATENCY_MS", 0)) / 1000
+        self.jitter = float(os.getenv("GARS_REPLAY_JITTER_MS", 0)) / 1000
+        self.error_rate = float(os.getenv("GARS_REPLAY_ERROR_RATE", 0))
+        self.error_mode = os.getenv("GARS_REPLAY_ERROR_MODE", "status")
+
+    async def startup(self) -> None:
+        if not self.fixtures_dir.is_dir():
+            logger.warning(f"GARS replay: fixtures dir {self.fixtures_dir} does not exist")
+
+    async def close(self) -> None:
+        pass
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict] = None,
+        data: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> TransportResponse:
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and random.random() < self.error_rate:
+            if self.error_mode == "timeout":
+                raise asyncio.TimeoutError("GARS replay: injected timeout")
+            if self.error_mode == "connection":
+                raise aiohttp.ClientConnectionError("GARS replay: injected connection error")
+            return 503, {"Content-Type": "text/plain"}, b"GARS replay: injected error"
+
+        path = fixture_path(self.fixtures_dir, self.base_url, method, url, params, data)
+        if not path.exists():
+            logger.warning(f"GARS replay: no fixture for {method} {url} {params} ({path})")
+            return 404, {"Content-Type": "text/plain"}, b"GARS replay: fixture not recorded"
+
+        fixture = json.loads(path.read_text(encoding="utf-8"))
+        return fixture["status"], fixture.get("headers", {}), fixture["body"].encode("utf-8")
+
+
+class RecordingTransport:
+    """Прокси к настоящему 1С, сохраняющий ответы как фикстуры для ReplayTransport."""
+
+    def __init__(self, inner, fixtures_dir: str, base_url: str):
+        self.inner = inner
+        self.fixtures_dir = Path(fixtures_dir)
+        self.base_url = base_url or ""
+
+    async def startup(self) -> None:
+        await self.inner.startup()
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict] = None,
+        data: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> TransportResponse:
+        status, resp_headers, body = await self.inner.request(method, url, params, data, headers)
+
+        path = fixture_path(self.fixtures_dir, self.base_url, method, url, params, data)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fixture = {
+            "request": {"method": method, "url": url, "params": params or {}},
+            "status": status,
+            "headers": {k: v for k, v in resp_headers.items() if k.lower() == "content-type"},
+            "body": body.decode("utf-8", errors="replace"),
+        }
+        path.write_text(json.dumps(fixture, ensure_ascii=False, indent=1), encoding="utf-8")
+        return status, resp_headers, body
+
+
+def create_transport(base_url: str, username: Optional[str], password: Optional[str],
+                     timeout: float, connect_timeout: float):
+    """Транспорт по GARS_TRANSPORT: live (по умолчанию), replay или record."""
+    mode = os.getenv("GARS_TRANSPORT", "live")
+    fixtures_dir = os.getenv("GARS_FIXTURES_DIR", "fixtures/gars")
+
+    if mode == "replay":
+        return ReplayTransport(fixtures_dir, base_url)
+
+    live = AiohttpTransport(username, password, timeout, connect_timeout)
+    if mode == "record":
+        return RecordingTransport(live, fixtures_dir, base_url)
+    return live
+
+
+async def _record_fixtures(routes_limit: int, days: int) -> None:
+    """Снимает фикстуры основных коллекций 1С, которые использует поиск."""
+    from datetime import date, timedelta
+    from app.utils.gars_client import GARSClient, ROUTE_FIELDS, TIMETABLE_FIELDS
+
+    client = GARSClient()
+    await client.startup()
+    try:
+        routes = await client.get_routes(select=ROUTE_FIELDS) or []
+        await client.get_routes()
+        route_ids = [r["Ref_Key"] for r in routes[:routes_limit] if r.get("Ref_Key")]
+        await client.get_route_timetables_many(route_ids, select=TIMETABLE_FIELDS)
+        for route_id in route_ids:
+            await client.get_route_timetables(route_id, select=TIMETABLE_FIELDS)
+
+        start, end = date.today(), date.today() + timedelta(days=days)
+        await client.get_route_schedule("", start, end)
+        trips_filter = (
+            f"Date ge datetime'{start.isoformat()}T00:00:00' and "
+            f"Date le datetime'{end.isoformat()}T23:59:59'"
+        )
+        async for _ in client.iter_collection("Document_Рейс", {"$filter": trips_filter}):
+            pass
+        logger.info(f"GARS fixtures recorded for {len(route_ids)} routes")
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    # Запись фикстур: GARS_TRANSPORT=record python -m app.utils.gars_transport [routes] [days]
+    import sys
+
+    if os.getenv("GARS_TRANSPORT") != "record":
+        sys.exit("Set GARS_TRANSPORT=record to capture fixtures")
+    asyncio.run(_record_fixtures(
+        routes_limit=int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        days=int(sys.argv[2]) if len(sys.argv) > 2 else 7,
+    ))
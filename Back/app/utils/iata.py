@@ -0,0 +1,27 @@
+# ---------- мини-словарь город → IATA ----------
+CITY_IATA = {
+    "москва": "MOW", "санкт-петербург": "LED", "новосибирск": "OVB",
+    "екатеринбург": "SVX", "казань": "KZN", "сочи": "AER",
+    "владивосток": "VVO", "краснодар": "KRR", "самара": "KUF",
+    "уфа": "UFA", "красноярск": "KJA", "омск": "OMS",
+    "челябинск": "CEK", "иркутск": "IKT", "нижний новгород": "GOJ",
+    "пермь": "PEE", "ростов": "ROV", "волгоград": "VOG",
+    "астрахань": "ASF", "мурманск": "MMK", "петропавловск-камчатский": "PKC",
+    "якутск": "YKS",
+}
+# -----------------------------------------------
+
+
+def city_to_iata(city: str) -> str:
+    """
+    Возвращает IATA-код по-русски или уже готовому коду.
+    Если не нашли в словаре, считаем, что это уже IATA (3 лат. буквы)
+    и просто возвращаем upper().
+    """
+    c = " ".join(city.split()).lower()
+    if c in CITY_IATA:
+        return CITY_IATA[c]
+    if len(c) == 3 and c.isalpha():
+        return c.upper()
+    # backend-версия: не спрашиваем пользователя, просто вернём как есть
+    return c.upper()
@@ -0,0 +1,55 @@
+import fnmatch
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+class LocalTTLCache:
+    """In-process кэш (L1) с TTL на запись и вытеснением LRU.
+
+    Хранит уже декодированные объекты: попадание не требует ни сетевого
+    обращения, ни разбора JSON. Объекты общие для всех читателей —
+    менять их на месте нельзя.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(найдено, значение); просроченные записи удаляются при чтении."""
+        item = self._data.get(key)
+        if item is None:
+            return False, None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def delete_pattern(self, pattern: str) -> None:
+        for key in [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def remaining_ttl(self, key: str) -> Optional[float]:
+        item = self._data.get(key)
+        return None if item is None else max(0.0, item[0] - time.monotonic())
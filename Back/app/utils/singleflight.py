@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Склейка одинаковых одновременных запросов (single-flight).
+
+    Пока запрос с ключом key выполняется, все остальные вызовы с тем же
+    ключом не идут в апстрим, а ждут тот же результат. Результат общий
+    для всех ожидающих — менять его на месте нельзя.
+
+    Сам запрос выполняется в отдельной задаче: если первый вызвавший
+    отменён (клиент отключился), остальные всё равно получат ответ.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.calls = 0       # всего вызовов do()
+        self.executed = 0    # реально ушло в апстрим
+        self.collapsed = 0   # присоединились к уже идущему запросу
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executed += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # помечаем исключение как полученное, даже если все ожидающие отменены
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._inflight),
+        }
@@ -0,0 +1,45 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+
+class StepTimer:
+    """Замер длительности шагов многошагового сценария (поиск S7 и т.п.).
+
+        timer = StepTimer("S7 search")
+        with timer.step("open"):
+            ...
+        logger.info(timer.summary())
+
+    step() — обычный контекстный менеджер, поэтому годится и для sync,
+    и для async кода (with вокруг await).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.steps: List[Tuple[str, float]] = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - started))
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self._started
+
+    def as_dict(self) -> Dict[str, float]:
+        """Шаг -> мс (повторяющиеся шаги суммируются)."""
+        result: Dict[str, float] = {}
+        for name, seconds in self.steps:
+            result[name] = round(result.get(name, 0.0) + seconds * 1000, 1)
+        return result
+
+    def summary(self) -> str:
+        """'S7 search: 8.4s (open 1.20s, origin 0.85s, ...)'"""
+        steps = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.steps)
+        return f"{self.name}: {self.total:.1f}s ({steps})"
@@ -0,0 +1,88 @@
+"""
+Бенчмарк разбора выдачи S7 из DOM: поузловой extract_cards_per_node
+(get_attribute / inner_text / .all() на каждую карточку) против
+extract_cards_bulk (один page.evaluate на всю выдачу).
+
+Страницы загружаются в Chromium через page.set_content, без сети:
+
+- сохранённые страницы выдачи — пути к .html или каталог с ними
+  (S7_SAVE_PAGES_DIR=<каталог> заставляет run_s7_search сохранять
+  каждую выдачу);
+- без аргументов — синтетическая выдача на 10/30/100 карточек с той же
+  разметкой, что читает парсер.
+
+Скрипт проверяет, что оба способа дают одинаковые рейсы.
+
+Запуск: python -m benchmarks.bench_s7_dom_extract [файл.html | каталог ...] [--repeat N]
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from playwright.sync_api import sync_playwright
+
+from app.services.s7_parser import extract_cards_bulk, extract_cards_per_node
+
+
+def _synthetic_page(cards: int) -> str:
+    items = []
+    for i in range(cards):
+        tariffs = "".join(
+            f'<div data-qa="cost_tariffItem">{12_000 + i * 150 + k * 2_500:,} ₽</div>'.replace(",", " ")
+            for k in range(3)
+        )
+        items.append(
+            f'<div data-qa="tripItem" data-direction="{"MOW-YKS" if i % 2 else "YKS-MOW"}">'
+            f'<div class="card_title_logo__x1">S7 Airlines</div>'
+            f'<div class="card_segment_route__time__a">{i % 24:02d}:15</div>'
+            f'<div class="card_segment_route__place">Москва</div>'
+            f'<div class="card_segment_route__time__b">{(i + 6) % 24:02d}:40</div>'
+            f'<div class="card_tariffs">{tariffs}</div>'
+            f'</div>'
+        )
+    return f"<html><body><main>{''.join(items)}</main></body></html>"
+
+
+def _load_pages(args: List[str]) -> List[Tuple[str, str]]:
+    pages: List[Tuple[str, str]] = []
+    for arg in args:
+        path = Path(arg)
+        files = sorted(path.glob("*.html")) if path.is_dir() else [path]
+        pages += [(f.name, f.read_text(encoding="utf-8")) for f in files]
+    return pages
+
+
+def _timed(fn: Callable[[], object], repeat: int) -> Tuple[float, object]:
+    result = fn()  # прогрев
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main(argv: List[str]) -> None:
+    repeat = 5
+    if "--repeat" in argv:
+        i = argv.index("--repeat")
+        repeat = int(argv[i + 1])
+        argv = argv[:i] + argv[i + 2:]
+
+    pages = _load_pages(argv) or [(f"synthetic x{n}", _synthetic_page(n)) for n in (10, 30, 100)]
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        print(f"{'page':<28}{'cards':>7}{'per-node ms':>13}{'bulk ms':>10}{'speedup':>9}  same")
+        for name, html in pages:
+            page.set_content(html)
+            per_node, expected = _timed(lambda: extract_cards_per_node(page), repeat)
+            bulk, actual = _timed(lambda: extract_cards_bulk(page), repeat)
+            print(f"{name[:27]:<28}{len(expected):>7}{per_node * 1000:>13.1f}{bulk * 1000:>10.1f}"
+                  f"{per_node / bulk if bulk else 0:>8.1f}x  {'yes' if actual == expected else 'NO'}")
+        browser.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
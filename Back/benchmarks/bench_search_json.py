@@ -0,0 +1,150 @@
+"""
+Бенчмарк JSON на горячем пути /api/v1/routes/search.
+
+Сравнивает стандартный json (как было: response.json() в aiohttp,
+json.dumps(ensure_ascii=False) в кэше, JSONResponse в FastAPI)
+с app.utils.fast_json на одном «запросе» поиска туда-обратно:
+
+- разбор ответа 1С (каталог маршрутов + 2 расписания с остановками),
+- запись их в кэш,
+- чтение из кэша: маршруты, 2 расписания, 2 списка рейсов S7,
+- сериализация итогового ответа.
+
+Если задан GARS_FIXTURES_DIR с записанными фикстурами (см. gars_transport),
+берутся реальные ответы 1С, иначе — синтетические данные похожей формы.
+
+Запуск: python -m benchmarks.bench_search_json [итераций]
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from app.utils import fast_json
+
+BOM = "\ufeff".encode("utf-8")
+
+
+def _synthetic_routes(n: int = 600) -> Dict[str, Any]:
+    return {"value": [
+        {
+            "Ref_Key": f"00000000-0000-0000-0000-{i:012d}",
+            "Description": f"Якутск Автовокзал — Пункт {i} с.",
+            "Code": f"{i:09d}",
+            "Комментарий": "Маршрут пригородного сообщения",
+            "DataVersion": "AAAAAAAAABc=",
+            "DeletionMark": False,
+        }
+        for i in range(n)
+    ]}
+
+
+def _synthetic_timetables(n: int = 12, stops: int = 15) -> Dict[str, Any]:
+    return {"value": [
+        {
+            "Ref_Key": f"11111111-0000-0000-0000-{i:012d}",
+            "Description": f"Рейс {i}",
+            "ВремяОтправления": "0001-01-01T08:30:00",
+            "ВремяПрибытия": "0001-01-01T14:00:00",
+            "РегулярностьТип": "ЧислаМесяца",
+            "РегулярностьДниИЧисла": "2,4,6,8,10,12,14,16,18,20,22,24,26,28,30",
+            "Остановки": [
+                {
+                    "LineNumber": str(j + 1),
+                    "Остановка_Key": f"22222222-0000-0000-0000-{j:012d}",
+                    "ВремяПрибытия": "0001-01-01T09:00:00",
+                    "ВремяОтправления": "0001-01-01T09:05:00",
+                    "Расстояние": 12.5 * j,
+                }
+                for j in range(stops)
+            ],
+        }
+        for i in range(n)
+    ]}
+
+
+def _synthetic_flights(n: int = 20) -> List[Dict[str, Any]]:
+    return [
+        {"flight_no": f"S7 {3000 + i}", "dep_time": "10:15", "arr_time": "21:40", "price_rub": 25000 + i * 100}
+        for i in range(n)
+    ]
+
+
+def _load_payloads() -> Dict[str, bytes]:
+    """Сырые ответы 1С: из фикстур, если есть, иначе синтетика (с BOM, как у 1С)."""
+    fixtures_dir = os.getenv("GARS_FIXTURES_DIR")
+    payloads: Dict[str, bytes] = {}
+    if fixtures_dir:
+        for name, folder in (("routes", "Catalog_Маршруты"), ("timetables", "Catalog_РейсыРасписания")):
+            files = sorted(Path(fixtures_dir, folder).glob("get_*.json"), key=lambda p: p.stat().st_size)
+            if files:
+                payloads[name] = json.loads(files[-1].read_text(encoding="utf-8"))["body"].encode("utf-8")
+    payloads.setdefault("routes", BOM + json.dumps(_synthetic_routes(), ensure_ascii=False).encode("utf-8"))
+    payloads.setdefault("timetables", BOM + json.dumps(_synthetic_timetables(), ensure_ascii=False).encode("utf-8"))
+    return payloads
+
+
+def _stdlib_request(payloads: Dict[str, bytes], flights: List[Dict[str, Any]]) -> bytes:
+    # разбор ответов 1С
+    routes = json.loads(payloads["routes"].decode("utf-8").lstrip("\ufeff"))["value"]
+    timetables = json.loads(payloads["timetables"].decode("utf-8").lstrip("\ufeff"))["value"]
+    # запись в кэш
+    cached = {
+        "routes": json.dumps(routes, ensure_ascii=False).encode("utf-8"),
+        "timetable": json.dumps(timetables, ensure_ascii=False).encode("utf-8"),
+        "flights": json.dumps(flights, ensure_ascii=False).encode("utf-8"),
+    }
+    # чтения из кэша (как было: bytes -> str -> json.loads)
+    routes = json.loads(cached["routes"].decode("utf-8"))
+    t_out = json.loads(cached["timetable"].decode("utf-8"))
+    t_back = json.loads(cached["timetable"].decode("utf-8"))
+    f_out = json.loads(cached["flights"].decode("utf-8"))
+    f_back = json.loads(cached["flights"].decode("utf-8"))
+    response = {"routes": len(routes), "outbound": [f_out, t_out[:6]], "return": [t_back[:6], f_back]}
+    return json.dumps(response, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _fast_request(payloads: Dict[str, bytes], flights: List[Dict[str, Any]]) -> bytes:
+    routes = fast_json.loads(payloads["routes"])["value"]
+    timetables = fast_json.loads(payloads["timetables"])["value"]
+    cached = {
+        "routes": fast_json.dumps(routes),
+        "timetable": fast_json.dumps(timetables),
+        "flights": fast_json.dumps(flights),
+    }
+    routes = fast_json.loads(cached["routes"])
+    t_out = fast_json.loads(cached["timetable"])
+    t_back = fast_json.loads(cached["timetable"])
+    f_out = fast_json.loads(cached["flights"])
+    f_back = fast_json.loads(cached["flights"])
+    response = {"routes": len(routes), "outbound": [f_out, t_out[:6]], "return": [t_back[:6], f_back]}
+    return fast_json.dumps(response)
+
+
+def _measure(fn, payloads, flights, iterations: int) -> float:
+    fn(payloads, flights)  # прогрев
+    start = time.process_time()
+    for _ in range(iterations):
+        fn(payloads, flights)
+    return (time.process_time() - start) / iterations
+
+
+def main(iterations: int = 200) -> None:
+    payloads = _load_payloads()
+    flights = _synthetic_flights()
+    print(f"payloads: routes {len(payloads['routes']) / 1024:.1f} KiB, "
+          f"timetables {len(payloads['timetables']) / 1024:.1f} KiB; backend: "
+          f"{'orjson' if fast_json.orjson is not None else 'json (orjson not installed)'}")
+
+    stdlib = _measure(_stdlib_request, payloads, flights, iterations)
+    fast = _measure(_fast_request, payloads, flights, iterations)
+    print(f"stdlib json : {stdlib * 1000:8.3f} ms CPU / request")
+    print(f"fast_json   : {fast * 1000:8.3f} ms CPU / request")
+    print(f"saved       : {(stdlib - fast) * 1000:8.3f} ms CPU / request ({stdlib / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,121 @@
+"""
+Отчёт: сколько памяти Redis и времени (де)кодирования экономят форматы
+CacheCodec на реальных ключах кэша.
+
+Скрипт обходит ключи через SCAN (по умолчанию gars:* и s7:*), читает
+значения, декодирует их (JSON или уже msgpack) и для каждого
+пространства имён сравнивает:
+
+- размер: json / json+zstd / json+lz4 / msgpack / msgpack+zstd / msgpack+lz4
+  (как их записал бы CacheCodec с текущим CACHE_COMPRESS_MIN_BYTES)
+  и фактический MEMORY USAGE ключа в Redis;
+- время decode (то, что платит каждое чтение) и encode.
+
+Ничего в Redis не пишет. Без REDIS_URL или при пустом Redis берутся
+синтетические данные (см. bench_search_json) — они однообразнее
+настоящих и сжимаются заметно лучше.
+
+Запуск: python -m benchmarks.cache_codec_report [паттерн ...] [--limit N]
+"""
+
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Tuple
+
+import redis
+
+from app.utils.cache import key_namespace
+from app.utils.cache_codec import CacheCodec
+
+CODECS = {
+    "json": CacheCodec(codec="json", compression="none"),
+    "json+zstd": CacheCodec(codec="json", compression="zstd"),
+    "json+lz4": CacheCodec(codec="json", compression="lz4"),
+    "msgpack": CacheCodec(codec="msgpack", compression="none"),
+    "msgpack+zstd": CacheCodec(codec="msgpack", compression="zstd"),
+    "msgpack+lz4": CacheCodec(codec="msgpack", compression="lz4"),
+}
+
+
+def _timed(fn: Callable[[], Any], repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def _load_real(patterns: List[str], limit: int) -> List[Tuple[str, Any, int]]:
+    """(ключ, значение, MEMORY USAGE) для не более чем limit ключей."""
+    client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    decoder = CODECS["json"]
+    samples: List[Tuple[str, Any, int]] = []
+    for pattern in patterns:
+        for key in client.scan_iter(match=pattern, count=500):
+            if len(samples) >= limit:
+                return samples
+            raw = client.get(key)
+            if not raw:
+                continue
+            try:
+                value = decoder.decode(raw)
+            except Exception:
+                continue  # не наш формат (счётчики, блокировки)
+            samples.append((key.decode("utf-8", "replace"), value, client.memory_usage(key) or 0))
+    return samples
+
+
+def _load_synthetic() -> List[Tuple[str, Any, int]]:
+    from benchmarks.bench_search_json import _synthetic_flights, _synthetic_routes, _synthetic_timetables
+
+    samples = [("gars:routes:filtered", _synthetic_routes()["value"], 0)]
+    samples += [(f"gars:timetable:{i}", _synthetic_timetables()["value"], 0) for i in range(50)]
+    samples += [(f"s7:city{i}:Якутск", _synthetic_flights(), 0) for i in range(50)]
+    return samples
+
+
+def main(argv: List[str]) -> None:
+    limit = 2000
+    if "--limit" in argv:
+        i = argv.index("--limit")
+        limit = int(argv[i + 1])
+        argv = argv[:i] + argv[i + 2:]
+    patterns = argv or ["gars:*", "s7:*"]
+
+    samples: List[Tuple[str, Any, int]] = []
+    if os.getenv("REDIS_URL"):
+        samples = _load_real(patterns, limit)
+    source = "redis"
+    if not samples:
+        samples, source = _load_synthetic(), "synthetic"
+
+    # namespace -> codec -> [bytes, encode s, decode s]
+    totals: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(lambda: [0.0, 0.0, 0.0]))
+    memory: Dict[str, int] = defaultdict(int)
+    counts: Dict[str, int] = defaultdict(int)
+    for key, value, mem in samples:
+        namespace = key_namespace(key.split("#", 1)[0])
+        counts[namespace] += 1
+        memory[namespace] += mem
+        for name, codec in CODECS.items():
+            raw = codec.encode(value)
+            row = totals[namespace][name]
+            row[0] += len(raw)
+            row[1] += _timed(lambda: codec.encode(value))
+            row[2] += _timed(lambda: codec.decode(raw))
+
+    print(f"source: {source}, keys: {len(samples)}, compress_min_bytes: "
+          f"{CODECS['msgpack+zstd'].compress_min_bytes}")
+    for namespace in sorted(totals):
+        print(f"\n{namespace}: {counts[namespace]} keys"
+              + (f", MEMORY USAGE now {memory[namespace] / 1024:.1f} KiB" if memory[namespace] else ""))
+        base_size, _, base_decode = totals[namespace]["json"]
+        print(f"  {'codec':<14}{'size KiB':>10}{'vs json':>9}{'encode ms':>11}{'decode ms':>11}{'vs json':>9}")
+        for name, (size, enc, dec) in totals[namespace].items():
+            print(f"  {name:<14}{size / 1024:>10.1f}{size / base_size:>8.0%} "
+                  f"{enc * 1000:>10.2f} {dec * 1000:>10.2f}{dec / base_decode:>8.0%}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+from app.utils.cache import cache_service
+from app.utils.gars_client import GARSClient
+from app.utils.gars_transport import ReplayTransport, fixture_path
+
+GARS_BASE_URL = "http://gars.test/odata/standard.odata/"
+
+
+class CountingReplayTransport(ReplayTransport):
+    """ReplayTransport, запоминающий запросы (сколько реально ушло в «1С»)."""
+
+    def __init__(self, fixtures_dir: str, base_url: str):
+        super().__init__(fixtures_dir, base_url)
+        self.requests: List[Tuple[str, str, Optional[Dict]]] = []
+
+    async def request(self, method, url, params=None, data=None, headers=None):
+        self.requests.append((method, url, params))
+        return await super().request(method, url, params=params, data=data, headers=headers)
+
+
+class GARSStand:
+    """Записанные ответы 1С в том виде, в каком их сохраняет RecordingTransport."""
+
+    base_url = GARS_BASE_URL
+
+    def __init__(self, fixtures_dir: Path):
+        self.fixtures_dir = fixtures_dir
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict] = None,
+        status: int = 200,
+        body: str = "",
+        content_type: str = "application/json",
+        data: Optional[bytes] = None,
+    ) -> None:
+        url = url if url.startswith("http") else GARS_BASE_URL + url
+        path = fixture_path(self.fixtures_dir, GARS_BASE_URL, method, url, params, data)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fixture = {
+            "request": {"method": method, "url": url, "params": params or {}},
+            "status": status,
+            "headers": {"Content-Type": content_type},
+            "body": body,
+        }
+        path.write_text(json.dumps(fixture, ensure_ascii=False), encoding="utf-8")
+
+    def collection(self, url: str, params: Optional[Dict], records: List[Any], **extra: Any) -> None:
+        """Страница OData-коллекции: {"value": records, ...extra}."""
+        self.record("GET", url, params, body=json.dumps({"value": records, **extra}, ensure_ascii=False))
+
+    def client(self, **settings: Any) -> GARSClient:
+        client = GARSClient(transport=CountingReplayTransport(str(self.fixtures_dir), GARS_BASE_URL))
+        client.backoff_base = 0
+        for name, value in settings.items():
+            setattr(client, name, value)
+        return client
+
+
+@pytest.fixture
+def gars(tmp_path, monkeypatch) -> GARSStand:
+    monkeypatch.setenv("GARS_BASE_URL", GARS_BASE_URL)
+    return GARSStand(tmp_path / "gars")
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """cache_service поверх fakeredis: каждый тест — с пустым Redis и L1."""
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(cache_service, "_redis", fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()))
+    cache_service.l1.clear()
+    return cache_service
@@ -0,0 +1,65 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.services import s7_service
+from app.utils.cache_decorators import build_key, canonical, canonical_city, canonical_date
+
+
+def test_canonical_parts():
+    assert canonical("  Якутск   Автовокзал ") == "якутск автовокзал"
+    assert canonical(date(2025, 11, 25)) == "2025-11-25"
+    assert canonical(None) == "-"
+    assert canonical("a:b") == "a_b"
+    assert build_key("ns", ["A", 1, None]) == "ns:a:1:-"
+
+
+def test_city_and_date_spellings_share_one_key_part():
+    assert canonical_city("Москва") == canonical_city(" москва ") == canonical_city("MOW") == "MOW"
+    assert canonical_date("25.11.2025") == canonical_date("2025-11-25") == canonical_date(date(2025, 11, 25))
+    assert canonical_date(None) == canonical_date("") == "-"
+    with pytest.raises(ValueError):
+        canonical_date("25/11/2025")
+
+
+def test_s7_search_spellings_share_one_cache_entry(cache, monkeypatch):
+    searches = []
+
+    async def fetch(origin, dest, date_out, date_back=None):
+        searches.append((origin, dest, date_out, date_back))
+        return [{"flight_no": "S7 3061"}]
+
+    monkeypatch.setattr(s7_service, "fetch_s7_flights", fetch)
+    calls = [
+        ("Москва", "Якутск", "25.11.2025"),
+        ("москва", "якутск", "2025-11-25"),
+        ("MOW", "YKS", date(2025, 11, 25)),
+    ]
+
+    async def main():
+        keys = [await s7_service.get_s7_flights.cache_key(*call) for call in calls]
+        results = [await s7_service.get_s7_flights(*call) for call in calls]
+        return keys, results
+
+    keys, results = asyncio.run(main())
+
+    assert len(set(keys)) == 1
+    assert keys[0].startswith("s7:mow:yks:2025-11-25:-#v")
+    assert results == [[{"flight_no": "S7 3061"}]] * 3
+    assert searches == [calls[0] + (None,)]
+
+
+def test_many_returns_errors_in_place_when_asked(cache, monkeypatch):
+    async def fetch(origin, dest, date_out, date_back=None):
+        if dest == "OVB":
+            raise RuntimeError("S7 timeout")
+        return [{"flight_no": f"S7 {dest}"}]
+
+    monkeypatch.setattr(s7_service, "fetch_s7_flights", fetch)
+    calls = [("MOW", "YKS", "25.11.2025"), ("MOW", "OVB", "25.11.2025")]
+
+    results = asyncio.run(s7_service.get_s7_flights.many(calls, return_exceptions=True))
+
+    assert results[0] == [{"flight_no": "S7 YKS"}]
+    assert isinstance(results[1], RuntimeError)
@@ -0,0 +1,55 @@
+import asyncio
+
+
+def _count_mget(cache, monkeypatch):
+    """Счётчик обращений MGET к Redis."""
+    calls = []
+    mget = cache.redis_client.mget
+
+    async def counting_mget(keys, *args):
+        calls.append(list(keys))
+        return await mget(keys, *args)
+
+    monkeypatch.setattr(cache.redis_client, "mget", counting_mget)
+    return calls
+
+
+def test_set_many_and_get_many_round_trip(cache, monkeypatch):
+    mgets = _count_mget(cache, monkeypatch)
+
+    async def main():
+        await cache.set_many({"a": [1], "b": {"x": "щ"}}, expire=60)
+        found = await cache.get_many(["a", "b", "missing", "a"])
+        return found, await cache.redis_client.ttl("a")
+
+    found, ttl = asyncio.run(main())
+
+    assert found == {"a": [1], "b": {"x": "щ"}}
+    assert mgets == [["a", "b", "missing"]]
+    assert 0 < ttl <= 60
+
+
+def test_get_or_set_many_reads_all_keys_with_one_mget(cache, monkeypatch):
+    loaded = []
+
+    def fetch(value):
+        async def load():
+            loaded.append(value)
+            return [value]
+        return load
+
+    async def main():
+        await cache.set_swr("hit", ["cached"], ttl=60)
+        mgets = _count_mget(cache, monkeypatch)
+        results = await cache.get_or_set_many(
+            [("hit", fetch("unused")), ("miss1", fetch("m1")), ("miss2", fetch("m2"))], ttl=60
+        )
+        reads = list(mgets)
+        return results, reads, await cache.get_swr_many(["miss1", "miss2"])
+
+    results, reads, stored = asyncio.run(main())
+
+    assert results == [["cached"], ["m1"], ["m2"]]
+    assert reads == [["hit", "miss1", "miss2"]]
+    assert sorted(loaded) == ["m1", "m2"]
+    assert stored == {"miss1": (["m1"], False), "miss2": (["m2"], False)}
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.utils.cache import NEGATIVE_ERROR, CachedError
+
+
+class Source:
+    def __init__(self, value=None, error=None):
+        self.value, self.error = value, error
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.value
+
+
+def test_empty_result_is_cached_briefly(cache):
+    source = Source([])
+
+    async def main():
+        first = await cache.get_or_set("k", source.fetch, ttl=3600, empty_ttl=5)
+        second = await cache.get_or_set("k", source.fetch, ttl=3600, empty_ttl=5)
+        return first, second, await cache.redis_client.ttl("k"), await cache.fresh_for_many(["k"])
+
+    first, second, ttl, fresh = asyncio.run(main())
+
+    assert first == second == []
+    assert source.calls == 1
+    assert 0 < ttl <= 5
+    # негативная запись не обновляется в фоне и не считается свежей для прогрева
+    assert fresh == {"k": 0.0}
+
+
+def test_empty_result_without_empty_ttl_uses_the_normal_ttl(cache):
+    async def main():
+        await cache.get_or_set("k", Source([]).fetch, ttl=3600)
+        return await cache.redis_client.ttl("k")
+
+    assert asyncio.run(main()) > 3600
+
+
+def test_none_is_not_cached(cache):
+    source = Source(None)
+
+    async def main():
+        await cache.get_or_set("k", source.fetch, ttl=60, empty_ttl=5)
+        await cache.get_or_set("k", source.fetch, ttl=60, empty_ttl=5)
+
+    asyncio.run(main())
+    assert source.calls == 2
+
+
+def test_error_is_cached_and_raised_as_cached_error(cache):
+    source = Source(error=RuntimeError("1С не ответил"))
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await cache.get_or_set("k", source.fetch, ttl=60, error_ttl=30)
+        with pytest.raises(CachedError) as cached_error:
+            await cache.get_or_set("k", source.fetch, ttl=60, error_ttl=30)
+        found, value, stale = await cache.get_swr("k")
+        return cached_error.value, found, value, await cache.redis_client.ttl("k")
+
+    error, found, value, ttl = asyncio.run(main())
+
+    assert source.calls == 1
+    assert error.key == "k" and error.message == "1С не ответил"
+    assert found and isinstance(value, CachedError)
+    assert 0 < ttl <= 30
+
+
+def test_error_without_error_ttl_is_not_cached(cache):
+    source = Source(error=RuntimeError("1С не ответил"))
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await cache.get_or_set("k", source.fetch, ttl=60)
+
+    asyncio.run(main())
+    assert source.calls == 2
+
+
+def test_cached_error_is_returned_in_place_by_get_or_set_many(cache):
+    async def main():
+        await cache.set_negative("bad", NEGATIVE_ERROR, 30, error="S7 timeout")
+        await cache.set_swr("good", ["ok"], ttl=60)
+        entries = [("good", Source(["new"]).fetch), ("bad", Source(["new"]).fetch)]
+        results = await cache.get_or_set_many(entries, ttl=60, return_exceptions=True)
+        with pytest.raises(CachedError):
+            await cache.get_or_set_many(entries, ttl=60)
+        return results
+
+    good, bad = asyncio.run(main())
+
+    assert good == ["ok"]
+    assert isinstance(bad, CachedError) and bad.message == "S7 timeout"
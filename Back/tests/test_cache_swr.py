@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+
+async def _put_stale(cache, key, value):
+    """Запись set_swr, у которой уже истёк мягкий срок."""
+    await cache.set_json(key, {"__swr__": 1, "soft": time.time() - 1, "v": value}, expire=60)
+
+
+async def _background_done(cache):
+    await asyncio.gather(*list(cache._background))
+
+
+class Source:
+    """Источник данных, считающий обращения к себе."""
+
+    def __init__(self, value, delay=0.0, error=None):
+        self.value, self.delay, self.error = value, delay, error
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.value
+
+
+def test_fresh_value_is_served_without_the_source(cache):
+    source = Source(["new"])
+
+    async def main():
+        await cache.set_swr("k", ["cached"], ttl=60)
+        return await cache.get_or_set("k", source.fetch, ttl=60)
+
+    assert asyncio.run(main()) == ["cached"]
+    assert source.calls == 0
+
+
+def test_miss_is_loaded_once_for_concurrent_callers(cache):
+    source = Source(["new"], delay=0.01)
+
+    async def main():
+        results = await asyncio.gather(*(cache.get_or_set("k", source.fetch, ttl=60) for _ in range(5)))
+        return results, await cache.get_swr("k")
+
+    results, (found, value, stale) = asyncio.run(main())
+
+    assert results == [["new"]] * 5
+    assert source.calls == 1
+    assert (found, value, stale) == (True, ["new"], False)
+
+
+def test_stale_value_is_served_and_refreshed_once_in_background(cache):
+    source = Source(["new"], delay=0.01)
+
+    async def main():
+        await _put_stale(cache, "k", ["old"])
+        served = await asyncio.gather(*(cache.get_or_set("k", source.fetch, ttl=60) for _ in range(5)))
+        await _background_done(cache)
+        return served, await cache.get_swr("k")
+
+    served, (_, value, stale) = asyncio.run(main())
+
+    # все получили устаревшее сразу, обновил его ровно один — владелец lock:k
+    assert served == [["old"]] * 5
+    assert source.calls == 1
+    assert (value, stale) == (["new"], False)
+
+
+def test_no_refresh_while_another_worker_holds_the_lock(cache):
+    source = Source(["new"])
+
+    async def main():
+        await _put_stale(cache, "k", ["old"])
+        assert await cache.acquire_lock("k", 30) is not None
+        served = await cache.get_or_set("k", source.fetch, ttl=60)
+        await _background_done(cache)
+        return served
+
+    assert asyncio.run(main()) == ["old"]
+    assert source.calls == 0
+
+
+def test_failed_refresh_keeps_the_stale_value(cache):
+    source = Source(None, error=RuntimeError("upstream down"))
+
+    async def main():
+        await _put_stale(cache, "k", ["old"])
+        served = await cache.get_or_set("k", source.fetch, ttl=60, error_ttl=30)
+        await _background_done(cache)
+        return served, await cache.get_swr("k")
+
+    served, (_, value, stale) = asyncio.run(main())
+
+    assert served == ["old"]
+    assert source.calls == 1
+    assert (value, stale) == (["old"], True)
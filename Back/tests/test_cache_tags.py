@@ -0,0 +1,47 @@
+import asyncio
+
+from app.utils.cache import city_pair_tag, route_tag, versioned_key
+from app.utils.cache_decorators import cached
+
+
+def test_versioned_key_lists_tag_versions_in_tag_order():
+    assert versioned_key("s7:mow:yks", ["s7", "pair:MOW:YKS"], {"pair:MOW:YKS": 3}) == "s7:mow:yks#v0.3"
+    assert versioned_key("plain", [], {}) == "plain"
+
+
+def test_city_pair_tag_does_not_depend_on_spelling():
+    assert city_pair_tag("Москва", "Якутск") == city_pair_tag("MOW", "yks") == "pair:MOW:YKS"
+
+
+def test_invalidation_changes_only_keys_with_that_tag(cache):
+    async def main():
+        before = [await cache.tagged_key("a", route_tag("1")), await cache.tagged_key("b", route_tag("2"))]
+        await cache.invalidate_tags(route_tag("1"))
+        after = [await cache.tagged_key("a", route_tag("1")), await cache.tagged_key("b", route_tag("2"))]
+        return before, after
+
+    (a_before, b_before), (a_after, b_after) = asyncio.run(main())
+
+    assert a_before == "a#v0" and a_after == "a#v1"
+    assert b_before == b_after == "b#v0"
+
+
+def test_invalidated_entries_are_reloaded(cache):
+    calls = []
+
+    @cached("test", ttl=60, tags=lambda route_id: (route_tag(route_id),))
+    async def schedule(route_id):
+        calls.append(route_id)
+        return [f"{route_id}:{len(calls)}"]
+
+    async def main():
+        first = [await schedule("1"), await schedule("2")]
+        await cache.invalidate_tags(route_tag("1"))
+        second = [await schedule("1"), await schedule("2")]
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert first == [["1:1"], ["2:2"]]
+    assert second == [["1:3"], ["2:2"]]
+    assert calls == ["1", "2", "1"]
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.gars_client import GARSUnavailableError
+
+ROUTES = "Catalog_Маршруты"
+PARAMS = {"$format": "json"}
+
+
+def _open_breaker(recovery_timeout=0.0):
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=recovery_timeout)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = _open_breaker(recovery_timeout=60)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request() is False
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_half_open_lets_a_single_probe_through():
+    breaker = _open_breaker()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_opens_the_breaker_again():
+    breaker = _open_breaker()
+    assert breaker.allow_request() is True
+
+    breaker.recovery_timeout = 60
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_released_probe_lets_the_next_one_through():
+    breaker = _open_breaker()
+    assert breaker.allow_request() is True
+
+    breaker.release_probe()
+
+    assert breaker.allow_request() is True
+
+
+def test_cancelled_gars_probe_is_released(gars):
+    gars.collection(ROUTES, PARAMS, [])
+    client = gars.client()
+    client.breaker = _open_breaker()
+    client.transport.latency = 1
+
+    async def main():
+        # мимо single-flight: отменяется сам запрос к 1С
+        probe = asyncio.ensure_future(client._send_request("GET", ROUTES, PARAMS))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # без release_probe breaker навсегда остался бы half_open с занятой пробой
+        client.transport.latency = 0
+        return await client._send_request("GET", ROUTES, PARAMS)
+
+    assert asyncio.run(main()) == {"value": []}
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_gars_failures_open_the_breaker(gars):
+    client = gars.client(retries=0)
+    client.breaker = CircuitBreaker("gars", failure_threshold=2, recovery_timeout=60)
+    client.transport.error_rate = 1  # каждый запрос — 503
+
+    for _ in range(2):
+        with pytest.raises(GARSUnavailableError):
+            asyncio.run(client._make_request("GET", ROUTES, PARAMS))
+
+    client.transport.requests.clear()
+    with pytest.raises(GARSUnavailableError):
+        asyncio.run(client._make_request("GET", ROUTES, PARAMS))
+    assert client.transport.requests == []
@@ -0,0 +1,142 @@
+import asyncio
+import json
+from urllib.parse import quote
+
+import pytest
+
+from app.utils.gars_client import GARSClient
+
+TIMETABLES = "Catalog_РейсыРасписания"
+
+# граница запроса случайная; ReplayTransport сводит любую batch_<hex> к одной
+REQUEST_BOUNDARY = "batch_" + "0" * 32
+RESPONSE_BOUNDARY = "batchresponse_1"
+
+
+def _requests(*route_ids):
+    return [(TIMETABLES, {"$filter": f"Маршрут_Key eq guid'{route_id}'"}) for route_id in route_ids]
+
+
+def _with_format(requests):
+    return [(endpoint, {**params, "$format": "json"}) for endpoint, params in requests]
+
+
+def _part(status, body):
+    reason = "OK" if status == 200 else "Error"
+    return (
+        f"--{RESPONSE_BOUNDARY}\r\n"
+        "Content-Type: application/http\r\n"
+        "Content-Transfer-Encoding: binary\r\n"
+        "\r\n"
+        f"HTTP/1.1 {status} {reason}\r\n"
+        "Content-Type: application/json\r\n"
+        "\r\n"
+        f"{body}\r\n"
+    )
+
+
+def _multipart(*parts):
+    return "".join(parts) + f"--{RESPONSE_BOUNDARY}--\r\n"
+
+
+def _record_batch(gars, client, requests, body, status=200):
+    data = client._build_batch_body(REQUEST_BOUNDARY, _with_format(requests)).encode("utf-8")
+    gars.record(
+        "POST", "$batch", data=data, status=status, body=body,
+        content_type=f"multipart/mixed; boundary={RESPONSE_BOUNDARY}",
+    )
+
+
+def test_batch_body_has_one_get_part_per_request(gars):
+    client = gars.client()
+
+    body = client._build_batch_body("b", _requests("1", "2"))
+
+    lines = body.split("\r\n")
+    gets = [line for line in lines if line.startswith("GET ")]
+    assert gets == [
+        f"GET {quote(TIMETABLES)}?$filter={quote('Маршрут_Key')}%20eq%20guid'{route_id}' HTTP/1.1"
+        for route_id in ("1", "2")
+    ]
+    assert lines.count("--b") == 2
+    assert body.endswith("--b--\r\n")
+
+
+def test_batch_response_is_split_into_parts():
+    body = _multipart(_part(200, json.dumps({"value": [{"Ref_Key": "t1"}]})), _part(404, "{}"))
+
+    parts = GARSClient._parse_batch_response(f'multipart/mixed; boundary="{RESPONSE_BOUNDARY}"', body)
+
+    assert parts == [{"value": [{"Ref_Key": "t1"}]}, None]
+
+
+def test_batch_get_reads_all_requests_in_one_round_trip(gars):
+    client = gars.client()
+    requests = _requests("1", "2")
+    _record_batch(gars, client, requests, _multipart(
+        _part(200, json.dumps({"value": [{"Ref_Key": "t1"}]})),
+        _part(200, json.dumps({"value": []})),
+    ))
+
+    results = asyncio.run(client.batch_get(requests))
+
+    assert results == [[{"Ref_Key": "t1"}], []]
+    assert [method for method, _, _ in client.transport.requests] == ["POST"]
+
+
+@pytest.mark.parametrize("status", [404, 405, 501])
+def test_unsupported_batch_falls_back_to_single_requests(gars, status):
+    client = gars.client()
+    requests = _requests("1", "2")
+    _record_batch(gars, client, requests, "Not Implemented", status=status)
+    for (endpoint, params), value in zip(_with_format(requests), ([{"Ref_Key": "t1"}], [])):
+        gars.collection(endpoint, params, value)
+
+    assert asyncio.run(client.batch_get(requests)) == [[{"Ref_Key": "t1"}], []]
+    assert client.batch_enabled is False
+
+    # $batch больше не пробуем
+    client.transport.requests.clear()
+    asyncio.run(client.batch_get(requests))
+    assert [method for method, _, _ in client.transport.requests] == ["GET", "GET"]
+
+
+def test_malformed_batch_response_falls_back_once(gars):
+    client = gars.client()
+    requests = _requests("1", "2")
+    _record_batch(gars, client, requests, "<html>proxy error</html>")
+    for endpoint, params in _with_format(requests):
+        gars.collection(endpoint, params, [])
+
+    assert asyncio.run(client.batch_get(requests)) == [[], []]
+    assert client.batch_enabled is True
+
+
+def test_paged_batch_part_is_read_to_the_end(gars):
+    client = gars.client(page_size=1)
+    requests = _requests("1", "2")
+    next_link = f"{gars.base_url}{TIMETABLES}?$skiptoken=1"
+    _record_batch(gars, client, requests, _multipart(
+        _part(200, json.dumps({"value": [{"Ref_Key": "t1"}], "odata.nextLink": next_link})),
+        _part(200, json.dumps({"value": [{"Ref_Key": "t3"}]})),
+    ))
+    # первая часть дочитывается через iter_collection ($top/$skip)
+    endpoint, params = _with_format(requests)[0]
+    gars.collection(endpoint, {**params, "$top": "1"}, [{"Ref_Key": "t1"}])
+    gars.collection(endpoint, {**params, "$top": "1", "$skip": "1"}, [{"Ref_Key": "t2"}])
+    gars.collection(endpoint, {**params, "$top": "1", "$skip": "2"}, [])
+
+    results = asyncio.run(client.batch_get(requests))
+
+    assert results == [[{"Ref_Key": "t1"}, {"Ref_Key": "t2"}], [{"Ref_Key": "t3"}]]
+
+
+def test_failed_route_is_none_and_empty_route_is_an_empty_list(gars):
+    client = gars.client()
+    route_ids = ["1", "2"]
+    _record_batch(gars, client, [client.timetables_request(r) for r in route_ids], _multipart(
+        _part(500, "{}"),
+        _part(200, json.dumps({"value": []})),
+    ))
+
+    assert asyncio.run(client.get_route_timetables_many(route_ids)) == {"1": None, "2": []}
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from app.utils.gars_client import GARSError
+
+ROUTES = "Catalog_Маршруты"
+
+
+def _records(*keys):
+    return [{"Ref_Key": key} for key in keys]
+
+
+def _page(top, skip=0):
+    params = {"$format": "json", "$top": str(top)}
+    if skip:
+        params["$skip"] = str(skip)
+    return params
+
+
+async def _pages(client, endpoint=ROUTES, **kwargs):
+    return [page async for page in client.iter_collection(endpoint, **kwargs)]
+
+
+def test_collection_is_read_page_by_page(gars):
+    gars.collection(ROUTES, _page(2), _records("a", "b"))
+    gars.collection(ROUTES, _page(2, 2), _records("c", "d"))
+    gars.collection(ROUTES, _page(2, 4), _records("e"))
+    client = gars.client(page_size=2)
+
+    pages = asyncio.run(_pages(client))
+
+    assert pages == [_records("a", "b"), _records("c", "d"), _records("e")]
+    assert len(client.transport.requests) == 3
+
+
+def test_server_next_link_is_followed(gars):
+    next_link = f"{gars.base_url}{ROUTES}?$skiptoken=2"
+    gars.collection(ROUTES, _page(2), _records("a", "b"), **{"odata.nextLink": next_link})
+    gars.collection(next_link, None, _records("c"))
+    client = gars.client(page_size=2)
+
+    pages = asyncio.run(_pages(client))
+
+    assert pages == [_records("a", "b"), _records("c")]
+
+
+def test_ignored_top_reads_the_collection_once(gars):
+    # публикация отдала всё сразу, несмотря на $top=2
+    gars.collection(ROUTES, _page(2), _records("a", "b", "c"))
+    client = gars.client(page_size=2)
+
+    pages = asyncio.run(_pages(client))
+
+    assert pages == [_records("a", "b", "c")]
+    assert len(client.transport.requests) == 1
+
+
+def test_repeated_page_is_an_error_not_a_truncated_collection(gars):
+    # $skip проигнорирован: вторая страница повторяет первую
+    gars.collection(ROUTES, _page(2), _records("a", "b"))
+    gars.collection(ROUTES, _page(2, 2), _records("a", "b"))
+    client = gars.client(page_size=2)
+
+    with pytest.raises(GARSError):
+        asyncio.run(_pages(client))
+    assert asyncio.run(client._collect(ROUTES)) is None
+
+
+def test_missing_page_is_an_error(gars):
+    gars.collection(ROUTES, _page(2), _records("a", "b"))
+    client = gars.client(page_size=2)  # страницы skip=2 нет — 404
+
+    with pytest.raises(GARSError):
+        asyncio.run(_pages(client))
+
+
+def test_page_limit_stops_endless_collections(gars):
+    gars.collection(ROUTES, _page(1), _records("a"))
+    gars.collection(ROUTES, _page(1, 1), _records("b"))
+    gars.collection(ROUTES, _page(1, 2), _records("c"))
+    client = gars.client(page_size=1, max_pages=2)
+
+    with pytest.raises(GARSError):
+        asyncio.run(_pages(client))
@@ -0,0 +1,45 @@
+import json
+from pathlib import Path
+
+from app.services.s7_ibe_json import flights_from_payloads, parse_ibe_payload, search_dates
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _load(name: str):
+    return json.loads((FIXTURES / f"{name}.json").read_text(encoding="utf-8"))
+
+
+def test_search_response_gives_flights_with_segments_and_fares():
+    flights = parse_ibe_payload(_load("s7_ibe_search"), search_dates("25.11.2025"))
+
+    assert [(f["flight_no"], f["dep_time"], f["arr_time"], f["price_rub"]) for f in flights] == [
+        ("S7 3061", "19:35", "08:55", 24870),
+        ("S7 5201 / S7 5405", "09:10", "03:40", 21350),
+    ]
+    connection = flights[1]
+    assert [(s["origin"], s["destination"], s["dep_date"]) for s in connection["segments"]] == [
+        ("DME", "OVB", "2025-11-25"),
+        ("OVB", "YKS", "2025-11-25"),
+    ]
+    assert connection["fares"] == [
+        {"name": "Эконом Базовый", "price_rub": 21350},
+        {"name": "Эконом Стандарт", "price_rub": 25990},
+    ]
+
+
+def test_calendar_and_ancillaries_are_not_flights():
+    assert parse_ibe_payload(_load("s7_ibe_calendar")) == []
+    assert parse_ibe_payload(_load("s7_ibe_ancillaries")) == []
+
+
+def test_search_response_is_picked_among_other_payloads():
+    payloads = [_load("s7_ibe_calendar"), _load("s7_ibe_search"), _load("s7_ibe_ancillaries")]
+
+    flights = flights_from_payloads(payloads, search_dates("25.11.2025"))
+
+    assert [f["flight_no"] for f in flights] == ["S7 3061", "S7 5201 / S7 5405"]
+
+
+def test_flights_outside_search_dates_are_dropped():
+    assert flights_from_payloads([_load("s7_ibe_search")], search_dates("27.11.2025")) == []
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_with_one_key_run_once():
+    flight = SingleFlight("test")
+    runs = []
+
+    async def fetch():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 1}
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert results == [{"value": 1}] * 5
+    assert len(runs) == 1
+    assert flight.stats() == {"calls": 5, "executed": 1, "collapsed": 4, "in_flight": 0}
+
+
+def test_different_keys_and_later_calls_are_not_collapsed():
+    flight = SingleFlight("test")
+    runs = []
+
+    async def fetch(key):
+        runs.append(key)
+        await asyncio.sleep(0)
+        return key
+
+    async def main():
+        first = await asyncio.gather(flight.do("a", lambda: fetch("a")), flight.do("b", lambda: fetch("b")))
+        return first, await flight.do("a", lambda: fetch("a"))
+
+    assert asyncio.run(main()) == (["a", "b"], "a")
+    assert runs == ["a", "b", "a"]
+
+
+def test_error_is_shared_by_all_waiters():
+    flight = SingleFlight("test")
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fetch) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(main())
+
+    assert [str(e) for e in errors] == ["upstream down"] * 3
+    assert flight.executed == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test")
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("k", fetch))
+        second = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_identical_gars_reads_reach_1c_once(gars):
+    params = {"$format": "json", "$filter": "Code eq '1'"}
+    gars.collection("Catalog_Маршруты", params, [{"Ref_Key": "r1"}])
+    client = gars.client()
+    client.transport.latency = 0.02
+
+    async def main():
+        return await asyncio.gather(
+            *(client._make_request("GET", "Catalog_Маршруты", params) for _ in range(10))
+        )
+
+    responses = asyncio.run(main())
+
+    assert all(response == {"value": [{"Ref_Key": "r1"}]} for response in responses)
+    assert len(client.transport.requests) == 1
+    assert client.flight.stats()["collapsed"] == 9